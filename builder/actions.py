@@ -5,8 +5,10 @@ from django.db import transaction
 from django.db.models import Count
 from django.utils.text import slugify
 
-from codelists.hierarchy import Hierarchy
 from codelists.models import CodeObj, SearchResult
+from opencodelists.db_utils import chunks, values_list_in
+
+from . import hierarchy_cache
 
 logger = structlog.get_logger()
 
@@ -22,20 +24,23 @@ def create_search(*, draft, term, codes):
     search = draft.searches.create(term=term, slug=slugify(term))
 
     # Ensure that there is a CodeObj object linked to this draft for each code.
-    codes_with_existing_code_objs = set(
-        draft.code_objs.filter(code__in=codes).values_list("code", flat=True)
-    )
+    codes_with_existing_code_objs = {
+        code for (code,) in values_list_in(draft.code_objs, "code", codes, "code")
+    }
     codes_without_existing_code_objs = set(codes) - codes_with_existing_code_objs
     CodeObj.objects.bulk_create(
         CodeObj(version=draft, code=code) for code in codes_without_existing_code_objs
     )
 
     # Create a SearchResult for each code.
-    code_obj_ids = draft.code_objs.filter(code__in=codes).values_list("id", flat=True)
+    code_obj_ids = values_list_in(draft.code_objs, "code", codes, "id")
     SearchResult.objects.bulk_create(
-        SearchResult(search=search, code_obj_id=id) for id in code_obj_ids
+        SearchResult(search=search, code_obj_id=id) for (id,) in code_obj_ids
     )
 
+    # The draft's codes may have changed, so its Hierarchy needs to be rebuilt.
+    hierarchy_cache.invalidate(draft)
+
     logger.info("Created Search", search_pk=search.pk)
 
     return search
@@ -54,23 +59,37 @@ def delete_search(*, search):
     # Delete the search
     search.delete()
 
+    # The draft's codes may have changed, so its Hierarchy needs to be rebuilt.
+    hierarchy_cache.invalidate(search.version)
+
     logger.info("Deleted Search", search_pk=search_pk)
 
 
 @transaction.atomic
 def update_code_statuses(*, draft, updates):
     code_to_status = dict(draft.code_objs.values_list("code", "status"))
-    h = Hierarchy.from_codes(draft.coding_system, list(code_to_status))
-    new_code_to_status = h.update_node_to_status(code_to_status, updates)
+    h = hierarchy_cache.get_hierarchy(draft, list(code_to_status))
+
+    # Only codes whose status has changed need to be written back
+    changed_code_to_status = {
+        code: status
+        for code, status in h.changed_node_statuses(code_to_status, updates).items()
+        if code in code_to_status
+    }
 
     status_to_new_code = defaultdict(list)
-    for code, status in new_code_to_status.items():
+    for code, status in changed_code_to_status.items():
         status_to_new_code[status].append(code)
 
     for status, codes in status_to_new_code.items():
-        draft.code_objs.filter(code__in=codes).update(status=status)
+        for chunk in chunks(codes):
+            draft.code_objs.filter(code__in=chunk).update(status=status)
 
-    logger.info("Updated code statuses", draft_pk=draft.pk)
+    logger.info(
+        "Updated code statuses",
+        draft_pk=draft.pk,
+        num_changed=len(changed_code_to_status),
+    )
 
 
 def save(*, draft):
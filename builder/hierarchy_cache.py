@@ -0,0 +1,62 @@
+"""A cache of the Hierarchy for each draft that is being edited in the builder.
+
+Each page load in the builder and each update to a draft needs the Hierarchy of all of
+the draft's codes, which is expensive to build for large drafts, but which only changes
+when codes are added to or removed from the draft.
+
+Hierarchies are stored in the "hierarchies" cache (see CACHES in settings.py), which can
+be configured to use any of Django's cache backends.  There is one entry per draft,
+which records the codes, and the release of the coding system, that the Hierarchy was
+built from, so that a stale Hierarchy is never returned.
+"""
+
+import hashlib
+
+from django.core.cache import caches
+
+from codelists import graphs
+from codelists.hierarchy import Hierarchy
+
+
+def get_hierarchy(draft, codes):
+    """Return the Hierarchy of the given codes, which must be all of draft's codes."""
+
+    cache = caches["hierarchies"]
+    key = _cache_key(draft)
+    fingerprint = get_fingerprint(draft, codes)
+
+    cached = cache.get(key)
+    if cached is not None and cached["fingerprint"] == fingerprint:
+        return Hierarchy(cached["root"], cached["edges"])
+
+    hierarchy = Hierarchy.from_codes(draft.coding_system, codes)
+    cache.set(
+        key,
+        {
+            "fingerprint": fingerprint,
+            "root": hierarchy.root,
+            "edges": set(hierarchy.edges),
+        },
+    )
+    return hierarchy
+
+
+def invalidate(draft):
+    """Discard the cached Hierarchy for the given draft."""
+
+    caches["hierarchies"].delete(_cache_key(draft))
+
+
+def _cache_key(draft):
+    return f"draft-hierarchy:{draft.pk}"
+
+
+def get_fingerprint(draft, codes):
+    """Return a string identifying the codes and the coding system release that a
+    draft's Hierarchy is built from.
+    """
+
+    coding_system = draft.coding_system
+    release_key = graphs.current_release_key(coding_system)
+    codes_hash = hashlib.sha1("\n".join(sorted(codes)).encode("utf8")).hexdigest()
+    return f"{coding_system.id}:{release_key}:{codes_hash}"
@@ -54,9 +54,6 @@ class Command(BaseCommand):
                     "all_codes",
                     "included_codes",
                     "excluded_codes",
-                    "parent_map",
-                    "child_map",
-                    "code_to_term",
                     "code_to_status",
                     "is_editable",
                     "update_url",
@@ -64,6 +61,11 @@ class Command(BaseCommand):
                 ]
             }
 
+            # The hierarchy and terms are loaded by the page from a separate URL, in the
+            # format described in codelists.presenters.present_hierarchy().
+            hierarchy_data = client.get(draft.get_builder_url("hierarchy")).json()
+            data.update(unpack_hierarchy(hierarchy_data))
+
             # Ensure that all fields are sorted, to allow for meaningful diffs should
             # the data change.
             data["all_codes"] = sorted(data["all_codes"])
@@ -88,6 +90,34 @@ class Command(BaseCommand):
                 json.dump(data, f, indent=2)
 
 
+def unpack_hierarchy(hierarchy_data):
+    """Convert the compact representation of a hierarchy into parent_map, child_map,
+    and code_to_term, as used by the frontend tests.
+    """
+
+    codes = hierarchy_data["codes"]
+    parent_map = {}
+    child_map = {}
+    for parent_id, child_id in zip(
+        hierarchy_data["parents"], hierarchy_data["children"]
+    ):
+        parent, child = codes[parent_id], codes[child_id]
+        parent_map.setdefault(child, []).append(parent)
+        child_map.setdefault(parent, []).append(child)
+
+    code_to_term = {
+        code: term
+        for code, term in zip(codes, hierarchy_data["terms"])
+        if term is not None
+    }
+
+    return {
+        "parent_map": parent_map,
+        "child_map": child_map,
+        "code_to_term": code_to_term,
+    }
+
+
 def set_up_db():
     """Set up the in-memory database so that we can avoid clobbering existing data.
 
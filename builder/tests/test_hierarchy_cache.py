@@ -0,0 +1,89 @@
+from builder import actions, hierarchy_cache
+from codelists.hierarchy import Hierarchy
+from codelists.tests.factories import CodelistFactory
+from opencodelists.actions import record_dataset_release
+from opencodelists.tests.factories import UserFactory
+
+
+def build_draft(codes):
+    codelist = CodelistFactory()
+    owner = UserFactory()
+    draft = actions.create_draft(codelist=codelist, owner=owner)
+    actions.create_search(draft=draft, term="elbow", codes=codes)
+    return draft
+
+
+def count_builds(monkeypatch):
+    """Patch Hierarchy.from_codes to record each time a Hierarchy is built."""
+
+    calls = []
+    from_codes = Hierarchy.from_codes
+
+    def patched(coding_system, codes):
+        calls.append(codes)
+        return from_codes(coding_system, codes)
+
+    monkeypatch.setattr(Hierarchy, "from_codes", patched)
+    return calls
+
+
+def test_get_hierarchy_is_cached(tennis_elbow, monkeypatch):
+    codes = ["128133004", "239964003"]
+    draft = build_draft(codes)
+    calls = count_builds(monkeypatch)
+
+    h1 = hierarchy_cache.get_hierarchy(draft, codes)
+    h2 = hierarchy_cache.get_hierarchy(draft, codes)
+
+    assert len(calls) == 1
+    assert h1.root == h2.root
+    assert set(h1.edges) == set(h2.edges)
+    assert h2.descendants("128133004") == h1.descendants("128133004")
+
+
+def test_get_hierarchy_with_different_codes(tennis_elbow, monkeypatch):
+    draft = build_draft(["128133004", "239964003"])
+    calls = count_builds(monkeypatch)
+
+    hierarchy_cache.get_hierarchy(draft, ["128133004", "239964003"])
+    h = hierarchy_cache.get_hierarchy(draft, ["128133004"])
+
+    assert len(calls) == 2
+    assert "239964003" in h.nodes
+
+
+def test_get_hierarchy_after_new_release(tennis_elbow, monkeypatch):
+    codes = ["128133004", "239964003"]
+    draft = build_draft(codes)
+    calls = count_builds(monkeypatch)
+
+    hierarchy_cache.get_hierarchy(draft, codes)
+    record_dataset_release(dataset="coding_systems.snomedct", release_dir="new")
+    hierarchy_cache.get_hierarchy(draft, codes)
+
+    assert len(calls) == 2
+
+
+def test_create_search_invalidates_cache(tennis_elbow, monkeypatch):
+    codes = ["128133004", "239964003"]
+    draft = build_draft(codes)
+    calls = count_builds(monkeypatch)
+
+    hierarchy_cache.get_hierarchy(draft, codes)
+    actions.create_search(draft=draft, term="disorder", codes=["128133004"])
+    hierarchy_cache.get_hierarchy(draft, codes)
+
+    assert len(calls) == 2
+
+
+def test_delete_search_invalidates_cache(tennis_elbow, monkeypatch):
+    codes = ["128133004", "239964003"]
+    draft = build_draft(codes)
+    search = actions.create_search(draft=draft, term="disorder", codes=["128133004"])
+    calls = count_builds(monkeypatch)
+
+    hierarchy_cache.get_hierarchy(draft, codes)
+    actions.delete_search(search=search)
+    hierarchy_cache.get_hierarchy(draft, codes)
+
+    assert len(calls) == 2
@@ -44,3 +44,37 @@ def test_no_search_term(client, draft_with_some_searches):
 
     assert rsp.status_code == 200
     assert b"No search term" in rsp.content
+
+
+def test_hierarchy(client, draft_with_some_searches):
+    draft = draft_with_some_searches
+    client.force_login(draft.draft_owner)
+    rsp = client.get(draft.get_builder_url("hierarchy"))
+
+    assert rsp.status_code == 200
+    data = rsp.json()
+    all_codes = set(draft.code_objs.values_list("code", flat=True))
+    assert all_codes <= set(data["codes"])
+    assert len(data["terms"]) == len(data["codes"])
+    assert len(data["parents"]) == len(data["children"])
+
+
+def test_hierarchy_not_modified(client, draft_with_some_searches):
+    draft = draft_with_some_searches
+    client.force_login(draft.draft_owner)
+    rsp = client.get(draft.get_builder_url("hierarchy"))
+
+    rsp = client.get(draft.get_builder_url("hierarchy"), HTTP_IF_NONE_MATCH=rsp["ETag"])
+    assert rsp.status_code == 304
+
+
+def test_hierarchy_modified_after_new_search(client, draft_with_some_searches):
+    draft = draft_with_some_searches
+    client.force_login(draft.draft_owner)
+    rsp = client.get(draft.get_builder_url("hierarchy"))
+    etag = rsp["ETag"]
+
+    client.post(draft.get_builder_url("new-search"), {"term": "epicondylitis"})
+
+    rsp = client.get(draft.get_builder_url("hierarchy"), HTTP_IF_NONE_MATCH=etag)
+    assert rsp.status_code == 200
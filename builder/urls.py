@@ -10,4 +10,5 @@ urlpatterns = [
     path("<hash>/no-search-term/", views.no_search_term, name="no-search-term"),
     path("<hash>/update/", views.update, name="update"),
     path("<hash>/search/", views.new_search, name="new-search"),
+    path("<hash>/hierarchy.json", views.hierarchy, name="hierarchy"),
 ]
@@ -1,15 +1,18 @@
+import hashlib
 import json
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.views.decorators.http import require_http_methods
 
-from codelists.hierarchy import Hierarchy
+from codelists.presenters import present_hierarchy
 from codelists.search import do_search
 
-from . import actions
+from . import actions, hierarchy_cache
 from .decorators import load_draft
 
 NO_SEARCH_TERM = object()
@@ -102,10 +105,10 @@ def _draft(request, draft, search_slug):
         displayed_codes = [c for c in displayed_codes if code_to_status[c] == "!"]
         filter = "in conflict"
 
-    hierarchy = Hierarchy.from_codes(coding_system, all_codes)
+    hierarchy = hierarchy_cache.get_hierarchy(draft, all_codes)
 
-    ancestor_codes = hierarchy.filter_to_ultimate_ancestors(set(displayed_codes))
-    code_to_term = coding_system.code_to_term(hierarchy.nodes | set(all_codes))
+    ancestor_codes = hierarchy.ultimate_ancestors(set(displayed_codes))
+    code_to_term = coding_system.code_to_term(ancestor_codes)
     tree_tables = sorted(
         (type, sorted(codes, key=code_to_term.__getitem__))
         for type, codes in coding_system.codes_by_type(
@@ -115,6 +118,7 @@ def _draft(request, draft, search_slug):
 
     update_url = draft.get_builder_url("update")
     search_url = draft.get_builder_url("new-search")
+    hierarchy_url = draft.get_builder_url("hierarchy")
 
     ctx = {
         "user": draft.draft_owner,
@@ -133,19 +137,46 @@ def _draft(request, draft, search_slug):
         "all_codes": all_codes,
         "included_codes": included_codes,
         "excluded_codes": excluded_codes,
-        "parent_map": {p: list(cc) for p, cc in hierarchy.parent_map.items()},
-        "child_map": {c: list(pp) for c, pp in hierarchy.child_map.items()},
-        "code_to_term": code_to_term,
         "code_to_status": code_to_status,
         "is_editable": request.user == draft.draft_owner,
         "update_url": update_url,
         "search_url": search_url,
+        "hierarchy_url": hierarchy_url,
         # }
     }
 
     return render(request, "builder/draft.html", ctx)
 
 
+@login_required
+@load_draft
+def hierarchy(request, draft):
+    """Return the hierarchy of the draft's codes, and the terms of the codes in the
+    hierarchy, in the format described in codelists.presenters.present_hierarchy().
+
+    The hierarchy only changes when codes are added to or removed from the draft, so
+    the response has an ETag, and the browser can reuse its copy while the draft is
+    being edited.
+    """
+
+    all_codes = list(draft.code_objs.values_list("code", flat=True))
+    fingerprint = hierarchy_cache.get_fingerprint(draft, all_codes)
+    etag = quote_etag(hashlib.sha1(fingerprint.encode("utf8")).hexdigest())
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        hierarchy = hierarchy_cache.get_hierarchy(draft, all_codes)
+        code_to_term = draft.coding_system.code_to_term(
+            hierarchy.nodes | set(all_codes)
+        )
+        response = JsonResponse(present_hierarchy(hierarchy, code_to_term))
+
+    response["ETag"] = etag
+    # The browser must check that its copy is still current before reusing it.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 @login_required
 @require_http_methods(["POST"])
 @load_draft
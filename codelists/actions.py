@@ -4,9 +4,11 @@ from django.utils.text import slugify
 
 from builder import actions as builder_actions
 from coding_systems.snomedct import ecl_parser
+from opencodelists.db_utils import chunks
 from opencodelists.dict_utils import invert_dict
 from opencodelists.models import User
 
+from . import artefacts
 from .definition2 import Definition2
 from .hierarchy import Hierarchy
 from .models import CodeObj
@@ -150,14 +152,9 @@ def create_version_with_codes(
         hierarchy = Hierarchy.from_codes(codelist.coding_system, codes)
         definition = Definition2.from_codes(codes, hierarchy)
 
+    node_to_status = definition.node_statuses(hierarchy)
     CodeObj.objects.bulk_create(
-        CodeObj(
-            version=next_clv,
-            code=node,
-            status=hierarchy.node_status(
-                node, definition.explicitly_included, definition.explicitly_excluded
-            ),
-        )
+        CodeObj(version=next_clv, code=node, status=node_to_status[node])
         for node in hierarchy.nodes
         if node in codes
     )
@@ -223,6 +220,25 @@ def publish_version(*, version):
 
     logger.info("Published Version", version_pk=version.pk)
 
+    # Render the version's CSV file now, since it will almost certainly be downloaded.
+    # Other artefacts are rendered when they are first requested.
+    create_artefact(version=version, kind="csv")
+
+
+def create_artefact(*, version, kind):
+    """Render the given kind of artefact for a published version, and record it."""
+
+    assert artefacts.is_cacheable(version)
+    releases = artefacts.releases_key(version, kind)
+    digest = artefacts.write(artefacts.render(version, kind))
+    artefact, _ = version.artefacts.update_or_create(
+        kind=kind, releases=releases, defaults={"digest": digest}
+    )
+
+    logger.info("Created Artefact", artefact_pk=artefact.pk)
+
+    return artefact
+
 
 @transaction.atomic
 def convert_codelist_to_new_style(*, codelist):
@@ -241,14 +257,9 @@ def convert_codelist_to_new_style(*, codelist):
     hierarchy = Hierarchy.from_codes(codelist.coding_system, codes)
     definition = Definition2.from_codes(codes, hierarchy)
 
+    node_to_status = definition.node_statuses(hierarchy)
     CodeObj.objects.bulk_create(
-        CodeObj(
-            version=next_clv,
-            code=node,
-            status=hierarchy.node_status(
-                node, definition.explicitly_included, definition.explicitly_excluded
-            ),
-        )
+        CodeObj(version=next_clv, code=node, status=node_to_status[node])
         for node in hierarchy.nodes
         if node in codes
     )
@@ -282,7 +293,8 @@ def export_to_builder(*, version, owner):
     code_to_status = dict(version.code_objs.values_list("code", "status"))
     status_to_code = invert_dict(code_to_status)
     for status, codes in status_to_code.items():
-        draft.code_objs.filter(code__in=codes).update(status=status)
+        for chunk in chunks(codes):
+            draft.code_objs.filter(code__in=chunk).update(status=status)
 
     # This assert will fire if new matching concepts have been imported.  At the moment,
     # the builder frontend cannot deal with a CodeObj with status ?  if any of its
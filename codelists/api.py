@@ -1,11 +1,24 @@
+import json
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from opencodelists.hash_utils import unhash
+from opencodelists.zip_utils import iter_zip_data
+
+from . import actions, artefacts
 from .actions import create_version_from_ecl_expr
+from .models import CodelistVersion
 from .views.decorators import load_codelist
 
+# The size of the chunks in which artefacts are read from disk
+ARTEFACT_CHUNK_SIZE = 64 * 1024
+
 
 @api_view(["POST"])
 @load_codelist
@@ -32,5 +45,137 @@ def versions(request, codelist):
     return Response({"codelist_version": clv.get_absolute_url()})
 
 
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def download(request):
+    """Return the CSV files of several CodelistVersions, identified by their full slugs,
+    in a single response.
+
+    Like downloading a single version's CSV file, this does not require authentication.
+
+    By default, the response is a zip file with one CSV file per version.  If `format`
+    is "ndjson", the response has one JSON object per line, with the version's full
+    slug, its filename, and the content of its CSV file.  Each version is only included
+    once, and each filename is unique (see _filenames()).
+
+    Published versions are served from their artefacts, so that each version's CSV file
+    is only rendered once.
+    """
+
+    full_slugs = request.data.get("codelists")
+    if not isinstance(full_slugs, list) or not all(
+        isinstance(full_slug, str) for full_slug in full_slugs
+    ):
+        return error("`codelists` must be a list of full slugs")
+
+    output_format = request.data.get("format", "zip")
+    if output_format not in ["zip", "ndjson"]:
+        return error(f"Unknown format `{output_format}`")
+
+    versions = []
+    for full_slug in full_slugs:
+        clv = _load_version_from_full_slug(full_slug)
+        if clv is None:
+            return error(f"Unknown codelist version `{full_slug}`")
+        if clv not in versions:
+            versions.append(clv)
+
+    filenames = _filenames(versions)
+
+    if output_format == "zip":
+        members = ((filenames[clv], _iter_csv_data(clv)) for clv in versions)
+        response = StreamingHttpResponse(
+            iter_zip_data(members), content_type="application/zip"
+        )
+        response["Content-Disposition"] = 'attachment; filename="codelists.zip"'
+    else:
+        lines = (
+            json.dumps(
+                {
+                    "full_slug": clv.full_slug(),
+                    "filename": filenames[clv],
+                    "csv": "".join(
+                        chunk if isinstance(chunk, str) else chunk.decode("utf8")
+                        for chunk in _iter_csv_data(clv)
+                    ),
+                }
+            )
+            + "\n"
+            for clv in versions
+        )
+        response = StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+    return response
+
+
+def _filenames(versions):
+    """Return dict mapping each of the given versions to the name of its CSV file.
+
+    A version's download_filename() is not necessarily unique, since hyphens in slugs
+    mean that different codelists can have the same filename, so when a filename has
+    already been used, the version's hash is added to it.
+    """
+
+    filenames = {}
+    used = set()
+    for clv in versions:
+        filename = f"{clv.download_filename()}.csv"
+        if filename in used:
+            filename = f"{clv.download_filename()}-{clv.hash}.csv"
+        filenames[clv] = filename
+        used.add(filename)
+    return filenames
+
+
+def _load_version_from_full_slug(full_slug):
+    """Return the CodelistVersion with the given full slug, or None if there is no such
+    version, or if the version is a draft that belongs to a user.
+    """
+
+    parts = full_slug.strip("/").split("/")
+    if len(parts) == 3:
+        organisation_slug, codelist_slug, tag_or_hash = parts
+        query_kwargs = {"codelist__organisation_id": organisation_slug}
+    elif len(parts) == 4 and parts[0] == "user":
+        _, username, codelist_slug, tag_or_hash = parts
+        query_kwargs = {"codelist__user_id": username}
+    else:
+        return None
+
+    q = Q(tag=tag_or_hash)
+    try:
+        id = unhash(tag_or_hash, "CodelistVersion")
+    except ValueError:
+        pass
+    else:
+        q |= Q(id=id)
+
+    clv = (
+        CodelistVersion.objects.filter(q)
+        .filter(codelist__slug=codelist_slug, **query_kwargs)
+        .first()
+    )
+    if clv is None or clv.draft_owner:
+        return None
+    return clv
+
+
+def _iter_csv_data(clv):
+    """Yield chunks of the CSV file for the given version, reading it from the version's
+    artefact if the version is published.
+    """
+
+    if not artefacts.is_cacheable(clv):
+        yield from clv.iter_csv_data_for_download()
+        return
+
+    artefact = artefacts.get_artefact(clv, "csv")
+    if artefact is None:
+        artefact = actions.create_artefact(version=clv, kind="csv")
+
+    with open(artefacts.path_for_digest(artefact.digest), "rb") as f:
+        yield from iter(lambda: f.read(ARTEFACT_CHUNK_SIZE), b"")
+
+
 def error(msg):
     return Response({"error": msg}, status=status.HTTP_400_BAD_REQUEST)
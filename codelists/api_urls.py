@@ -5,7 +5,9 @@ from . import api
 app_name = "codelists_api"
 
 
-urlpatterns = []
+urlpatterns = [
+    path("codelist/download/", api.download, name="download"),
+]
 
 for subpath, view in [
     ("<codelist_slug>/versions/", api.versions),
@@ -0,0 +1,93 @@
+"""Precomputed files for download from published CodelistVersions.
+
+A published CodelistVersion never changes, but rendering its CSV file, its definition
+CSV file, or (for BNF codelists) its dm+d CSV file involves building a Hierarchy and
+looking up terms.  Since the same files are downloaded many times (eg by OpenSAFELY
+jobs), each file is rendered once, when the version is published or when the file is
+first requested, and is then served from disk.
+
+Files are stored in CODELIST_ARTEFACTS_DIR, named by the SHA-256 digest of their content,
+and each is recorded by an Artefact.  Since terms and mappings may change between
+releases of the underlying data, each Artefact records the releases of the datasets that
+it was rendered from, and a file is rendered again when there is a new release.
+"""
+
+import hashlib
+import os
+
+from django.conf import settings
+
+from opencodelists.models import DatasetRelease
+
+from .coding_systems import dataset_for_coding_system
+
+KINDS = ["csv", "definition", "dmd"]
+
+# What is added to a CodelistVersion's download_filename() for each kind of artefact
+FILENAME_SUFFIXES = {"csv": "", "definition": "-definition", "dmd": "-dmd"}
+
+
+def is_cacheable(version):
+    """Return whether artefacts can be rendered for the given version."""
+
+    return not version.is_draft and not version.draft_owner
+
+
+def releases_key(version, kind):
+    """Return string identifying the releases of the datasets that the given kind of
+    artefact for the given version is rendered from.
+    """
+
+    datasets = [dataset_for_coding_system(version.coding_system_id)]
+    if kind == "dmd":
+        datasets.extend(["coding_systems.dmd", "mappings.bnfdmd"])
+    return ",".join(
+        str(DatasetRelease.objects.current_key(dataset)) for dataset in datasets
+    )
+
+
+def render(version, kind):
+    """Return the content of the given kind of artefact for the given version."""
+
+    if kind == "csv":
+        return "".join(version.iter_csv_data_for_download())
+    elif kind == "definition":
+        return version.definition_csv_data_for_download()
+    elif kind == "dmd":
+        return "".join(version.iter_dmd_csv_data_for_download())
+    else:
+        assert False, kind
+
+
+def write(content):
+    """Write content to a file named by its digest, if there isn't already such a file,
+    and return the digest.
+    """
+
+    data = content.encode("utf8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = path_for_digest(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return digest
+
+
+def path_for_digest(digest):
+    return os.path.join(settings.CODELIST_ARTEFACTS_DIR, digest[:2], f"{digest}.csv")
+
+
+def get_artefact(version, kind):
+    """Return the given kind of Artefact for the given version, if it has been rendered
+    from the current releases, and its file exists.  Otherwise return None.
+    """
+
+    artefact = version.artefacts.filter(
+        kind=kind, releases=releases_key(version, kind)
+    ).first()
+    if artefact is None or not os.path.exists(path_for_digest(artefact.digest)):
+        return None
+    return artefact
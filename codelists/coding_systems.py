@@ -6,6 +6,11 @@ from django.conf import settings
 
 CODING_SYSTEMS = {}
 
+# Codelists may use a coding system id that refers to a variant of another coding
+# system, whose data is imported as part of that coding system.  Codelists using
+# "ctv3tpp" (CTV3 with TPP's extensions) are built from the "ctv3" coding system.
+VARIANTS = {"ctv3tpp": "ctv3"}
+
 for path in glob.glob(
     os.path.join(settings.BASE_DIR, "coding_systems", "*", "coding_system.py")
 ):
@@ -13,3 +18,11 @@ for path in glob.glob(
     mod = import_module(f"coding_systems.{coding_system_id}.coding_system")
     mod.id = coding_system_id
     CODING_SYSTEMS[coding_system_id] = mod
+
+
+def dataset_for_coding_system(coding_system_id):
+    """Return the name of the dataset that the given coding system's data is imported
+    as, and so the name that its releases are recorded under.
+    """
+
+    return f"coding_systems.{VARIANTS.get(coding_system_id, coding_system_id)}"
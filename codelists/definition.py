@@ -82,7 +82,7 @@ class Definition:
 
         rules = []
 
-        for ancestor in hierarchy.filter_to_ultimate_ancestors(codes):
+        for ancestor in hierarchy.ultimate_ancestors(codes):
             descendants = hierarchy.descendants(ancestor)
 
             if len(descendants) == 0:
@@ -43,7 +43,24 @@ class Definition2:
 
     @classmethod
     def from_codes(cls, codes, hierarchy):
-        """Build a Definition2 from a set of codes."""
+        """Build a Definition2 from a set of codes.
+
+        This gives the same result as _from_codes_with_sets(), but rather than working
+        with sets of codes, it works with sets of integer node ids, represented as bits
+        of Python ints.  Differences, intersections and subset tests are then single
+        operations over machine words, which makes this much faster for large
+        codelists.
+        """
+
+        return _IndexedHierarchy(hierarchy).definition_from_codes(cls, set(codes))
+
+    @classmethod
+    def _from_codes_with_sets(cls, codes, hierarchy):
+        """Build a Definition2 from a set of codes, working with sets of codes.
+
+        This is the reference implementation of from_codes(), against which it is
+        tested.
+        """
 
         explicitly_included = set()
         explicitly_excluded = set()
@@ -53,7 +70,7 @@ class Definition2:
             handling excluded descendants of these ancestors to excluding_helper.
             """
 
-            for ancestor in hierarchy.filter_to_ultimate_ancestors(included_codes):
+            for ancestor in hierarchy.ultimate_ancestors(included_codes):
                 explicitly_included.add(ancestor)
                 descendants = hierarchy.descendants(ancestor)
 
@@ -67,7 +84,7 @@ class Definition2:
             handling included descendants of these ancestors to including_helper.
             """
 
-            for ancestor in hierarchy.filter_to_ultimate_ancestors(excluded_codes):
+            for ancestor in hierarchy.ultimate_ancestors(excluded_codes):
                 explicitly_excluded.add(ancestor)
                 descendants = hierarchy.descendants(ancestor)
 
@@ -83,13 +100,9 @@ class Definition2:
     def codes(self, hierarchy):
         """Return the codes defined by this Definition2."""
 
+        node_to_status = self.node_statuses(hierarchy)
         return {
-            node
-            for node in hierarchy.nodes
-            if hierarchy.node_status(
-                node, self.explicitly_included, self.explicitly_excluded
-            )
-            in ["+", "(+)"]
+            node for node in hierarchy.nodes if node_to_status[node] in ["+", "(+)"]
         }
 
     def tree(self, hierarchy):
@@ -101,7 +114,7 @@ class Definition2:
 
         def including_helper(included_codes, excluded_codes):
             tree = {}
-            for ancestor in hierarchy.filter_to_ultimate_ancestors(included_codes):
+            for ancestor in hierarchy.ultimate_ancestors(included_codes):
                 descendants = hierarchy.descendants(ancestor)
                 tree[(ancestor, "+")] = excluding_helper(
                     descendants & included_codes, descendants & excluded_codes
@@ -110,7 +123,7 @@ class Definition2:
 
         def excluding_helper(included_codes, excluded_codes):
             tree = {}
-            for ancestor in hierarchy.filter_to_ultimate_ancestors(excluded_codes):
+            for ancestor in hierarchy.ultimate_ancestors(excluded_codes):
                 descendants = hierarchy.descendants(ancestor)
                 tree[(ancestor, "-")] = including_helper(
                     descendants & included_codes, descendants & excluded_codes
@@ -141,7 +154,7 @@ class Definition2:
         all_codes = set()
         included_codes = self.codes(hierarchy)
 
-        for ancestor_code in hierarchy.filter_to_ultimate_ancestors(included_codes):
+        for ancestor_code in hierarchy.ultimate_ancestors(included_codes):
             all_codes.add(ancestor_code)
             all_codes |= hierarchy.descendants(ancestor_code)
 
@@ -152,9 +165,121 @@ class Definition2:
         and their descendants.
         """
 
+        node_to_status = self.node_statuses(hierarchy)
         return {
-            code: hierarchy.node_status(
-                code, self.explicitly_included, self.explicitly_excluded
-            )
-            for code in self.all_related_codes(hierarchy)
+            code: node_to_status[code] for code in self.all_related_codes(hierarchy)
         }
+
+    def node_statuses(self, hierarchy):
+        """Return mapping from each node in hierarchy to its status."""
+
+        return hierarchy.node_statuses(
+            self.explicitly_included, self.explicitly_excluded
+        )
+
+
+class _IndexedHierarchy:
+    """A view of a Hierarchy in which nodes are identified by their integer ids, and
+    sets of nodes are represented by bitsets, for use by Definition2.from_codes().
+
+    The ids, and the bitsets of each node's descendants, belong to the Hierarchy (see
+    Hierarchy.node_ids and Hierarchy.descendant_bits()), and so are shared by every call
+    to from_codes() with the same Hierarchy.
+    """
+
+    def __init__(self, hierarchy):
+        self.hierarchy = hierarchy
+
+    def definition_from_codes(self, cls, codes):
+        """Build an instance of cls (a Definition2) from a set of codes.
+
+        See Definition2._from_codes_with_sets() for the algorithm that this follows.
+        """
+
+        hierarchy = self.hierarchy
+        explicitly_included = set()
+        explicitly_excluded = set()
+
+        # Codes without any edges have no id.  They have no ancestors or descendants,
+        # so each is explicitly included.
+        node_ids = hierarchy.node_ids
+        explicitly_included_ids = set()
+        explicitly_excluded_ids = set()
+        codes_in_hierarchy = set()
+        for code in codes:
+            if code in node_ids:
+                codes_in_hierarchy.add(code)
+            else:
+                explicitly_included.add(code)
+
+        def including_helper(included_bits, ancestor_ids):
+            for ancestor_id in ancestor_ids:
+                explicitly_included_ids.add(ancestor_id)
+                descendant_bits, descendant_ids = hierarchy.descendant_bits(ancestor_id)
+                excluded_bits = descendant_bits & ~included_bits
+                if excluded_bits:
+                    excluding_helper(
+                        excluded_bits,
+                        self.ultimate_ancestor_ids(excluded_bits, descendant_ids),
+                    )
+
+        def excluding_helper(excluded_bits, ancestor_ids):
+            for ancestor_id in ancestor_ids:
+                explicitly_excluded_ids.add(ancestor_id)
+                descendant_bits, descendant_ids = hierarchy.descendant_bits(ancestor_id)
+                included_bits = descendant_bits & ~excluded_bits
+                if included_bits:
+                    including_helper(
+                        included_bits,
+                        self.ultimate_ancestor_ids(included_bits, descendant_ids),
+                    )
+
+        # Only the nodes below the given codes are visited when finding their ultimate
+        # ancestors, rather than every node in the hierarchy.
+        including_helper(
+            hierarchy.to_bits([node_ids[code] for code in codes_in_hierarchy]),
+            sorted(
+                node_ids[code]
+                for code in hierarchy.ultimate_ancestors(codes_in_hierarchy)
+            ),
+        )
+
+        nodes = hierarchy.topological_order
+        explicitly_included |= {nodes[ix] for ix in explicitly_included_ids}
+        explicitly_excluded |= {nodes[ix] for ix in explicitly_excluded_ids}
+        return cls(explicitly_included, explicitly_excluded)
+
+    def ultimate_ancestor_ids(self, bits, candidate_ids):
+        """Return the ids of the nodes in the given bitset which have no ancestors in
+        the bitset.
+
+        candidate_ids must be in increasing order, and must include every node in the
+        bitset, along with every node on a path between any two nodes in the bitset.
+        We walk these nodes from the top down, marking each node that has an ancestor in
+        the bitset.
+        """
+
+        # Testing a single bit of a Python int takes time proportional to the size of
+        # the int, so we convert the bitset to bytes, in which a bit can be tested in
+        # constant time.
+        members = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        num_members_bytes = len(members)
+
+        def is_member(node_id):
+            ix = node_id >> 3
+            return ix < num_members_bytes and members[ix] >> (node_id & 7) & 1
+
+        parent_ids = self.hierarchy.parent_ids
+        has_ancestor_in_set = set()
+        ultimate_ancestor_ids = []
+
+        for node_id in candidate_ids:
+            for parent_id in parent_ids[node_id]:
+                if parent_id in has_ancestor_in_set or is_member(parent_id):
+                    has_ancestor_in_set.add(node_id)
+                    break
+            else:
+                if is_member(node_id):
+                    ultimate_ancestor_ids.append(node_id)
+
+        return ultimate_ancestor_ids
@@ -0,0 +1,408 @@
+"""Process-wide, read-only graphs of the hierarchies of whole coding systems.
+
+Building a Hierarchy for a set of codes requires finding all of the codes' ancestors and
+descendants, which involves recursive queries against the database.  For large codelists
+this is slow, and since we do it on most page loads, we do it a lot.
+
+Instead, each process can load the whole of a coding system's hierarchy into memory
+once, and then slice the edges that a Hierarchy needs out of that.
+
+To keep memory usage down, nodes are identified by integers, and each node's parents
+and children are stored in flat arrays of integers, in compressed sparse row format.
+That is, the children of the node with id i are:
+
+    child_ids[child_offsets[i]:child_offsets[i + 1]]
+
+A graph is associated with the release of the coding system that it was loaded from,
+and is reloaded if a newer release has since been imported.  A graph file written
+before any release of the coding system was recorded is never used, since we can't tell
+whether it is up to date.
+
+Since each web worker is a separate process, a graph loaded from the database is
+duplicated in each worker.  To avoid this, a graph can be written to a file in
+HIERARCHY_GRAPHS_DIR.  The import_data command rewrites a coding system's file after
+each import, and the build_hierarchy_graphs command writes files on demand.  The file is then mapped into
+memory by each worker, so that all workers share a single copy in the OS's page cache,
+and loading a graph is near-instant.
+
+A graph file has the following layout, where all integers are little-endian, and each
+section is padded to a multiple of four bytes:
+
+    header: magic (8 bytes), format version (uint32), number of nodes (uint32),
+            number of edges (uint32), release key (int64, -1 if unknown)
+    code_offsets: (num_nodes + 1) * uint32, into code_data
+    code_data: the sorted codes, as concatenated UTF-8 strings
+    child_offsets: (num_nodes + 1) * int32
+    child_ids: num_edges * int32
+    parent_offsets: (num_nodes + 1) * int32
+    parent_ids: num_edges * int32
+"""
+
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+
+import structlog
+from django.conf import settings
+
+from opencodelists.models import DatasetRelease
+
+logger = structlog.get_logger()
+
+MAGIC = b"OCLGRAPH"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIIq")
+
+# Map from a coding system's id to a tuple of (release key, graph)
+_graphs = {}
+_lock = threading.Lock()
+
+
+class Graph:
+    """A read-only directed acyclic graph of every concept in a coding system."""
+
+    def __init__(self, codes, child_offsets, child_ids, parent_offsets, parent_ids):
+        """`codes` must be sorted, since a node's id is its code's position in `codes`.
+
+        See the module docstring for the meaning of the other arguments.
+        """
+
+        self.codes = codes
+        self.child_offsets = child_offsets
+        self.child_ids = child_ids
+        self.parent_offsets = parent_offsets
+        self.parent_ids = parent_ids
+
+    @classmethod
+    def from_relationships(cls, relationships):
+        """Build a graph from an iterable of (parent, child) tuples."""
+
+        relationships = list(relationships)
+        codes = sorted({code for edge in relationships for code in edge})
+        code_to_id = {code: ix for ix, code in enumerate(codes)}
+        edges = [
+            (code_to_id[parent], code_to_id[child]) for parent, child in relationships
+        ]
+
+        child_offsets, child_ids = _build_csr(len(codes), edges)
+        parent_offsets, parent_ids = _build_csr(
+            len(codes), [(child, parent) for parent, child in edges]
+        )
+
+        return cls(codes, child_offsets, child_ids, parent_offsets, parent_ids)
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a graph from a file written by write(), by mapping it into memory.
+
+        Returns a tuple of (release key, graph).
+        """
+
+        with open(path, "rb") as f:
+            num_nodes, num_edges, release_key = _read_header(f, path)
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(buf)
+        offset = HEADER.size
+
+        def read_section(num_bytes, fmt):
+            nonlocal offset
+            start, end = offset, offset + num_bytes
+            offset += _padded(num_bytes)
+            section = view[start:end]
+            return _from_little_endian_bytes(section, fmt) if fmt else section
+
+        code_offsets = read_section(4 * (num_nodes + 1), "I")
+        code_data = read_section(code_offsets[-1], None)
+        child_offsets = read_section(4 * (num_nodes + 1), "i")
+        child_ids = read_section(4 * num_edges, "i")
+        parent_offsets = read_section(4 * (num_nodes + 1), "i")
+        parent_ids = read_section(4 * num_edges, "i")
+
+        codes = _CodeTable(code_offsets, code_data)
+        graph = cls(codes, child_offsets, child_ids, parent_offsets, parent_ids)
+        return release_key, graph
+
+    @staticmethod
+    def read_release_key(path):
+        """Return the release key of a file written by write(), without mapping the
+        file into memory.
+        """
+
+        with open(path, "rb") as f:
+            _, _, release_key = _read_header(f, path)
+        return release_key
+
+    def write(self, path, release_key):
+        """Write graph to a file that can be loaded with from_file().
+
+        The file is written alongside its final location and then moved into place, so
+        that processes that have the previous version mapped into memory are not
+        affected.
+        """
+
+        encoded_codes = [code.encode("utf8") for code in self.codes]
+        code_offsets = array("I", [0])
+        for code in encoded_codes:
+            code_offsets.append(code_offsets[-1] + len(code))
+
+        sections = [
+            code_offsets,
+            b"".join(encoded_codes),
+            self.child_offsets,
+            self.child_ids,
+            self.parent_offsets,
+            self.parent_ids,
+        ]
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(
+                HEADER.pack(
+                    MAGIC,
+                    FORMAT_VERSION,
+                    len(self.codes),
+                    len(self.child_ids),
+                    -1 if release_key is None else release_key,
+                )
+            )
+            for section in sections:
+                data = _to_little_endian_bytes(section)
+                f.write(data)
+                f.write(b"\0" * (_padded(len(data)) - len(data)))
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def code_to_id(self, code):
+        """Return the id of the node with the given code, or None if there is no such
+        node.
+        """
+
+        ix = bisect_left(self.codes, code)
+        if ix < len(self.codes) and self.codes[ix] == code:
+            return ix
+        return None
+
+    def children(self, node_id):
+        start, end = self.child_offsets[node_id], self.child_offsets[node_id + 1]
+        return self.child_ids[start:end]
+
+    def parents(self, node_id):
+        start, end = self.parent_offsets[node_id], self.parent_offsets[node_id + 1]
+        return self.parent_ids[start:end]
+
+    def relationships(self, codes):
+        """Return set of (parent, child) tuples for every relationship between each of
+        the given codes and their ancestors and descendants.
+
+        This is equivalent to combining the results of a coding system's
+        ancestor_relationships() and descendant_relationships().  Codes that are not in
+        the graph are ignored.
+        """
+
+        seed_ids = {self.code_to_id(code) for code in codes} - {None}
+        edges = set()
+        self._walk(seed_ids, self.parents, lambda node_id, p: edges.add((p, node_id)))
+        self._walk(seed_ids, self.children, lambda node_id, c: edges.add((node_id, c)))
+        return {(self.codes[p], self.codes[c]) for p, c in edges}
+
+    def _walk(self, seed_ids, neighbours, visit_edge):
+        """Walk the graph from the given nodes, following `neighbours`, and calling
+        `visit_edge` for each edge that is traversed.
+        """
+
+        seen = set(seed_ids)
+        todo = list(seed_ids)
+        while todo:
+            node_id = todo.pop()
+            for neighbour_id in neighbours(node_id):
+                visit_edge(node_id, neighbour_id)
+                if neighbour_id not in seen:
+                    seen.add(neighbour_id)
+                    todo.append(neighbour_id)
+
+
+class _CodeTable:
+    """A read-only sequence of the codes in a graph file, which decodes each code when
+    it is accessed.
+
+    This avoids building a list of every code when a graph file is loaded.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, ix):
+        start, end = self.offsets[ix], self.offsets[ix + 1]
+        return str(self.data[start:end], "utf8")
+
+
+def _read_header(f, path):
+    """Read the header of a graph file from f, and return a tuple of (number of nodes,
+    number of edges, release key).
+    """
+
+    header = f.read(HEADER.size)
+    if len(header) != HEADER.size:
+        raise ValueError(f"{path} is not a graph file in the expected format")
+    magic, version, num_nodes, num_edges, release_key = HEADER.unpack(header)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a graph file in the expected format")
+    return num_nodes, num_edges, (None if release_key == -1 else release_key)
+
+
+def _padded(num_bytes):
+    return (num_bytes + 3) // 4 * 4
+
+
+def _to_little_endian_bytes(section):
+    if isinstance(section, bytes):
+        return section
+    assert section.itemsize == 4, section.typecode
+    if sys.byteorder != "little":
+        section = array(section.typecode, section)
+        section.byteswap()
+    return section.tobytes()
+
+
+def _from_little_endian_bytes(section, typecode):
+    """Return a sequence of the 4-byte little-endian integers in section.
+
+    On little-endian platforms, this is a view on section, so that the data is not
+    copied.  Otherwise, the integers are copied into an array and byte-swapped.
+    """
+
+    assert array(typecode).itemsize == 4, typecode
+    if sys.byteorder == "little":
+        return section.cast(typecode)
+
+    values = array(typecode)
+    values.frombytes(section)
+    values.byteswap()
+    return values
+
+
+def graph_path(coding_system_id):
+    """Return path to the graph file for the given coding system."""
+
+    return os.path.join(settings.HIERARCHY_GRAPHS_DIR, f"{coding_system_id}.graph")
+
+
+def write_graph(coding_system):
+    """Load the graph of the given coding system from the database, and write it to
+    the coding system's graph file.
+    """
+
+    release_key = current_release_key(coding_system)
+    graph = Graph.from_relationships(coding_system.all_relationships())
+    os.makedirs(settings.HIERARCHY_GRAPHS_DIR, exist_ok=True)
+    path = graph_path(coding_system.id)
+    graph.write(path, release_key)
+    logger.info(
+        "Wrote hierarchy graph",
+        coding_system_id=coding_system.id,
+        path=path,
+        num_nodes=len(graph),
+    )
+    return path
+
+
+def _build_csr(num_nodes, edges):
+    """Return arrays of offsets and ids representing the given (source, target) edges,
+    in compressed sparse row format.
+    """
+
+    counts = [0] * num_nodes
+    for source, _ in edges:
+        counts[source] += 1
+
+    offsets = array("i", [0] * (num_nodes + 1))
+    for ix, count in enumerate(counts):
+        offsets[ix + 1] = offsets[ix] + count
+
+    ids = array("i", [0] * len(edges))
+    positions = list(offsets[:-1])
+    for source, target in sorted(edges):
+        ids[positions[source]] = target
+        positions[source] += 1
+
+    return offsets, ids
+
+
+def get_graph(coding_system):
+    """Return the graph of the given coding system, loading it if it has not yet been
+    loaded in this process, or if a new release has been imported since it was loaded.
+    """
+
+    release_key = current_release_key(coding_system)
+
+    with _lock:
+        if coding_system.id in _graphs:
+            loaded_release_key, graph = _graphs[coding_system.id]
+            if loaded_release_key == release_key:
+                return graph
+
+        graph = _load_graph_from_file(coding_system, release_key)
+        if graph is None:
+            graph = Graph.from_relationships(coding_system.all_relationships())
+        _graphs[coding_system.id] = (release_key, graph)
+        return graph
+
+
+def _load_graph_from_file(coding_system, release_key):
+    """Return the graph in the coding system's graph file, if there is one and it was
+    built from the given release.  Otherwise return None.
+    """
+
+    path = graph_path(coding_system.id)
+    if not os.path.exists(path):
+        return None
+
+    # We check the file's release key before mapping the file, so that a stale file is
+    # never mapped into memory.  A graph file from an unknown release may be from any
+    # release, so it is stale.
+    file_release_key = Graph.read_release_key(path)
+    if file_release_key is None or file_release_key != release_key:
+        logger.warning(
+            "Ignoring stale hierarchy graph",
+            coding_system_id=coding_system.id,
+            path=path,
+        )
+        return None
+
+    _, graph = Graph.from_file(path)
+    return graph
+
+
+def current_release_key(coding_system):
+    """Return key identifying the current release of the given coding system."""
+
+    return DatasetRelease.objects.current_key(f"coding_systems.{coding_system.id}")
+
+
+def has_graph(coding_system):
+    """Return whether a graph can be loaded for the given coding system."""
+
+    return hasattr(coding_system, "all_relationships")
+
+
+def invalidate(coding_system_id=None):
+    """Discard the loaded graph for the given coding system, or for all coding systems
+    if none is given.
+    """
+
+    with _lock:
+        if coding_system_id is None:
+            _graphs.clear()
+        else:
+            _graphs.pop(coding_system_id, None)
@@ -1,9 +1,16 @@
-from collections import defaultdict
-from functools import lru_cache
+import heapq
+from collections import OrderedDict, defaultdict
 from itertools import chain
 
+from django.conf import settings
 from django.utils.functional import cached_property
 
+from . import graphs
+
+# The maximum total number of nodes in the sets of ancestors and descendants that each
+# Hierarchy caches.
+CLOSURE_CACHE_MAX_SIZE = 1_000_000
+
 
 class Hierarchy:
     """A directed acyclic graph with a single root.  This is used to represent a subset
@@ -17,17 +24,25 @@ class Hierarchy:
 
         self.root = root
         self.edges = edges
+        self._closure_cache = _ClosureCache(CLOSURE_CACHE_MAX_SIZE)
 
     @classmethod
     def from_codes(cls, coding_system, codes):
         """Build a hierarchy containing the given codes, and their ancestors/descendants
         in the coding system.
+
+        If enabled, the relevant edges are taken from this process's in-memory graph of
+        the whole coding system, rather than being queried from the database.
         """
 
         if isinstance(codes, str):
             msg = "Hierarchy was expecting codes to be a non-string iterable, you passed a string."
             raise TypeError(msg)
 
+        if settings.HIERARCHY_GRAPHS_ENABLED and graphs.has_graph(coding_system):
+            edges = graphs.get_graph(coding_system).relationships(codes)
+            return cls(coding_system.root, edges)
+
         ancestor_relationships = set(coding_system.ancestor_relationships(codes))
         descendant_relationships = set(coding_system.descendant_relationships(codes))
         edges = ancestor_relationships | descendant_relationships
@@ -56,35 +71,171 @@ class Hierarchy:
             m[child].add(parent)
         return dict(m)
 
-    @lru_cache(maxsize=None)
+    @cached_property
+    def topological_order(self):
+        """List of nodes in graph, ordered so that each node comes after all of its
+        parents.
+        """
+
+        num_unvisited_parents = {
+            node: len(parents) for node, parents in self.parent_map.items()
+        }
+        todo = [node for node in self.nodes if node not in self.parent_map]
+        order = []
+
+        while todo:
+            node = todo.pop()
+            order.append(node)
+            for child in self.child_map.get(node, []):
+                num_unvisited_parents[child] -= 1
+                if num_unvisited_parents[child] == 0:
+                    todo.append(child)
+
+        assert len(order) == len(self.nodes), "Hierarchy contains a cycle"
+        return order
+
+    @cached_property
+    def node_ids(self):
+        """Dict mapping each node to an integer id.
+
+        Ids are positions in topological_order, so that each node has a larger id than
+        any of its ancestors.  They are used to index child_ids and parent_ids, and as
+        bit positions in the bitsets returned by to_bits() and descendant_bits().
+
+        Nodes without any edges are not in topological_order, and so have no id.
+        """
+
+        return {node: ix for ix, node in enumerate(self.topological_order)}
+
+    @cached_property
+    def child_ids(self):
+        """List of tuples of the ids of each node's immediate children, indexed by id."""
+
+        return self._neighbour_ids(self.child_map)
+
+    @cached_property
+    def parent_ids(self):
+        """List of tuples of the ids of each node's immediate parents, indexed by id."""
+
+        return self._neighbour_ids(self.parent_map)
+
+    def _neighbour_ids(self, neighbour_map):
+        node_ids = self.node_ids
+        return [
+            tuple(node_ids[neighbour] for neighbour in neighbour_map.get(node, ()))
+            for node in self.topological_order
+        ]
+
     def descendants(self, node):
         """Return set of descendants of node.
 
         A node's descendants are the node's children, plus all the children's
         descendants.
+
+        The returned set is cached, and so must not be modified.
         """
 
-        descendants = set()
-        for child in self.child_map.get(node, []):
-            descendants.add(child)
-            descendants |= self.descendants(child)
-        return descendants
+        return self._closure(node, self.child_ids)
 
-    @lru_cache(maxsize=None)
     def ancestors(self, node):
         """Return set of ancestors of node.
 
         A node's ancestors are the node's parents, plus all the parents' ancestors.
+
+        The returned set is cached, and so must not be modified.
+        """
+
+        return self._closure(node, self.parent_ids)
+
+    def _closure(self, node, neighbour_ids):
+        """Return set of nodes reachable from node by repeatedly following edges given
+        by neighbour_ids (which is either self.child_ids or self.parent_ids).
+
+        Rather than recursing (which risks hitting Python's recursion limit for deep
+        hierarchies) we walk the graph iteratively.  Results are kept in a cache which
+        belongs to this Hierarchy and which is bounded in size, so that the memory used
+        by a Hierarchy is limited, and is freed when the Hierarchy is.
+        """
+
+        key = (node, neighbour_ids is self.child_ids)
+        closure = self._closure_cache.get(key)
+        if closure is not None:
+            return closure
+
+        node_id = self.node_ids.get(node)
+        if node_id is None:
+            # This node is not in the hierarchy, or has no edges
+            closure = set()
+        else:
+            nodes = self.topological_order
+            closure = {nodes[ix] for ix in _reachable_ids(node_id, neighbour_ids)}
+
+        self._closure_cache.set(key, closure)
+        return closure
+
+    def descendant_bits(self, node_id):
+        """Return the descendants of the node with the given id, as a tuple of a bitset
+        (see to_bits()) and a list of ids in increasing order.
+
+        The returned list is cached alongside descendants(), and so must not be
+        modified.
+        """
+
+        key = ("descendant_bits", node_id)
+        value = self._closure_cache.get(key)
+        if value is not None:
+            return value
+
+        ids = sorted(_reachable_ids(node_id, self.child_ids))
+        bits = self.to_bits(ids)
+        value = (bits, ids)
+        # A bitset takes space proportional to the largest id in it, however few ids
+        # it contains, so it is charged by its length as well
+        self._closure_cache.set(key, value, size=len(ids) + bits.bit_length())
+        return value
+
+    @staticmethod
+    def to_bits(node_ids):
+        """Return bitset of the given node ids, in which bit i is set if the node with
+        id i is in node_ids.
+        """
+
+        if not node_ids:
+            return 0
+        buf = bytearray(max(node_ids) // 8 + 1)
+        for node_id in node_ids:
+            buf[node_id >> 3] |= 1 << (node_id & 7)
+        return int.from_bytes(buf, "little")
+
+    def ultimate_ancestors(self, nodes):
+        """Given a set of nodes, return subset which have no ancestors in the set.
+
+        Rather than finding the ancestors of each node (which is O(n * |ancestors|)), we
+        walk down the hierarchy from the given nodes, marking every node that we reach.
+        A node has an ancestor in the set if and only if it is marked, and since each
+        node is only visited once, the cost is linear in the number of edges below the
+        given nodes.
         """
 
-        ancestors = set()
-        for parent in self.parent_map.get(node, []):
-            ancestors.add(parent)
-            ancestors |= self.ancestors(parent)
-        return ancestors
+        node_ids = self.node_ids
+        child_ids = self.child_ids
+
+        marked = set()
+        todo = [node_ids[node] for node in nodes if node in node_ids]
+        while todo:
+            for child_id in child_ids[todo.pop()]:
+                if child_id not in marked:
+                    marked.add(child_id)
+                    todo.append(child_id)
+
+        return {node for node in nodes if node_ids.get(node) not in marked}
 
     def filter_to_ultimate_ancestors(self, nodes):
-        """Given a set of nodes, return subset which have no ancestors in the set."""
+        """Given a set of nodes, return subset which have no ancestors in the set.
+
+        This gives the same result as ultimate_ancestors(), which should be preferred,
+        since it is much faster for large sets of nodes.
+        """
 
         return {node for node in nodes if not self.ancestors(node) & nodes}
 
@@ -110,32 +261,181 @@ class Hierarchy:
                 included or excluded
         """
 
-        included = {node for node, status in node_to_status.items() if status == "+"}
-        excluded = {node for node, status in node_to_status.items() if status == "-"}
-
-        assert included & excluded == set()
-
-        for node, status in updates:
-            if node in included:
-                included.remove(node)
-            if node in excluded:
-                excluded.remove(node)
-
-            if status == "+":
-                included.add(node)
-            if status == "-":
-                excluded.add(node)
-
-        assert included & excluded == set()
+        included, excluded = _apply_updates(node_to_status, updates)
 
         nodes_to_update = set()
         for node, status in updates:
             nodes_to_update.add(node)
             nodes_to_update |= self.descendants(node)
 
-        return {
-            node: self.node_status(node, included, excluded) for node in nodes_to_update
-        }
+        node_to_status = self.node_statuses(included, excluded)
+        return {node: node_to_status.get(node, "?") for node in nodes_to_update}
+
+    def changed_node_statuses(self, node_to_status, updates):
+        """Given a mapping from each node to its status and a list of updates, return a
+        mapping from each node whose status has changed to its new status.
+
+        See update_node_to_status() for the meanings of statuses and updates.
+
+        Rather than recomputing the status of every descendant of each updated node, we
+        walk down the hierarchy from the updated nodes, and only visit a node's children
+        if what the node passes on to them has changed.  A node passes on itself if it is
+        directly included or excluded, and its significant directly included or excluded
+        ancestors (see node_status()) otherwise.  A child's significant ancestors are
+        determined by what its parents pass on.
+        """
+
+        old_included, old_excluded = _apply_updates(node_to_status, [])
+        new_included, new_excluded = _apply_updates(node_to_status, updates)
+        old_marked = old_included | old_excluded
+        new_marked = new_included | new_excluded
+
+        # Maps each visited node to a tuple of what it passes on to its children before
+        # and after the updates
+        node_to_passed_on = {}
+
+        def passed_on(node):
+            if node in node_to_passed_on:
+                return node_to_passed_on[node]
+
+            # This node has not been visited, so nothing that it passes on has changed.
+            if node in new_marked:
+                passed_on = {node}
+            else:
+                passed_on = self._significant_ancestors(node, new_marked)
+            return passed_on, passed_on
+
+        # We visit nodes in topological order, so that a node is only visited once all
+        # of its parents that need to be visited have been.
+        node_ids = self.node_ids
+        todo = []
+        queued = set()
+
+        def enqueue(node):
+            if node not in queued:
+                queued.add(node)
+                heapq.heappush(todo, (node_ids.get(node, -1), node))
+
+        for node, _ in updates:
+            if (node in old_marked, node in old_included) != (
+                node in new_marked,
+                node in new_included,
+            ):
+                enqueue(node)
+
+        changed = {}
+
+        while todo:
+            _, node = heapq.heappop(todo)
+
+            old_from_parents = set()
+            new_from_parents = set()
+            for parent in self.parent_map.get(node, ()):
+                old, new = passed_on(parent)
+                old_from_parents |= old
+                new_from_parents |= new
+
+            old_significant = self._minimal(old_from_parents)
+            new_significant = self._minimal(new_from_parents)
+
+            if node in new_included:
+                status = "+"
+            elif node in new_excluded:
+                status = "-"
+            elif not new_significant:
+                status = "?"
+            else:
+                status = _status_from_significant_ancestors(
+                    new_significant & new_included, new_significant & new_excluded
+                )
+
+            if node_to_status.get(node) != status:
+                changed[node] = status
+
+            old = {node} if node in old_marked else old_significant
+            new = {node} if node in new_marked else new_significant
+            node_to_passed_on[node] = (old, new)
+
+            # What is passed on has changed if either the nodes are different, or if any
+            # of them has switched between being included and being excluded.
+            if old != new or old & old_included != new & new_included:
+                for child in self.child_map.get(node, ()):
+                    enqueue(child)
+
+        return changed
+
+    def _significant_ancestors(self, node, included_or_excluded):
+        """Return the ancestors of node that are directly included or excluded, and that
+        are not overridden by any of their descendants.
+        """
+
+        return self._minimal(self.ancestors(node) & included_or_excluded)
+
+    def _minimal(self, nodes):
+        """Return the subset of nodes which are not ancestors of any others."""
+
+        return nodes.difference(*(self.ancestors(node) for node in nodes))
+
+    def node_statuses(self, included, excluded):
+        """Return mapping from each node to its status, given sets of nodes that are
+        directly included and excluded.
+
+        The mapping contains every node in the hierarchy, and every included or excluded
+        node.  See node_status() for how each node's status is determined.  Calling
+        node_status() for every node is quadratic in the size of the hierarchy, whereas
+        this does a single pass over the hierarchy from the top down.
+
+        As we go, we record each node's directly included or excluded ancestors (which
+        are the union of its parents' directly included or excluded ancestors, plus any
+        parents that are themselves directly included or excluded).  An ancestor is
+        significant if it is not also an ancestor of another of these ancestors.
+        """
+
+        included_or_excluded = included | excluded
+        no_ancestors = frozenset()
+
+        # Maps each node to its ancestors that are directly included or excluded
+        node_to_ancestors = {}
+        node_to_status = {}
+
+        # Nodes without any edges are not in self.topological_order
+        extra_nodes = included_or_excluded - self.nodes
+
+        for node in chain(self.topological_order, extra_nodes):
+            parents = self.parent_map.get(node, ())
+
+            if len(parents) == 1:
+                # This is the common case, and we can avoid creating a new set unless
+                # the parent is itself included or excluded.
+                (parent,) = parents
+                ancestors = node_to_ancestors[parent]
+                if parent in included_or_excluded:
+                    ancestors = ancestors | {parent}
+            else:
+                ancestors = set()
+                for parent in parents:
+                    ancestors |= node_to_ancestors[parent]
+                    if parent in included_or_excluded:
+                        ancestors.add(parent)
+                ancestors = frozenset(ancestors) if ancestors else no_ancestors
+
+            node_to_ancestors[node] = ancestors
+
+            if node in included:
+                node_to_status[node] = "+"
+            elif node in excluded:
+                node_to_status[node] = "-"
+            elif not ancestors:
+                node_to_status[node] = "?"
+            else:
+                significant_ancestors = ancestors.difference(
+                    *(node_to_ancestors[a] for a in ancestors)
+                )
+                node_to_status[node] = _status_from_significant_ancestors(
+                    significant_ancestors & included, significant_ancestors & excluded
+                )
+
+        return node_to_status
 
     def node_status(self, node, included, excluded):
         r"""Return status of node.  See the docstring for update_node_to_status() for
@@ -211,15 +511,107 @@ class Hierarchy:
         # these are the significant excluded ancestors of the node
         excluded_ancestors = significant_included_or_excluded_ancestors & excluded
 
-        if included_ancestors and not excluded_ancestors:
-            # some ancestors are included and none are excluded, so this node is
-            # included
-            return "(+)"
-        if excluded_ancestors and not included_ancestors:
-            # some ancestors are excluded and none are included, so this node is
-            # excluded
-            return "(-)"
+        return _status_from_significant_ancestors(
+            included_ancestors, excluded_ancestors
+        )
+
+
+def _reachable_ids(node_id, neighbour_ids):
+    """Return set of ids of nodes reachable from the node with the given id by
+    repeatedly following edges given by neighbour_ids.
+    """
+
+    seen = set()
+    todo = [node_id]
+    while todo:
+        for neighbour_id in neighbour_ids[todo.pop()]:
+            if neighbour_id not in seen:
+                seen.add(neighbour_id)
+                todo.append(neighbour_id)
+    return seen
+
+
+def _apply_updates(node_to_status, updates):
+    """Return sets of directly included and directly excluded nodes, after applying
+    updates to node_to_status.
+    """
+
+    included = {node for node, status in node_to_status.items() if status == "+"}
+    excluded = {node for node, status in node_to_status.items() if status == "-"}
+
+    assert included & excluded == set()
+
+    for node, status in updates:
+        if node in included:
+            included.remove(node)
+        if node in excluded:
+            excluded.remove(node)
+
+        if status == "+":
+            included.add(node)
+        if status == "-":
+            excluded.add(node)
+
+    assert included & excluded == set()
+
+    return included, excluded
+
+
+def _status_from_significant_ancestors(included_ancestors, excluded_ancestors):
+    """Return status of a node that is neither directly included nor excluded, given
+    its significant included and excluded ancestors.
+    """
+
+    if included_ancestors and not excluded_ancestors:
+        # some ancestors are included and none are excluded, so this node is
+        # included
+        return "(+)"
+    if excluded_ancestors and not included_ancestors:
+        # some ancestors are excluded and none are included, so this node is
+        # excluded
+        return "(-)"
+
+    # some ancestors are included and some are excluded, and neither set of
+    # ancestors overrides the other
+    return "!"
+
+
+class _ClosureCache:
+    """A least-recently-used cache of sets of nodes, bounded by the total size of the
+    sets that it holds.
+
+    A value that is not a set can be cached by giving its size explicitly.  Each entry
+    is charged at least 1, and setting an existing key replaces its entry.
+    """
 
-        # some ancestors are included and some are excluded, and neither set of
-        # ancestors overrides the other
-        return "!"
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        self._data.move_to_end(key)
+        return item[0]
+
+    def set(self, key, value, size=None):
+        # Every entry is charged at least 1, so that empty sets are bounded too
+        if size is None:
+            size = len(value)
+        size = max(size, 1)
+
+        old_item = self._data.pop(key, None)
+        if old_item is not None:
+            self.size -= old_item[1]
+
+        if size > self.max_size:
+            return
+
+        self._data[key] = (value, size)
+        self.size += size
+
+        while self.size > self.max_size:
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.size -= evicted_size
@@ -0,0 +1,42 @@
+"""
+Write the hierarchy graph of each given coding system (or of all coding systems with a
+hierarchy) to a file in HIERARCHY_GRAPHS_DIR, to be shared by all web workers.
+
+The import_data command does this after each import of a coding system's data, so this
+is only needed to build the files for data that was imported some other way.  Until a
+coding system's file is rebuilt, workers ignore the stale file and load the graph from
+the database instead.
+"""
+from django.core.management import BaseCommand, CommandError
+
+from codelists import graphs
+from codelists.coding_systems import CODING_SYSTEMS
+
+
+class Command(BaseCommand):
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "coding_system_ids", nargs="*", help="Coding systems to build graphs for"
+        )
+
+    def handle(self, coding_system_ids, **kwargs):
+        if not coding_system_ids:
+            coding_system_ids = [
+                id
+                for id, coding_system in sorted(CODING_SYSTEMS.items())
+                if graphs.has_graph(coding_system)
+            ]
+
+        for id in coding_system_ids:
+            try:
+                coding_system = CODING_SYSTEMS[id]
+            except KeyError:
+                raise CommandError(f"Unknown coding system: {id}")
+
+            if not graphs.has_graph(coding_system):
+                raise CommandError(f"{id} does not have a hierarchy")
+
+            path = graphs.write_graph(coding_system)
+            self.stdout.write(f"Wrote {path}")
@@ -0,0 +1,41 @@
+"""
+Build the full-text search index of each given coding system (or of all coding systems
+that support one).
+
+Indexes are rebuilt when a coding system's data is imported, so this only needs to be
+run for data that was imported some other way.  Until a coding system's index is built,
+searches fall back to scanning every term.
+"""
+from django.core.management import BaseCommand, CommandError
+
+from codelists import search_index
+from codelists.coding_systems import CODING_SYSTEMS
+
+
+class Command(BaseCommand):
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "coding_system_ids", nargs="*", help="Coding systems to build indexes for"
+        )
+
+    def handle(self, coding_system_ids, **kwargs):
+        if not coding_system_ids:
+            coding_system_ids = [
+                id
+                for id, coding_system in sorted(CODING_SYSTEMS.items())
+                if search_index.has_index(coding_system)
+            ]
+
+        for id in coding_system_ids:
+            try:
+                coding_system = CODING_SYSTEMS[id]
+            except KeyError:
+                raise CommandError(f"Unknown coding system: {id}")
+
+            if not search_index.has_index(coding_system):
+                raise CommandError(f"{id} does not support a search index")
+
+            num_rows = search_index.build_index(coding_system)
+            self.stdout.write(f"Indexed {num_rows} terms for {id}")
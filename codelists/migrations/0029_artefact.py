@@ -0,0 +1,28 @@
+# Generated by Django 3.1.5 on 2026-10-18 19:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('codelists', '0028_collaboration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Artefact',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('releases', models.CharField(max_length=255)),
+                ('digest', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='artefacts', to='codelists.codelistversion')),
+            ],
+            options={
+                'unique_together': {('version', 'kind', 'releases')},
+            },
+        ),
+    ]
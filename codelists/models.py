@@ -1,13 +1,17 @@
+from itertools import chain
+
 from django.db import models
 from django.urls import reverse
 from django.utils.functional import cached_property
 
-from mappings.bnfdmd.mappers import bnf_to_dmd
+from mappings.bnfdmd.mappers import bnf_to_dmd, iter_bnf_to_dmd
 from opencodelists.csv_utils import (
     csv_data_to_rows,
     dict_rows_to_csv_data,
+    iter_csv_data,
     rows_to_csv_data,
 )
+from opencodelists.db_utils import chunks
 from opencodelists.hash_utils import hash, unhash
 
 from .coding_systems import CODING_SYSTEMS
@@ -199,6 +203,11 @@ class CodelistVersion(models.Model):
             f"codelists:{self.codelist_type}_version_create", kwargs=self.url_kwargs
         )
 
+    def get_hierarchy_url(self):
+        return reverse(
+            f"codelists:{self.codelist_type}_version_hierarchy", kwargs=self.url_kwargs
+        )
+
     def get_builder_url(self, view_name, *args):
         return reverse(f"builder:{view_name}", args=[self.hash] + list(args))
 
@@ -247,10 +256,18 @@ class CodelistVersion(models.Model):
         return csv_data_to_rows(self.csv_data)
 
     def _new_style_table(self):
-        code_to_term = self.coding_system.code_to_term(self.codes)
-        rows = [["code", "term"]]
-        rows.extend([code, code_to_term.get(code, "[Unknown]")] for code in self.codes)
-        return rows
+        return list(self._iter_new_style_table(self.codes))
+
+    def _iter_new_style_table(self, codes):
+        """Yield rows of the table for the given codes, looking up their terms in
+        chunks, so that the rows can be streamed.
+        """
+
+        yield ["code", "term"]
+        for chunk in chunks(codes):
+            code_to_term = self.coding_system.code_to_term(chunk)
+            for code in chunk:
+                yield [code, code_to_term.get(code, "[Unknown]")]
 
     @cached_property
     def all_related_codes(self):
@@ -295,11 +312,32 @@ class CodelistVersion(models.Model):
             )
         )
 
+    def _iter_new_style_codes(self):
+        """Yield the same codes as _new_style_codes(), without loading them all into
+        memory.
+        """
+
+        return (
+            self.code_objs.filter(status__in=["+", "(+)"])
+            .order_by("code")
+            .values_list("code", flat=True)
+            .iterator()
+        )
+
     def csv_data_for_download(self):
         if self.csv_data:
             return self.csv_data
         return rows_to_csv_data(self.table)
 
+    def iter_csv_data_for_download(self):
+        """Yield chunks of the same data as csv_data_for_download(), for streaming."""
+
+        if self.csv_data:
+            yield self.csv_data
+        else:
+            rows = self._iter_new_style_table(self._iter_new_style_codes())
+            yield from iter_csv_data(rows)
+
     def definition_csv_data_for_download(self):
         return rows_to_csv_data(present_definition_for_download(self))
 
@@ -308,6 +346,15 @@ class CodelistVersion(models.Model):
         headers = ["dmd_type", "dmd_id", "dmd_name", "bnf_code"]
         return dict_rows_to_csv_data(headers, bnf_to_dmd(self.codes))
 
+    def iter_dmd_csv_data_for_download(self):
+        """Yield chunks of the same data as dmd_csv_data_for_download(), for
+        streaming.
+        """
+
+        assert self.coding_system_id == "bnf"
+        headers = ["dmd_type", "dmd_id", "dmd_name", "bnf_code"]
+        yield from iter_csv_data(chain([headers], iter_bnf_to_dmd(self.codes)))
+
     def download_filename(self):
         if self.codelist_type == "user":
             return "{}-{}-{}".format(
@@ -393,3 +440,25 @@ class Collaboration(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+
+class Artefact(models.Model):
+    """A file for download, rendered from a published CodelistVersion.
+
+    See codelists/artefacts.py.
+    """
+
+    version = models.ForeignKey(
+        "CodelistVersion", on_delete=models.CASCADE, related_name="artefacts"
+    )
+    # One of artefacts.KINDS
+    kind = models.CharField(max_length=20)
+    # Identifies the releases of the datasets that the artefact was rendered from
+    releases = models.CharField(max_length=255)
+    # The SHA-256 digest of the artefact's content, which identifies its file
+    digest = models.CharField(max_length=64)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("version", "kind", "releases")
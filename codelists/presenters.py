@@ -113,3 +113,30 @@ def present_definition_for_download(clv):
     ]
     headers = ["code", "term", "is_included"]
     return [headers] + rows
+
+
+def present_hierarchy(hierarchy, code_to_term):
+    """Return a compact representation of the hierarchy, and of the terms of its codes,
+    which can be serialised as JSON and loaded by static/src/js/hierarchy.js.
+
+    Rather than mapping each code to its parents and to its children, which repeats each
+    code many times, each code appears once, in "codes", and is otherwise referred to by
+    its position in "codes".  Each edge is represented by the positions of its parent
+    and its child, at the same index of "parents" and "children".  The term of each code
+    is at the same index of "terms" (or is null, if the code has no known term).
+
+    Codes in code_to_term that are not in the hierarchy are included, with no edges.
+    """
+
+    codes = sorted(hierarchy.nodes | set(code_to_term))
+    code_to_id = {code: ix for ix, code in enumerate(codes)}
+    edges = sorted(
+        (code_to_id[parent], code_to_id[child]) for parent, child in hierarchy.edges
+    )
+
+    return {
+        "codes": codes,
+        "terms": [code_to_term.get(code) for code in codes],
+        "parents": [parent for parent, _ in edges],
+        "children": [child for _, child in edges],
+    }
@@ -0,0 +1,31 @@
+"""Report how long it takes to look up the terms of 1,000, 10,000, and 100,000 codes in
+a coding system.
+
+./manage.py runscript benchmark_code_to_term --script-args <coding_system_id>
+
+Codes are sampled from the coding system's hierarchy.  If the coding system has fewer
+codes than are needed, every code is used.
+"""
+
+import random
+import time
+
+from codelists import graphs
+from codelists.coding_systems import CODING_SYSTEMS
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def run(coding_system_id):
+    coding_system = CODING_SYSTEMS[coding_system_id]
+    all_codes = list(graphs.get_graph(coding_system).codes)
+
+    for size in SIZES:
+        codes = random.sample(all_codes, min(size, len(all_codes)))
+        start = time.perf_counter()
+        code_to_term = coding_system.code_to_term(codes)
+        duration = time.perf_counter() - start
+        print(
+            f"{len(codes):>7} codes: {duration:.3f}s "
+            f"({len(codes) / duration:,.0f} codes/s, {len(code_to_term)} found)"
+        )
@@ -2,9 +2,19 @@ from .hierarchy import Hierarchy
 
 
 def do_search(coding_system, term):
+    """Search the given coding system for codes matching the given term.
+
+    A code matches if it is the search term, or if one of its terms contains the search
+    term.  This is done by the coding system's search(), which uses the coding system's
+    search index (see search_index.py) if it has been built.
+
+    Returns dict with the set of matching codes, their ultimate ancestors, and all of
+    the ancestors' descendants.
+    """
+
     matching_codes = coding_system.search(term)
     hierarchy = Hierarchy.from_codes(coding_system, matching_codes)
-    ancestor_codes = hierarchy.filter_to_ultimate_ancestors(matching_codes)
+    ancestor_codes = hierarchy.ultimate_ancestors(matching_codes)
 
     all_codes = set(ancestor_codes)
     for code in ancestor_codes:
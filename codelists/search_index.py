@@ -0,0 +1,248 @@
+"""Full-text search indexes over the terms of coding systems.
+
+Searching a coding system's terms with LIKE '%term%' requires scanning every term, which
+for SNOMED CT is slow, and gives no way of ranking the results.
+
+Instead, each coding system that defines search_index_documents() can have two SQLite
+FTS5 tables, which map each of the coding system's codes to each of its terms.  The
+indexes are rebuilt whenever the coding system's data is imported, or with the
+build_search_indexes command.  When an import reports which codes have changed, only
+those codes are reindexed, with update_index().
+
+The first table supports tokenised searches with search().  A search term is split into
+words, and a term matches a code when every word is the prefix of a word in one of the
+code's terms.  Words within double quotes must appear together as a phrase.  For
+instance:
+
+    elbow             matches "Elbow joint inflamed" and "Finding of elbows"
+    tennis elb        matches "Tennis elbow"
+    "joint inflamed"  matches "Elbow joint inflamed" but not "Inflamed joint"
+
+The second table uses the trigram tokenizer, and supports substring searches with
+codes_containing().  This gives the same results as LIKE '%term%', for search terms of
+at least three characters, without scanning every term.  Each coding system's search()
+uses codes_containing(), and so this is the table that the builder's searches use (see
+codelists/search.py).
+"""
+
+import re
+
+import structlog
+from django.db import connection, transaction
+
+from opencodelists.db_utils import temp_table
+
+logger = structlog.get_logger()
+
+# The number of rows inserted by each statement when building an index
+BATCH_SIZE = 10000
+
+
+def has_index(coding_system):
+    """Return whether a search index can be built for the given coding system."""
+
+    return hasattr(coding_system, "search_index_documents")
+
+
+def is_built(coding_system):
+    """Return whether the search index for the given coding system has been built."""
+
+    if not has_index(coding_system):
+        return False
+
+    return _table_exists(_table_name(coding_system.id))
+
+
+def build_index(coding_system):
+    """Build the search index for the given coding system, replacing any existing
+    index.
+
+    Returns the number of (code, term) pairs that were indexed.
+    """
+
+    tables_and_tokenizers = [
+        (_table_name(coding_system.id), "unicode61 remove_diacritics 2"),
+        (_trigram_table_name(coding_system.id), "trigram"),
+    ]
+
+    with transaction.atomic(), connection.cursor() as c:
+        for table, tokenizer in tables_and_tokenizers:
+            c.execute(f"DROP TABLE IF EXISTS {table}")
+            c.execute(
+                f"""
+                CREATE VIRTUAL TABLE {table} USING fts5(
+                    code UNINDEXED,
+                    term,
+                    tokenize = '{tokenizer}'
+                )
+                """
+            )
+
+        tables = [table for table, _ in tables_and_tokenizers]
+        num_rows = _insert_documents(c, tables, coding_system.search_index_documents())
+
+        # Merge each index's b-trees, since the index only changes a little between
+        # rebuilds.
+        for table in tables:
+            c.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+
+    logger.info(
+        "Built search index", coding_system_id=coding_system.id, num_rows=num_rows
+    )
+    return num_rows
+
+
+def update_index(coding_system, codes):
+    """Reindex the given codes in the search index for the given coding system.
+
+    The coding system's search_index_documents() must accept a `codes` argument.  If
+    the index has not been built, it is built from scratch.
+
+    Returns the number of (code, term) pairs that were indexed.
+    """
+
+    if not is_built(coding_system):
+        return build_index(coding_system)
+
+    tables = [_table_name(coding_system.id), _trigram_table_name(coding_system.id)]
+
+    with transaction.atomic(), connection.cursor() as c:
+        with temp_table(codes) as codes_table:
+            for table in tables:
+                c.execute(
+                    f"DELETE FROM {table} WHERE code IN (SELECT value FROM {codes_table})"
+                )
+        num_rows = _insert_documents(
+            c, tables, coding_system.search_index_documents(codes)
+        )
+
+    logger.info(
+        "Updated search index",
+        coding_system_id=coding_system.id,
+        num_codes=len(codes),
+        num_rows=num_rows,
+    )
+    return num_rows
+
+
+def _insert_documents(cursor, tables, documents):
+    """Insert (code, term) pairs into each of the given tables in batches, skipping
+    pairs with no term.
+
+    Returns the number of pairs inserted into each table.
+    """
+
+    num_rows = 0
+
+    def insert(batch):
+        for table in tables:
+            cursor.executemany(
+                f"INSERT INTO {table} (code, term) VALUES (%s, %s)", batch
+            )
+
+    batch = []
+    for code, term in documents:
+        if not term:
+            continue
+        batch.append((code, term))
+        if len(batch) == BATCH_SIZE:
+            insert(batch)
+            num_rows += len(batch)
+            batch = []
+
+    if batch:
+        insert(batch)
+        num_rows += len(batch)
+
+    return num_rows
+
+
+def search(coding_system, term):
+    """Return list of codes with a term that matches the given tokenised search term,
+    with the best matches first.
+
+    See the module docstring for how a search term is interpreted.
+    """
+
+    match_expression = parse_query(term)
+    if match_expression is None:
+        return []
+
+    table = _table_name(coding_system.id)
+    sql = f"""
+    SELECT code FROM {table} WHERE {table} MATCH %s
+    GROUP BY code
+    ORDER BY MIN(rank), code
+    """
+
+    with connection.cursor() as c:
+        c.execute(sql, [match_expression])
+        return [code for (code,) in c.fetchall()]
+
+
+def codes_containing(coding_system_id, term):
+    """Return set of codes with a term that contains the given search term,
+    ignoring case.
+
+    Returns None if the search term is too short for the trigram index, or if the
+    coding system's index has not been built, in which case the caller should fall back
+    to scanning every term.
+    """
+
+    if len(term) < 3:
+        return None
+
+    table = _trigram_table_name(coding_system_id)
+
+    if not _table_exists(table):
+        return None
+
+    with connection.cursor() as c:
+        c.execute(
+            f"SELECT DISTINCT code FROM {table} WHERE term MATCH %s", [_quote(term)]
+        )
+        return {code for (code,) in c.fetchall()}
+
+
+def parse_query(term):
+    """Convert a search term into an FTS5 query expression.
+
+    Each word becomes a prefix query, and each double-quoted group of words becomes a
+    phrase query.  Returns None if the term contains no words.
+    """
+
+    clauses = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', term):
+        if phrase and re.search(r"\w", phrase):
+            clauses.append(_quote(phrase))
+        elif word and re.search(r"\w", word):
+            clauses.append(_quote(word) + "*")
+
+    if not clauses:
+        return None
+
+    return " ".join(clauses)
+
+
+def _quote(s):
+    """Quote s as an FTS5 string, so that any characters with special meaning in the
+    FTS5 query syntax are treated as part of the string.
+    """
+
+    return '"' + s.replace('"', '""') + '"'
+
+
+def _table_name(coding_system_id):
+    return f"{coding_system_id}_searchindex"
+
+
+def _trigram_table_name(coding_system_id):
+    return f"{coding_system_id}_trigramindex"
+
+
+def _table_exists(table):
+    with connection.cursor() as c:
+        c.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [table]
+        )
+        return c.fetchone() is not None
@@ -0,0 +1,149 @@
+"""A cache of the terms of codes, shared by all coding systems.
+
+The terms of a codelist's codes are looked up on most page loads, often for the same
+codes, and for large codelists each lookup involves many queries.
+
+A coding system's code_to_term() (or, for SNOMED CT, code_to_term_and_type()) can use
+lookup() to cache the terms of codes.  There are two levels of cache:
+
+    * each process has a size-bounded LRU cache, holding at most TERM_CACHE_MAX_SIZE
+      codes;
+    * if a cache called "terms" is configured in CACHES, it is used as a second-level
+      cache, which can be shared between processes.
+
+Cached terms are associated with the release of the coding system that they were looked
+up from, so that terms from an earlier release are never returned.
+
+The number of codes found in each level of the cache, and the number of codes that had
+to be looked up in the database, are counted, and can be retrieved with get_stats().
+"""
+
+import threading
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from opencodelists.models import DatasetRelease
+
+# Counts of codes found in the in-process cache ("hits"), the second-level cache
+# ("l2_hits"), and neither ("misses")
+_stats = Counter()
+_lock = threading.Lock()
+
+
+def lookup(coding_system_id, kind, codes, fn):
+    """Return dict mapping each of the given codes to its term (or other value, such as
+    a (term, type) pair), using the cache where possible.
+
+    `kind` identifies what is being looked up, so that a coding system can cache more
+    than one kind of value per code.  `fn` is called with any codes that are not in the
+    cache, and must return a dict mapping each code it knows about to its value.  As
+    with `fn`, codes that are not known to the coding system are not included in the
+    returned dict.
+    """
+
+    release_key = DatasetRelease.objects.current_key(
+        f"coding_systems.{coding_system_id}"
+    )
+    prefix = (coding_system_id, kind, release_key)
+    codes = set(codes)
+
+    code_to_value = _cache.get_many(prefix, codes)
+    num_hits = len(code_to_value)
+
+    missing = codes - code_to_value.keys()
+    num_l2_hits = 0
+    l2_cache = _l2_cache()
+    if missing and l2_cache is not None:
+        l2_keys = {_l2_key(prefix, code): code for code in missing}
+        from_l2_cache = {
+            l2_keys[key]: value for key, value in l2_cache.get_many(l2_keys).items()
+        }
+        _cache.set_many(prefix, from_l2_cache)
+        code_to_value.update(from_l2_cache)
+        num_l2_hits = len(from_l2_cache)
+        missing -= from_l2_cache.keys()
+
+    if missing:
+        found = fn(missing)
+        # Codes that aren't found are cached too, with a value of None, so that we don't
+        # look for them again.
+        from_db = {code: found.get(code) for code in missing}
+        _cache.set_many(prefix, from_db)
+        if l2_cache is not None:
+            l2_cache.set_many(
+                {_l2_key(prefix, code): value for code, value in from_db.items()}
+            )
+        code_to_value.update(from_db)
+
+    with _lock:
+        _stats["hits"] += num_hits
+        _stats["l2_hits"] += num_l2_hits
+        _stats["misses"] += len(missing)
+
+    return {code: value for code, value in code_to_value.items() if value is not None}
+
+
+def get_stats():
+    """Return dict of counts of cache hits and misses since the process started."""
+
+    with _lock:
+        return {key: _stats[key] for key in ["hits", "l2_hits", "misses"]}
+
+
+def clear():
+    """Discard everything in the in-process cache, and reset the stats."""
+
+    _cache.clear()
+    with _lock:
+        _stats.clear()
+
+
+def _l2_cache():
+    if "terms" not in settings.CACHES:
+        return None
+    return caches["terms"]
+
+
+def _l2_key(prefix, code):
+    coding_system_id, kind, release_key = prefix
+    return f"terms:{coding_system_id}:{kind}:{release_key}:{code}"
+
+
+class _LRUCache:
+    """A thread-safe least-recently-used cache of at most max_size items.
+
+    Items are keyed by a (prefix, code) pair.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, prefix, codes):
+        found = {}
+        with self.lock:
+            for code in codes:
+                key = (prefix, code)
+                if key in self.data:
+                    self.data.move_to_end(key)
+                    found[code] = self.data[key]
+        return found
+
+    def set_many(self, prefix, code_to_value):
+        with self.lock:
+            for code, value in code_to_value.items():
+                key = (prefix, code)
+                self.data[key] = value
+                self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+_cache = _LRUCache(settings.TERM_CACHE_MAX_SIZE)
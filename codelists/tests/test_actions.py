@@ -1,7 +1,9 @@
+import hashlib
+
 import pytest
 from django.db import IntegrityError
 
-from codelists import actions
+from codelists import actions, artefacts
 from codelists.models import Codelist
 from opencodelists.tests.factories import OrganisationFactory, UserFactory
 
@@ -168,6 +170,34 @@ def test_publish_draft_version():
     assert not clv.is_draft
 
 
+def test_publish_draft_version_creates_csv_artefact():
+    clv = factories.create_draft_version()
+    actions.publish_version(version=clv)
+
+    artefact = artefacts.get_artefact(clv, "csv")
+    with open(artefacts.path_for_digest(artefact.digest)) as f:
+        assert f.read() == clv.csv_data_for_download()
+
+
+def test_create_artefact():
+    clv = factories.create_published_version()
+
+    artefact = actions.create_artefact(version=clv, kind="csv")
+
+    # The artefact is updated in place, and its file is named by its content
+    assert clv.artefacts.get() == artefact
+    assert (
+        artefact.digest
+        == hashlib.sha256(clv.csv_data_for_download().encode("utf8")).hexdigest()
+    )
+
+
+def test_create_artefact_for_draft_version():
+    clv = factories.create_draft_version()
+    with pytest.raises(AssertionError):
+        actions.create_artefact(version=clv, kind="csv")
+
+
 def test_publish_published_version():
     clv = factories.create_published_version()
     with pytest.raises(AssertionError):
@@ -1,7 +1,14 @@
 import json
+import zipfile
+from io import BytesIO
+
+from django.urls import reverse
 
 from opencodelists.tests.assertions import assert_difference, assert_no_difference
 
+from .. import artefacts
+from .factories import CodelistFactory, create_published_version
+
 
 def test_versions_post(client, user, user_codelist):
     data = {"ecl": "<<128133004"}
@@ -65,3 +72,144 @@ def test_versions_post_permission_denied(
         rsp = client.post(user_codelist.get_versions_api_url(), data, **headers)
 
     assert rsp.status_code == 403
+
+
+def test_download_zip(client, user, version_with_some_searches):
+    published = create_published_version()
+    data = {
+        "codelists": [published.full_slug(), version_with_some_searches.full_slug()]
+    }
+    headers = {"HTTP_AUTHORIZATION": f"Token {user.api_token}"}
+
+    rsp = client.post(
+        reverse("codelists_api:download"),
+        data,
+        content_type="application/json",
+        **headers,
+    )
+
+    assert rsp.status_code == 200
+    assert rsp["Content-Type"] == "application/zip"
+    with zipfile.ZipFile(BytesIO(b"".join(rsp.streaming_content))) as zf:
+        assert zf.namelist() == [
+            f"{published.download_filename()}.csv",
+            f"{version_with_some_searches.download_filename()}.csv",
+        ]
+        assert zf.read(zf.namelist()[0]).decode("utf8") == published.csv_data
+        assert zf.read(zf.namelist()[1]).decode("utf8") == "".join(
+            version_with_some_searches.iter_csv_data_for_download()
+        )
+
+
+def test_download_zip_uses_artefacts(client, user):
+    published = create_published_version()
+    artefact = published.artefacts.get(kind="csv")
+    with open(artefacts.path_for_digest(artefact.digest), "w") as f:
+        f.write("from artefact")
+    headers = {"HTTP_AUTHORIZATION": f"Token {user.api_token}"}
+
+    rsp = client.post(
+        reverse("codelists_api:download"),
+        {"codelists": [published.full_slug()]},
+        content_type="application/json",
+        **headers,
+    )
+
+    with zipfile.ZipFile(BytesIO(b"".join(rsp.streaming_content))) as zf:
+        assert zf.read(zf.namelist()[0]) == b"from artefact"
+
+
+def test_download_ndjson(client, user, version_with_some_searches):
+    data = {"codelists": [version_with_some_searches.full_slug()], "format": "ndjson"}
+    headers = {"HTTP_AUTHORIZATION": f"Token {user.api_token}"}
+
+    rsp = client.post(
+        reverse("codelists_api:download"),
+        data,
+        content_type="application/json",
+        **headers,
+    )
+
+    assert rsp.status_code == 200
+    lines = b"".join(rsp.streaming_content).decode("utf8").splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {
+            "full_slug": version_with_some_searches.full_slug(),
+            "filename": f"{version_with_some_searches.download_filename()}.csv",
+            "csv": "".join(version_with_some_searches.iter_csv_data_for_download()),
+        }
+    ]
+
+
+def test_download_unknown_version(client, user, version_with_some_searches):
+    full_slug = version_with_some_searches.codelist.full_slug() + "/unknown"
+    data = {"codelists": [version_with_some_searches.full_slug(), full_slug]}
+    headers = {"HTTP_AUTHORIZATION": f"Token {user.api_token}"}
+
+    rsp = client.post(
+        reverse("codelists_api:download"),
+        data,
+        content_type="application/json",
+        **headers,
+    )
+
+    assert rsp.status_code == 400
+    assert json.loads(rsp.content) == {
+        "error": f"Unknown codelist version `{full_slug}`"
+    }
+
+
+def test_download_bad_codelists(client, user):
+    headers = {"HTTP_AUTHORIZATION": f"Token {user.api_token}"}
+
+    rsp = client.post(
+        reverse("codelists_api:download"),
+        {"codelists": "not-a-list"},
+        content_type="application/json",
+        **headers,
+    )
+
+    assert rsp.status_code == 400
+    assert json.loads(rsp.content) == {
+        "error": "`codelists` must be a list of full slugs"
+    }
+
+
+def test_download_no_auth(client, version_with_some_searches):
+    data = {"codelists": [version_with_some_searches.full_slug()]}
+
+    rsp = client.post(
+        reverse("codelists_api:download"), data, content_type="application/json"
+    )
+
+    assert rsp.status_code == 200
+
+
+def test_download_zip_with_duplicate_filenames(client, organisation):
+    # These versions have the same download_filename(), organisation-a-b-c
+    clv1 = CodelistFactory(owner=organisation, slug="a-b").versions.get()
+    clv1.tag = "c"
+    clv1.save()
+    clv2 = CodelistFactory(owner=organisation, slug="a").versions.get()
+    clv2.tag = "b-c"
+    clv2.save()
+    assert clv1.download_filename() == clv2.download_filename()
+
+    # clv1 is requested by both its tag and its hash
+    full_slugs = [
+        clv1.full_slug(),
+        clv2.full_slug(),
+        f"{clv1.codelist.full_slug()}/{clv1.hash}",
+    ]
+
+    rsp = client.post(
+        reverse("codelists_api:download"),
+        {"codelists": full_slugs},
+        content_type="application/json",
+    )
+
+    with zipfile.ZipFile(BytesIO(b"".join(rsp.streaming_content))) as zf:
+        assert zf.namelist() == [
+            f"{clv1.download_filename()}.csv",
+            f"{clv2.download_filename()}-{clv2.hash}.csv",
+        ]
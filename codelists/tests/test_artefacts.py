@@ -0,0 +1,31 @@
+from codelists import artefacts
+from opencodelists.actions import record_dataset_release
+
+from .factories import CodelistFactory
+
+
+def test_releases_key_for_ctv3tpp_version():
+    clv = CodelistFactory(coding_system_id="ctv3tpp").versions.get()
+    key = artefacts.releases_key(clv, "csv")
+
+    # ctv3tpp codelists are built from the ctv3 coding system, so a new release of
+    # ctv3 invalidates their artefacts
+    release = record_dataset_release(dataset="coding_systems.ctv3", release_dir="/tmp")
+
+    assert key != artefacts.releases_key(clv, "csv")
+    assert artefacts.releases_key(clv, "csv") == str(release.pk)
+
+
+def test_releases_key_for_dmd():
+    clv = CodelistFactory(coding_system_id="bnf").versions.get()
+    bnf_release = record_dataset_release(
+        dataset="coding_systems.bnf", release_dir="/tmp"
+    )
+    mapping_release = record_dataset_release(
+        dataset="mappings.bnfdmd", release_dir="/tmp"
+    )
+
+    # No release of dm+d has been recorded
+    assert artefacts.releases_key(clv, "dmd") == (
+        f"{bnf_release.pk},None,{mapping_release.pk}"
+    )
@@ -1,6 +1,7 @@
 from django.test import TestCase
 
 from opencodelists import db_utils
+from opencodelists.models import DatasetRelease
 
 
 class DBUtilsTest(TestCase):
@@ -12,3 +13,33 @@ class DBUtilsTest(TestCase):
         params = [last_value] + values
         result = db_utils.query(sql, params)
         self.assertEqual(result, [("found",)])
+
+    def test_chunks(self):
+        chunks = list(db_utils.chunks(range(1001), 500))
+        self.assertEqual([len(chunk) for chunk in chunks], [500, 500, 1])
+        self.assertEqual(sum(chunks, []), list(range(1001)))
+
+    def test_values_list_in_with_many_values(self):
+        releases = [
+            DatasetRelease.objects.create(dataset=f"dataset-{ix}", release_dir="")
+            for ix in range(3)
+        ]
+        values = [r.pk for r in releases] + list(range(10000, 12000))
+        rows = db_utils.values_list_in(
+            DatasetRelease.objects, "pk", values, "pk", "dataset"
+        )
+        self.assertEqual(
+            sorted(rows),
+            [(r.pk, r.dataset) for r in releases],
+        )
+
+    def test_temp_table(self):
+        with db_utils.temp_table(["a", "b", "b", "c"]) as table:
+            result = db_utils.query(f"SELECT value FROM {table} ORDER BY value")
+        self.assertEqual(result, [("a",), ("b",), ("c",)])
+
+        # The table is dropped at the end of the with block
+        result = db_utils.query(
+            "SELECT 1 FROM sqlite_temp_master WHERE name = %s", [table]
+        )
+        self.assertEqual(result, [])
@@ -86,3 +86,29 @@ def test_code_to_status(hierarchy, codes):
         code for code, status in code_to_status.items() if status == "-"
     }
     assert explicitly_excluded == definition.explicitly_excluded
+
+
+def test_from_codes_with_sets(subtests):
+    hierarchy = build_hierarchy()
+
+    for example in examples:
+        with subtests.test(example["description"]):
+            definition = Definition2._from_codes_with_sets(example["codes"], hierarchy)
+            assert definition.explicitly_included == example["explicitly_included"]
+            assert definition.explicitly_excluded == example["explicitly_excluded"]
+
+
+def test_from_codes_with_codes_not_in_hierarchy():
+    hierarchy = build_hierarchy()
+    definition = Definition2.from_codes({"d", "g", "h", "x"}, hierarchy)
+    assert definition.explicitly_included == {"d", "x"}
+    assert definition.explicitly_excluded == set()
+
+
+@settings(deadline=None)
+@given(hierarchies(40), st.sets(st.sampled_from(range(40))))
+def test_from_codes_matches_from_codes_with_sets(hierarchy, codes):
+    definition = Definition2.from_codes(codes, hierarchy)
+    expected = Definition2._from_codes_with_sets(codes, hierarchy)
+    assert definition.explicitly_included == expected.explicitly_included
+    assert definition.explicitly_excluded == expected.explicitly_excluded
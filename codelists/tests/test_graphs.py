@@ -0,0 +1,238 @@
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from codelists import graphs
+from codelists.coding_systems import CODING_SYSTEMS
+from codelists.hierarchy import Hierarchy
+from opencodelists.actions import record_dataset_release
+
+from .helpers import build_hierarchy
+
+
+def build_graph():
+    return graphs.Graph.from_relationships(build_hierarchy().edges)
+
+
+def test_from_relationships():
+    graph = build_graph()
+
+    assert len(graph) == 10
+    assert graph.codes == list("abcdefghij")
+
+    e = graph.code_to_id("e")
+    assert sorted(graph.codes[c] for c in graph.children(e)) == ["h", "i"]
+    assert sorted(graph.codes[p] for p in graph.parents(e)) == ["b", "c"]
+    assert list(graph.parents(graph.code_to_id("a"))) == []
+    assert list(graph.children(graph.code_to_id("j"))) == []
+
+
+def test_code_to_id_with_unknown_code():
+    graph = build_graph()
+
+    assert graph.code_to_id("z") is None
+    assert graph.code_to_id("") is None
+
+
+def test_relationships():
+    graph = build_graph()
+
+    assert graph.relationships(["e"]) == {
+        ("a", "b"),
+        ("a", "c"),
+        ("b", "e"),
+        ("c", "e"),
+        ("e", "h"),
+        ("e", "i"),
+    }
+
+    assert graph.relationships(["d", "j", "z"]) == {
+        ("a", "b"),
+        ("a", "c"),
+        ("b", "d"),
+        ("c", "f"),
+        ("d", "g"),
+        ("d", "h"),
+        ("f", "j"),
+    }
+
+    assert graph.relationships([]) == set()
+
+
+def test_relationships_matches_coding_system(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+    graph = graphs.get_graph(coding_system)
+
+    for codes in [["128133004"], ["439656005", "238484001"]]:
+        expected = set(coding_system.ancestor_relationships(codes)) | set(
+            coding_system.descendant_relationships(codes)
+        )
+        assert graph.relationships(codes) == expected
+
+
+def test_hierarchy_from_codes_with_and_without_graph(settings, tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+    codes = ["128133004", "238484001"]
+
+    settings.HIERARCHY_GRAPHS_ENABLED = False
+    hierarchy = Hierarchy.from_codes(coding_system, codes)
+
+    settings.HIERARCHY_GRAPHS_ENABLED = True
+    assert Hierarchy.from_codes(coding_system, codes).edges == set(hierarchy.edges)
+
+
+def test_get_graph_is_cached(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+
+    assert graphs.get_graph(coding_system) is graphs.get_graph(coding_system)
+
+
+def test_get_graph_reloads_after_new_release(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+    graph = graphs.get_graph(coding_system)
+
+    record_dataset_release(dataset="coding_systems.snomedct", release_dir="/tmp")
+    assert graphs.get_graph(coding_system) is not graph
+
+
+def test_get_graph_not_reloaded_after_release_of_other_dataset(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+    graph = graphs.get_graph(coding_system)
+
+    record_dataset_release(dataset="coding_systems.ctv3", release_dir="/tmp")
+    assert graphs.get_graph(coding_system) is graph
+
+
+def test_invalidate(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+    graph = graphs.get_graph(coding_system)
+
+    graphs.invalidate("snomedct")
+    assert graphs.get_graph(coding_system) is not graph
+
+
+def test_write_and_from_file(tmp_path):
+    graph = build_graph()
+    path = tmp_path / "test.graph"
+
+    graph.write(path, 123)
+    release_key, loaded_graph = graphs.Graph.from_file(path)
+
+    assert release_key == 123
+    assert len(loaded_graph) == len(graph)
+    assert list(loaded_graph.codes) == graph.codes
+    for code in graph.codes:
+        node_id = graph.code_to_id(code)
+        assert loaded_graph.code_to_id(code) == node_id
+        assert list(loaded_graph.children(node_id)) == list(graph.children(node_id))
+        assert list(loaded_graph.parents(node_id)) == list(graph.parents(node_id))
+
+    assert loaded_graph.code_to_id("z") is None
+    for codes in [["a"], ["e"], ["d", "j"]]:
+        assert loaded_graph.relationships(codes) == graph.relationships(codes)
+
+
+def test_write_and_from_file_without_release_key(tmp_path):
+    path = tmp_path / "test.graph"
+
+    build_graph().write(path, None)
+    release_key, _ = graphs.Graph.from_file(path)
+
+    assert release_key is None
+
+
+def test_read_release_key(tmp_path):
+    path = tmp_path / "test.graph"
+
+    build_graph().write(path, 123)
+
+    assert graphs.Graph.read_release_key(path) == 123
+
+
+def test_from_file_with_bad_file(tmp_path):
+    path = tmp_path / "test.graph"
+    path.write_bytes(b"\0" * 64)
+
+    with pytest.raises(ValueError):
+        graphs.Graph.from_file(path)
+
+
+def test_from_file_with_truncated_file(tmp_path):
+    path = tmp_path / "test.graph"
+    path.write_bytes(graphs.MAGIC)
+
+    with pytest.raises(ValueError):
+        graphs.Graph.from_file(path)
+
+
+def test_get_graph_loads_from_file(settings, tmp_path, tennis_elbow):
+    settings.HIERARCHY_GRAPHS_DIR = str(tmp_path)
+    coding_system = CODING_SYSTEMS["snomedct"]
+    record_dataset_release(dataset="coding_systems.snomedct", release_dir="/tmp")
+    call_command("build_hierarchy_graphs", "snomedct", stdout=StringIO())
+
+    graph = graphs.get_graph(coding_system)
+
+    assert isinstance(graph.codes, graphs._CodeTable)
+    codes = ["128133004", "238484001"]
+    assert graph.relationships(codes) == graphs.Graph.from_relationships(
+        coding_system.all_relationships()
+    ).relationships(codes)
+
+
+def test_get_graph_ignores_stale_file(settings, tmp_path, tennis_elbow, monkeypatch):
+    settings.HIERARCHY_GRAPHS_DIR = str(tmp_path)
+    coding_system = CODING_SYSTEMS["snomedct"]
+    record_dataset_release(dataset="coding_systems.snomedct", release_dir="/tmp")
+    call_command("build_hierarchy_graphs", "snomedct", stdout=StringIO())
+    record_dataset_release(dataset="coding_systems.snomedct", release_dir="/tmp")
+
+    def from_file(path):
+        assert False, "A stale file should not be mapped into memory"
+
+    monkeypatch.setattr(graphs.Graph, "from_file", from_file)
+    graph = graphs.get_graph(coding_system)
+
+    assert isinstance(graph.codes, list)
+
+
+def test_get_graph_ignores_file_from_unknown_release(settings, tmp_path, tennis_elbow):
+    settings.HIERARCHY_GRAPHS_DIR = str(tmp_path)
+    coding_system = CODING_SYSTEMS["snomedct"]
+    # No release has been recorded, so the file is written without a release key
+    call_command("build_hierarchy_graphs", "snomedct", stdout=StringIO())
+
+    graph = graphs.get_graph(coding_system)
+    assert isinstance(graph.codes, list)
+
+    # The file is still ignored once a release has been recorded
+    graphs.invalidate()
+    record_dataset_release(dataset="coding_systems.snomedct", release_dir="/tmp")
+    graph = graphs.get_graph(coding_system)
+    assert isinstance(graph.codes, list)
+
+
+def test_from_little_endian_bytes():
+    data = memoryview(b"\x01\x00\x00\x00\xff\xff\xff\xff")
+
+    assert list(graphs._from_little_endian_bytes(data, "i")) == [1, -1]
+    assert list(graphs._from_little_endian_bytes(data, "I")) == [1, 2 ** 32 - 1]
+
+
+def test_build_hierarchy_graphs_for_all_coding_systems(settings, tmp_path):
+    settings.HIERARCHY_GRAPHS_DIR = str(tmp_path)
+
+    call_command("build_hierarchy_graphs", stdout=StringIO())
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "bnf.graph",
+        "ctv3.graph",
+        "icd10.graph",
+        "snomedct.graph",
+    ]
+
+
+def test_build_hierarchy_graphs_for_coding_system_without_hierarchy():
+    with pytest.raises(CommandError):
+        call_command("build_hierarchy_graphs", "dmd", stdout=StringIO())
@@ -1,4 +1,13 @@
-from .helpers import build_hierarchy, build_small_hierarchy
+import gc
+import weakref
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from codelists import hierarchy as hierarchy_module
+from codelists.hierarchy import Hierarchy
+
+from .helpers import build_hierarchy, build_small_hierarchy, hierarchies
 
 
 def test_nodes():
@@ -61,6 +70,139 @@ def test_descendants():
         assert hierarchy.descendants(node) == descendants
 
 
+def test_ancestors_and_descendants_of_unknown_node():
+    hierarchy = build_small_hierarchy()
+
+    assert hierarchy.ancestors("z") == set()
+    assert hierarchy.descendants("z") == set()
+
+
+def test_ancestors_and_descendants_of_deep_hierarchy():
+    # This is deeper than Python's recursion limit
+    depth = 5000
+    edges = [(str(ix), str(ix + 1)) for ix in range(depth)]
+    hierarchy = Hierarchy("0", edges)
+
+    assert len(hierarchy.descendants("0")) == depth
+    assert len(hierarchy.ancestors(str(depth))) == depth
+
+
+def test_descendant_bits():
+    hierarchy = build_small_hierarchy()
+    node_ids = hierarchy.node_ids
+
+    for node, descendants in {
+        "a": {"b", "c", "d", "e", "f"},
+        "b": {"d", "e"},
+        "d": set(),
+    }.items():
+        ids = sorted(node_ids[descendant] for descendant in descendants)
+        bits = sum(1 << ix for ix in ids)
+        assert hierarchy.descendant_bits(node_ids[node]) == (bits, ids)
+
+
+def test_descendant_bits_is_cached():
+    hierarchy = build_small_hierarchy()
+    node_id = hierarchy.node_ids["a"]
+
+    assert hierarchy.descendant_bits(node_id) is hierarchy.descendant_bits(node_id)
+
+
+def test_to_bits():
+    assert Hierarchy.to_bits([]) == 0
+    assert Hierarchy.to_bits([0, 3, 9]) == 0b1000001001
+
+
+def test_closure_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(hierarchy_module, "CLOSURE_CACHE_MAX_SIZE", 4)
+    hierarchy = build_hierarchy()
+
+    for node in hierarchy.nodes:
+        hierarchy.descendants(node)
+        hierarchy.ancestors(node)
+        hierarchy.descendant_bits(hierarchy.node_ids[node])
+        assert hierarchy._closure_cache.size <= 4
+
+    # The results are the same whether or not they come from the cache
+    assert hierarchy.descendants("b") == {"d", "e", "g", "h", "i"}
+    assert hierarchy.descendants("b") == {"d", "e", "g", "h", "i"}
+
+
+def test_closure_cache_charges_empty_sets():
+    cache = hierarchy_module._ClosureCache(4)
+
+    for ix in range(10):
+        cache.set(ix, set())
+
+    assert cache.size == 4
+    assert len(cache._data) == 4
+    assert cache.get(9) == set()
+    assert cache.get(0) is None
+
+
+def test_closure_cache_replaces_existing_key():
+    cache = hierarchy_module._ClosureCache(4)
+
+    for _ in range(10):
+        cache.set("a", {1, 2})
+
+    assert cache.size == 2
+    assert cache.get("a") == {1, 2}
+
+    cache.set("a", {1, 2, 3, 4, 5})
+
+    assert cache.size == 0
+    assert cache.get("a") is None
+
+
+def test_descendant_bits_is_charged_by_bit_length(monkeypatch):
+    monkeypatch.setattr(hierarchy_module, "CLOSURE_CACHE_MAX_SIZE", 1000)
+    depth = 100
+    edges = [(str(ix), str(ix + 1)) for ix in range(depth)]
+    hierarchy = Hierarchy("0", edges)
+    node_ids = hierarchy.node_ids
+
+    bits, ids = hierarchy.descendant_bits(node_ids[str(depth - 1)])
+
+    assert len(ids) == 1
+    assert bits.bit_length() == depth + 1
+    assert hierarchy._closure_cache.size == 1 + bits.bit_length()
+
+
+def test_hierarchy_is_not_kept_alive_by_cache():
+    hierarchy = build_hierarchy()
+    hierarchy.descendants("a")
+    ref = weakref.ref(hierarchy)
+
+    del hierarchy
+    gc.collect()
+
+    assert ref() is None
+
+
+def test_ultimate_ancestors():
+    hierarchy = build_hierarchy()
+
+    assert hierarchy.ultimate_ancestors({"b", "e", "h", "i", "j"}) == {"b", "j"}
+    assert hierarchy.ultimate_ancestors({"d", "f"}) == {"d", "f"}
+    assert hierarchy.ultimate_ancestors({"a", "j"}) == {"a"}
+    assert hierarchy.ultimate_ancestors(set()) == set()
+
+
+def test_ultimate_ancestors_of_unknown_nodes():
+    hierarchy = build_hierarchy()
+
+    assert hierarchy.ultimate_ancestors({"b", "d", "x"}) == {"b", "x"}
+
+
+@settings(deadline=None)
+@given(hierarchies(24), st.sets(st.sampled_from(range(24))))
+def test_ultimate_ancestors_matches_filter_to_ultimate_ancestors(hierarchy, nodes):
+    assert hierarchy.ultimate_ancestors(
+        nodes
+    ) == hierarchy.filter_to_ultimate_ancestors(nodes)
+
+
 def test_update_node_to_status():
     hierarchy = build_hierarchy()
 
@@ -107,6 +249,92 @@ def test_update_node_to_status():
     }
 
 
+def test_update_node_to_status_for_node_without_edges():
+    hierarchy = build_hierarchy()
+
+    # "x" is not in the hierarchy, so it is neither included nor excluded once its
+    # status is cleared
+    assert hierarchy.update_node_to_status({"x": "+"}, [("x", "?")]) == {"x": "?"}
+    assert hierarchy.update_node_to_status({"x": "?"}, [("x", "-")]) == {"x": "-"}
+
+
+def test_changed_node_statuses():
+    hierarchy = build_hierarchy()
+
+    node_to_status = {
+        #        ?
+        #       / \
+        #      +   -
+        #     / \ / \
+        #   (+)  !  (-)
+        #   / \ / \ / \
+        # (+)  !   !  (-)
+        "a": "?",
+        "b": "+",
+        "c": "-",
+        "d": "(+)",
+        "e": "!",
+        "f": "(-)",
+        "g": "(+)",
+        "h": "!",
+        "i": "!",
+        "j": "(-)",
+    }
+
+    # This is the same as in test_update_node_to_status, but only the nodes whose
+    # statuses change are returned
+    assert hierarchy.changed_node_statuses(
+        node_to_status, [("a", "-"), ("f", "+"), ("b", "?"), ("a", "+")]
+    ) == {
+        #        +
+        #       / \
+        #     (+)  -
+        #     / \ / \
+        #   (+) (-)  +
+        #   / \ / \ / \
+        # (+) (-) (+) (+)
+        "a": "+",
+        "b": "(+)",
+        "e": "(-)",
+        "f": "+",
+        "h": "(-)",
+        "i": "(+)",
+        "j": "(+)",
+    }
+
+
+def test_changed_node_statuses_with_no_change():
+    hierarchy = build_hierarchy()
+    node_to_status = hierarchy.node_statuses({"a"}, {"c"})
+
+    assert hierarchy.changed_node_statuses(node_to_status, [("a", "+")]) == {}
+
+
+@settings(deadline=None)
+@given(hierarchies(24), st.data())
+def test_changed_node_statuses_matches_node_statuses(hierarchy, data):
+    nodes = sorted(hierarchy.nodes)
+    included = data.draw(st.sets(st.sampled_from(nodes)))
+    excluded = data.draw(st.sets(st.sampled_from(nodes))) - included
+    updates = data.draw(
+        st.lists(st.tuples(st.sampled_from(nodes), st.sampled_from(["+", "-", "?"])))
+    )
+
+    node_to_status = hierarchy.node_statuses(included, excluded)
+    new_node_to_status = hierarchy.node_statuses(
+        {node for node, status in dict(updates).items() if status == "+"}
+        | (included - {node for node, _ in updates}),
+        {node for node, status in dict(updates).items() if status == "-"}
+        | (excluded - {node for node, _ in updates}),
+    )
+
+    assert hierarchy.changed_node_statuses(node_to_status, updates) == {
+        node: status
+        for node, status in new_node_to_status.items()
+        if node_to_status[node] != status
+    }
+
+
 def test_node_status():
     hierarchy = build_hierarchy()
 
@@ -255,3 +483,53 @@ def test_node_status():
         "i": "(+)",
         "j": "(-)",
     }
+
+
+def test_topological_order():
+    hierarchy = build_hierarchy()
+
+    order = hierarchy.topological_order
+
+    assert sorted(order) == sorted(hierarchy.nodes)
+    for parent, child in hierarchy.edges:
+        assert order.index(parent) < order.index(child)
+
+
+def test_node_statuses():
+    hierarchy = build_hierarchy()
+
+    # This is the example from the docstring of node_status()
+    assert hierarchy.node_statuses({"a", "e"}, {"b", "c"}) == {
+        "a": "+",
+        "b": "-",
+        "c": "-",
+        "d": "(-)",
+        "e": "+",
+        "f": "(-)",
+        "g": "(-)",
+        "h": "(+)",
+        "i": "(+)",
+        "j": "(-)",
+    }
+
+
+def test_node_statuses_includes_nodes_not_in_hierarchy():
+    hierarchy = build_hierarchy()
+
+    node_to_status = hierarchy.node_statuses({"a", "x"}, {"y"})
+
+    assert node_to_status["x"] == "+"
+    assert node_to_status["y"] == "-"
+    assert node_to_status["j"] == "(+)"
+
+
+@settings(deadline=None)
+@given(hierarchies(24), st.data())
+def test_node_statuses_matches_node_status(hierarchy, data):
+    nodes = sorted(hierarchy.nodes)
+    included = data.draw(st.sets(st.sampled_from(nodes)))
+    excluded = data.draw(st.sets(st.sampled_from(nodes))) - included
+
+    assert hierarchy.node_statuses(included, excluded) == {
+        node: hierarchy.node_status(node, included, excluded) for node in nodes
+    }
@@ -77,6 +77,16 @@ def test_new_style_table(version_with_some_searches):
     ]
 
 
+def test_iter_csv_data_for_download(version_with_some_searches):
+    clv = version_with_some_searches
+    assert "".join(clv.iter_csv_data_for_download()) == clv.csv_data_for_download()
+
+
+def test_iter_csv_data_for_download_old_style(old_style_version):
+    clv = old_style_version
+    assert "".join(clv.iter_csv_data_for_download()) == clv.csv_data_for_download()
+
+
 def test_old_style_is_new_style(old_style_codelist):
     assert not old_style_codelist.is_new_style()
 
@@ -54,3 +54,15 @@ def test_build_definition_rows():
     assert len(row["excluded_descendants"]) == 1
     excluded = row["excluded_descendants"][0]
     assert excluded["code"] == "8"
+
+
+def test_present_hierarchy():
+    hierarchy = Hierarchy("a", [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")])
+    code_to_term = {"a": "A", "b": "B", "d": "D", "x": "X"}
+
+    assert presenters.present_hierarchy(hierarchy, code_to_term) == {
+        "codes": ["a", "b", "c", "d", "x"],
+        "terms": ["A", "B", None, "D", "X"],
+        "parents": [0, 0, 1, 2],
+        "children": [1, 2, 3, 3],
+    }
@@ -20,7 +20,7 @@ def test_do_search(tennis_elbow):
         "298163003",  # Elbow joint inflamed
     }
 
-    assert search_results["matching_codes"] == {
+    assert set(search_results["matching_codes"]) == {
         # Everything above, except Epicondylitis
         "116309007",
         "128133004",
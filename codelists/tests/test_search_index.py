@@ -0,0 +1,163 @@
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from codelists import search_index
+from codelists.coding_systems import CODING_SYSTEMS
+from codelists.search import do_search
+
+
+@pytest.mark.parametrize(
+    "term,expected",
+    [
+        ("elbow", '"elbow"*'),
+        ("tennis elb", '"tennis"* "elb"*'),
+        ('"joint inflamed"', '"joint inflamed"'),
+        ('elbow "joint inflamed"', '"elbow"* "joint inflamed"'),
+        ('say "hi', '"say"* """hi"*'),
+        ("non-small", '"non-small"*'),
+        ("- ", None),
+        ("", None),
+    ],
+)
+def test_parse_query(term, expected):
+    assert search_index.parse_query(term) == expected
+
+
+def test_build_index(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+
+    num_rows = search_index.build_index(coding_system)
+
+    assert num_rows > 0
+    assert search_index.is_built(coding_system)
+
+
+def test_is_built_without_index():
+    assert not search_index.is_built(CODING_SYSTEMS["bnf"])
+    assert not search_index.is_built(CODING_SYSTEMS["dmd"])
+
+
+def test_search_with_prefix(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+
+    assert set(search_index.search(coding_system, "epicondyl")) == {
+        "73583000",  # Epicondylitis
+        "202855006",  # Lateral epicondylitis
+        "312421000119107",  # Right lateral epicondylitis
+    }
+
+
+def test_search_with_several_words(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+
+    assert search_index.search(coding_system, "elb inflam") == [
+        "298163003"  # Elbow joint inflamed
+    ]
+
+
+def test_search_with_phrase(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+
+    assert search_index.search(coding_system, '"joint inflamed"') == [
+        "298163003"  # Elbow joint inflamed
+    ]
+    assert search_index.search(coding_system, '"inflamed joint"') == [
+        "298160000"  # Inflamed joint
+    ]
+
+
+def test_codes_containing(tennis_elbow):
+    assert search_index.codes_containing("snomedct", "picondylitis of right") == {
+        "312421000119107"  # Right lateral epicondylitis
+    }
+
+
+def test_codes_containing_with_short_term(tennis_elbow):
+    assert search_index.codes_containing("snomedct", "el") is None
+
+
+def test_codes_containing_without_index():
+    assert search_index.codes_containing("bnf", "elbow") is None
+
+
+@pytest.mark.parametrize(
+    "term", ["elbow", "ELBOW", "picondyl", "joint inflamed", "202855006", "el", "xyz"]
+)
+def test_coding_system_search_with_and_without_index(tennis_elbow, monkeypatch, term):
+    coding_system = CODING_SYSTEMS["snomedct"]
+    with_index = coding_system.search(term)
+
+    monkeypatch.setattr(search_index, "codes_containing", lambda *args: None)
+    without_index = coding_system.search(term)
+
+    assert with_index == without_index
+
+
+def test_search_with_no_words(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+
+    assert search_index.search(coding_system, " - ") == []
+
+
+def test_do_search_uses_coding_system_search(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+    assert search_index.is_built(coding_system)
+
+    for term in ["elbow", "inflamed elbow", "298163003"]:
+        assert do_search(coding_system, term)["matching_codes"] == coding_system.search(
+            term
+        )
+
+
+def test_do_search_matches_within_words_using_trigram_index(tennis_elbow, monkeypatch):
+    coding_system = CODING_SYSTEMS["snomedct"]
+    assert search_index.is_built(coding_system)
+
+    calls = []
+    codes_containing = search_index.codes_containing
+
+    def spy(coding_system_id, term):
+        codes = codes_containing(coding_system_id, term)
+        calls.append(codes)
+        return codes
+
+    monkeypatch.setattr(search_index, "codes_containing", spy)
+
+    matching_codes = do_search(coding_system, "lbow")["matching_codes"]
+
+    # The substring matches came from the trigram index, rather than a scan of every
+    # term
+    assert calls and calls[0] is not None
+    assert "298163003" in matching_codes  # Elbow joint inflamed
+    assert matching_codes == do_search(coding_system, "elbow")["matching_codes"]
+
+
+def test_do_search_for_code(tennis_elbow):
+    coding_system = CODING_SYSTEMS["snomedct"]
+
+    assert do_search(coding_system, "298163003")["matching_codes"] == {"298163003"}
+
+
+def test_do_search_without_index(tennis_elbow, monkeypatch):
+    coding_system = CODING_SYSTEMS["snomedct"]
+    with_index = do_search(coding_system, "elbow")
+
+    monkeypatch.setattr(search_index, "is_built", lambda coding_system: False)
+    monkeypatch.setattr(search_index, "codes_containing", lambda *args: None)
+    without_index = do_search(coding_system, "elbow")
+
+    assert with_index == without_index
+
+
+def test_build_search_indexes_command(tennis_elbow):
+    stdout = StringIO()
+    call_command("build_search_indexes", "snomedct", stdout=stdout)
+
+    assert "for snomedct" in stdout.getvalue()
+
+
+def test_build_search_indexes_command_with_unsupported_coding_system():
+    with pytest.raises(CommandError):
+        call_command("build_search_indexes", "dmd", stdout=StringIO())
@@ -0,0 +1,79 @@
+from django.core.cache.backends.locmem import LocMemCache
+
+from codelists import term_cache
+from opencodelists.actions import record_dataset_release
+
+TERMS = {"a": "Apple", "b": "Banana", "c": "Cherry"}
+
+
+class Lookup:
+    """Look up terms in TERMS, recording which codes were looked up."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, codes):
+        self.calls.append(set(codes))
+        return {code: TERMS[code] for code in codes if code in TERMS}
+
+
+def test_lookup():
+    fn = Lookup()
+
+    assert term_cache.lookup("test", "term", ["a", "b"], fn) == {
+        "a": "Apple",
+        "b": "Banana",
+    }
+    assert term_cache.lookup("test", "term", ["b", "c", "z"], fn) == {
+        "b": "Banana",
+        "c": "Cherry",
+    }
+    assert term_cache.lookup("test", "term", ["a", "z"], fn) == {"a": "Apple"}
+
+    assert fn.calls == [{"a", "b"}, {"c", "z"}]
+    assert term_cache.get_stats() == {"hits": 3, "l2_hits": 0, "misses": 4}
+
+
+def test_lookup_is_keyed_by_kind():
+    fn = Lookup()
+
+    term_cache.lookup("test", "term", ["a"], fn)
+    term_cache.lookup("test", "other", ["a"], fn)
+
+    assert fn.calls == [{"a"}, {"a"}]
+
+
+def test_lookup_after_new_release():
+    fn = Lookup()
+
+    term_cache.lookup("test", "term", ["a"], fn)
+    record_dataset_release(dataset="coding_systems.test", release_dir="new")
+    term_cache.lookup("test", "term", ["a"], fn)
+
+    assert fn.calls == [{"a"}, {"a"}]
+
+
+def test_lookup_with_l2_cache(monkeypatch):
+    l2_cache = LocMemCache("test-terms", {})
+    monkeypatch.setattr(term_cache, "_l2_cache", lambda: l2_cache)
+    fn = Lookup()
+
+    term_cache.lookup("test", "term", ["a", "b"], fn)
+    # Simulate another process, with an empty in-process cache
+    term_cache.clear()
+    result = term_cache.lookup("test", "term", ["a", "b", "c"], fn)
+
+    assert result == {"a": "Apple", "b": "Banana", "c": "Cherry"}
+    assert fn.calls == [{"a", "b"}, {"c"}]
+    assert term_cache.get_stats() == {"hits": 0, "l2_hits": 2, "misses": 1}
+
+
+def test_lru_cache_is_bounded():
+    cache = term_cache._LRUCache(2)
+
+    cache.set_many("p", {"a": 1, "b": 2})
+    cache.get_many("p", ["a"])
+    cache.set_many("p", {"c": 3})
+
+    # "b" was the least recently used
+    assert cache.get_many("p", ["a", "b", "c"]) == {"a": 1, "c": 3}
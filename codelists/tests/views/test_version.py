@@ -21,3 +21,15 @@ def test_get_version_with_complete_searches(client, version_with_complete_search
 def test_get_user_version(client, user_version):
     rsp = client.get(user_version.get_absolute_url())
     assert rsp.status_code == 200
+
+
+def test_get_version_is_not_conditional(client, version_with_no_searches):
+    # The page depends on the user, their permissions, the CSRF token, and any messages,
+    # so it is always rendered.
+    rsp = client.get(version_with_no_searches.get_absolute_url())
+    assert "ETag" not in rsp
+
+    rsp = client.get(
+        version_with_no_searches.get_absolute_url(), HTTP_IF_NONE_MATCH="*"
+    )
+    assert rsp.status_code == 200
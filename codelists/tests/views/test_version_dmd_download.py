@@ -0,0 +1,96 @@
+import csv
+from io import StringIO
+
+from codelists.actions import create_codelist_with_codes
+from coding_systems.bnf.models import Concept
+from coding_systems.dmd.models import (
+    AMP,
+    VMP,
+    AvailabilityRestriction,
+    BasisOfName,
+    LicensingAuthority,
+    Supplier,
+    VirtualProductPresStatus,
+)
+from mappings.bnfdmd.models import Mapping
+from opencodelists.tests.factories import OrganisationFactory
+
+
+def create_bnf_version():
+    Concept.objects.create(code="0101", type="Section", name="Antacids")
+    Concept.objects.create(
+        code="0101010", type="Paragraph", name="Antacids", parent_id="0101"
+    )
+    Concept.objects.create(
+        code="0101010C0", type="Chemical", name="Aluminium", parent_id="0101010"
+    )
+    Concept.objects.create(
+        code="0101010D0", type="Chemical", name="Calcium", parent_id="0101010"
+    )
+
+    BasisOfName.objects.create(cd=1, descr="rINN")
+    VirtualProductPresStatus.objects.create(cd=1, descr="Valid as a prescribable")
+    Supplier.objects.create(cd=1, invalid=False, descr="Acme")
+    LicensingAuthority.objects.create(cd=1, descr="Medicines - MHRA/EMA")
+    AvailabilityRestriction.objects.create(cd=1, descr="None")
+
+    for vpid, nm, bnf_code in [
+        ("10", "Calcium tablets", "0101010D0"),
+        ("11", "Aluminium tablets", "0101010C0"),
+        ("12", "Aluminium capsules", "0101010C0"),
+    ]:
+        VMP.objects.create(
+            id=vpid,
+            invalid=False,
+            nm=nm,
+            basis_id=1,
+            pres_stat_id=1,
+            sug_f=False,
+            glu_f=False,
+            pres_f=False,
+            cfc_f=False,
+        )
+        Mapping.objects.create(dmd_code=vpid, dmd_type="VMP", bnf_concept_id=bnf_code)
+
+    for apid, vpid, descr, bnf_code in [
+        ("20", "11", "Aluminium tablets (Brand B)", "0101010C0"),
+        ("21", "11", "Aluminium tablets (Brand A)", "0101010C0"),
+        ("22", "10", "Calcium tablets (Brand A)", "0101010D0"),
+    ]:
+        AMP.objects.create(
+            id=apid,
+            invalid=False,
+            vmp_id=vpid,
+            nm=descr,
+            descr=descr,
+            supp_id=1,
+            lic_auth_id=1,
+            ema=False,
+            parallel_import=False,
+            avail_restrict_id=1,
+        )
+        Mapping.objects.create(dmd_code=apid, dmd_type="AMP", bnf_concept_id=bnf_code)
+
+    codelist = create_codelist_with_codes(
+        owner=OrganisationFactory(),
+        name="Antacids",
+        coding_system_id="bnf",
+        codes=["0101010C0", "0101010D0"],
+    )
+    return codelist.versions.get()
+
+
+def test_get(client):
+    clv = create_bnf_version()
+    rsp = client.get(clv.get_dmd_download_url())
+    data = b"".join(rsp.streaming_content).decode("utf8")
+    assert list(csv.reader(StringIO(data))) == [
+        ["dmd_type", "dmd_id", "dmd_name", "bnf_code"],
+        ["VMP", "12", "Aluminium capsules", "0101010C0"],
+        ["VMP", "11", "Aluminium tablets", "0101010C0"],
+        ["AMP", "21", "Aluminium tablets (Brand A)", "0101010C0"],
+        ["AMP", "20", "Aluminium tablets (Brand B)", "0101010C0"],
+        ["VMP", "10", "Calcium tablets", "0101010D0"],
+        ["AMP", "22", "Calcium tablets (Brand A)", "0101010D0"],
+    ]
+    assert data == clv.dmd_csv_data_for_download()
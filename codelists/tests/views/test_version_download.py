@@ -1,13 +1,101 @@
 import csv
 from io import StringIO
 
-from ..factories import create_published_version
+from django.http import HttpResponse
+
+from builder.actions import update_code_statuses
+from opencodelists.actions import record_dataset_release
+
+from ...views.decorators import conditional_on_version
+from ..factories import create_draft_version, create_published_version
 
 
 def test_get(client):
     clv = create_published_version()
     rsp = client.get(clv.get_download_url())
-    reader = csv.reader(StringIO(rsp.content.decode("utf8")))
+    reader = csv.reader(StringIO(b"".join(rsp.streaming_content).decode("utf8")))
     data = list(reader)
     assert data[0] == ["code", "description"]
     assert data[1] == ["1067731000000107", "Injury whilst swimming (disorder)"]
+
+
+def test_get_new_style(client, version_with_some_searches):
+    clv = version_with_some_searches
+    rsp = client.get(clv.get_download_url())
+    reader = csv.reader(StringIO(b"".join(rsp.streaming_content).decode("utf8")))
+    data = list(reader)
+    assert data == clv.table
+
+
+def test_get_published_is_served_from_artefact(client):
+    clv = create_published_version()
+    artefact = clv.artefacts.get(kind="csv")
+
+    rsp = client.get(clv.get_download_url())
+
+    assert rsp["ETag"] == f'"{artefact.digest}"'
+    assert "Last-Modified" in rsp
+    assert b"".join(rsp.streaming_content).decode("utf8") == clv.csv_data
+
+
+def test_get_published_not_modified(client):
+    clv = create_published_version()
+    rsp = client.get(clv.get_download_url())
+
+    rsp = client.get(clv.get_download_url(), HTTP_IF_NONE_MATCH=rsp["ETag"])
+
+    assert rsp.status_code == 304
+
+
+def test_get_published_after_new_release(client):
+    clv = create_published_version()
+    record_dataset_release(dataset="coding_systems.snomedct", release_dir="new")
+
+    rsp = client.get(clv.get_download_url())
+
+    assert rsp.status_code == 200
+    assert clv.artefacts.filter(kind="csv").count() == 2
+
+
+def test_get_draft_not_modified(client):
+    clv = create_draft_version()
+    rsp = client.get(clv.get_download_url())
+    assert "ETag" in rsp
+    assert "Last-Modified" in rsp
+
+    rsp = client.get(clv.get_download_url(), HTTP_IF_NONE_MATCH=rsp["ETag"])
+    assert rsp.status_code == 304
+
+    rsp = client.get(
+        clv.get_download_url(), HTTP_IF_MODIFIED_SINCE=rsp["Last-Modified"]
+    )
+    assert rsp.status_code == 304
+
+
+def test_get_draft_modified_after_new_release(client):
+    clv = create_draft_version()
+    rsp = client.get(clv.get_download_url())
+    record_dataset_release(dataset="coding_systems.snomedct", release_dir="new")
+
+    rsp = client.get(clv.get_download_url(), HTTP_IF_NONE_MATCH=rsp["ETag"])
+    assert rsp.status_code == 200
+
+
+def test_conditional_on_version_skips_builder_drafts(rf, draft_with_no_searches):
+    draft = draft_with_no_searches
+
+    @conditional_on_version()
+    def view(request, clv):
+        return HttpResponse(",".join(sorted(clv.codes)))
+
+    rsp = view(rf.get("/"), draft)
+    assert "ETag" not in rsp
+    assert "Last-Modified" not in rsp
+
+    # Changing a code's status does not update the draft, so a conditional response
+    # would be stale
+    update_code_statuses(draft=draft, updates=[("128133004", "-")])
+
+    rsp = view(rf.get("/", HTTP_IF_NONE_MATCH="*"), draft)
+    assert rsp.status_code == 200
+    assert rsp.content.decode("utf8") == ",".join(sorted(draft.codes))
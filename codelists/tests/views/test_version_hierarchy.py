@@ -0,0 +1,37 @@
+def test_get(client, version_with_no_searches):
+    clv = version_with_no_searches
+    rsp = client.get(clv.get_hierarchy_url())
+    assert rsp.status_code == 200
+
+    data = rsp.json()
+    codes = data["codes"]
+    assert set(clv.codes) <= set(codes)
+    code_to_term = dict(zip(codes, data["terms"]))
+    assert code_to_term["128133004"] == "Disorder of elbow"
+    edges = {
+        (codes[parent_id], codes[child_id])
+        for parent_id, child_id in zip(data["parents"], data["children"])
+    }
+    assert ("128133004", "429554009") in edges
+
+
+def test_get_not_modified(client, version_with_no_searches):
+    clv = version_with_no_searches
+    rsp = client.get(clv.get_hierarchy_url())
+    assert "ETag" in rsp
+
+    rsp = client.get(clv.get_hierarchy_url(), HTTP_IF_NONE_MATCH=rsp["ETag"])
+    assert rsp.status_code == 304
+
+
+def test_get_old_style_version(client, old_style_version):
+    rsp = client.get(old_style_version.get_hierarchy_url())
+    assert rsp.status_code == 200
+
+
+def test_version_page_does_not_embed_hierarchy(client, version_with_no_searches):
+    clv = version_with_no_searches
+    rsp = client.get(clv.get_absolute_url())
+    assert b'id="hierarchy-url"' in rsp.content
+    assert b'id="parent-map"' not in rsp.content
+    assert b'id="code-to-term"' not in rsp.content
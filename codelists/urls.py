@@ -51,6 +51,7 @@ for subpath, view in [
     ("<codelist_slug>/<tag_or_hash>/download.csv", views.version_download),
     ("<codelist_slug>/<tag_or_hash>/definition.csv", views.version_download_definition),
     ("<codelist_slug>/<tag_or_hash>/dmd-download.csv", views.version_dmd_download),
+    ("<codelist_slug>/<tag_or_hash>/hierarchy.json", views.version_hierarchy),
 ]:
     urlpatterns.append(
         path(
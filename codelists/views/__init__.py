@@ -8,5 +8,6 @@ from .version_diff import version_diff
 from .version_dmd_download import version_dmd_download
 from .version_download import version_download
 from .version_download_definition import version_download_definition
+from .version_hierarchy import version_hierarchy
 from .version_publish import version_publish
 from .version_upload import version_upload
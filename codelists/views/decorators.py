@@ -1,11 +1,17 @@
+import hashlib
 from functools import wraps
 
-from django.db.models import Q
+from django.db.models import Max, Q
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 from opencodelists.hash_utils import unhash
-from opencodelists.models import Organisation, User
+from opencodelists.models import DatasetRelease, Organisation, User
 
+from .. import actions, artefacts
+from ..coding_systems import dataset_for_coding_system
 from ..models import Codelist, CodelistVersion
 
 
@@ -117,3 +123,110 @@ def require_permission(view_fn):
             return redirect("/")
 
     return wrapped_view
+
+
+def serve_artefact(kind):
+    """Serve the given kind of artefact for a published CodelistVersion, rendering it
+    first if necessary.  For other CodelistVersions, call the view function.
+
+    The response has an ETag and a Last-Modified header, and if the request's
+    conditional headers show that the client already has the artefact, the response is
+    a 304 (Not Modified).
+    """
+
+    def decorator(view_fn):
+        @wraps(view_fn)
+        def wrapped_view(request, clv, *args, **kwargs):
+            if not artefacts.is_cacheable(clv):
+                return view_fn(request, clv, *args, **kwargs)
+
+            artefact = artefacts.get_artefact(clv, kind)
+            if artefact is None:
+                artefact = actions.create_artefact(version=clv, kind=kind)
+
+            etag = quote_etag(artefact.digest)
+            last_modified = int(artefact.created_at.timestamp())
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = FileResponse(
+                    open(artefacts.path_for_digest(artefact.digest), "rb"),
+                    content_type="text/csv",
+                )
+                response[
+                    "Content-Disposition"
+                ] = 'attachment; filename="{}{}.csv"'.format(
+                    clv.download_filename(), artefacts.FILENAME_SUFFIXES[kind]
+                )
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            return response
+
+        return wrapped_view
+
+    return decorator
+
+
+def conditional_on_version():
+    """Give the response an ETag derived from the CodelistVersion, its Codelist, and the
+    current release of its coding system, and return a 304 (Not Modified) without
+    calling the view function if the request's conditional headers show that the client
+    already has the response.
+
+    This must only be used for responses that depend on nothing else, such as downloads.
+    In particular, it is not suitable for HTML pages, which also depend on the user,
+    their permissions, the CSRF token, and any messages to be shown.
+
+    Versions that are being edited in the builder (those with a draft_owner) are not
+    handled conditionally, since their codes' statuses change without the version being
+    updated.
+    """
+
+    def decorator(view_fn):
+        @wraps(view_fn)
+        def wrapped_view(request, clv, *args, **kwargs):
+            if clv.draft_owner:
+                return view_fn(request, clv, *args, **kwargs)
+
+            release = DatasetRelease.objects.current(
+                dataset_for_coding_system(clv.coding_system_id)
+            )
+            # The responses of some views depend on other versions of the codelist
+            latest_version_update = clv.codelist.versions.aggregate(
+                latest=Max("updated_at")
+            )["latest"]
+
+            etag_parts = [
+                clv.pk,
+                clv.updated_at.isoformat(),
+                clv.codelist.updated_at.isoformat(),
+                latest_version_update.isoformat(),
+                release and release.pk,
+                sorted(kwargs.items()),
+            ]
+            etag = quote_etag(hashlib.sha1(repr(etag_parts).encode("utf8")).hexdigest())
+
+            timestamps = [
+                clv.updated_at,
+                clv.codelist.updated_at,
+                latest_version_update,
+            ]
+            if release:
+                timestamps.append(release.imported_at)
+            last_modified = int(max(timestamps).timestamp())
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view_fn(request, clv, *args, **kwargs)
+
+            if response.status_code in [200, 304]:
+                response["ETag"] = etag
+                response["Last-Modified"] = http_date(last_modified)
+            return response
+
+        return wrapped_view
+
+    return decorator
@@ -12,10 +12,9 @@ from .decorators import load_version
 @load_version
 def version(request, clv):
     definition_rows = {}
-    child_map = None
     code_to_status = None
     code_to_term = None
-    parent_map = None
+    hierarchy_url = None
     tree_tables = None
     if clv.coding_system_id in ["bnf", "ctv3", "ctv3tpp", "icd10", "snomedct"]:
         if clv.coding_system_id in ["ctv3", "ctv3tpp"]:
@@ -24,15 +23,12 @@ def version(request, clv):
             coding_system = CODING_SYSTEMS[clv.coding_system_id]
 
         hierarchy = Hierarchy.from_codes(coding_system, clv.all_related_codes)
-        parent_map = {p: list(cc) for p, cc in hierarchy.parent_map.items()}
-        child_map = {c: list(pp) for c, pp in hierarchy.child_map.items()}
+        hierarchy_url = clv.get_hierarchy_url()
         code_to_term = coding_system.code_to_term(hierarchy.nodes)
         code_to_status = {
             code: "+" if code in clv.codes else "-" for code in hierarchy.nodes
         }
-        ancestor_codes = hierarchy.filter_to_ultimate_ancestors(
-            set(clv.codes) & hierarchy.nodes
-        )
+        ancestor_codes = hierarchy.ultimate_ancestors(set(clv.codes) & hierarchy.nodes)
         tree_tables = sorted(
             (type.title(), sorted(codes, key=code_to_term.__getitem__))
             for type, codes in coding_system.codes_by_type(
@@ -73,9 +69,7 @@ def version(request, clv):
         "headers": headers,
         "rows": rows,
         "tree_tables": tree_tables,
-        "parent_map": parent_map,
-        "child_map": child_map,
-        "code_to_term": code_to_term,
+        "hierarchy_url": hierarchy_url,
         "code_to_status": code_to_status,
         "definition_rows": definition_rows,
         "search_results": present_search_results(clv, code_to_term),
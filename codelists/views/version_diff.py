@@ -51,7 +51,7 @@ def version_diff(request, clv, other_tag_or_hash):
 def summarise(codes, coding_system):
     code_to_term = coding_system.code_to_term(codes)
     hierarchy = Hierarchy.from_codes(coding_system, codes)
-    ancestor_codes = hierarchy.filter_to_ultimate_ancestors(codes)
+    ancestor_codes = hierarchy.ultimate_ancestors(codes)
     summary = []
     for ancestor_code in ancestor_codes:
         descendants = sorted(
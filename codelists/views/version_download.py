@@ -1,14 +1,17 @@
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 
-from .decorators import load_version
+from .decorators import conditional_on_version, load_version, serve_artefact
 
 
 @load_version
+@serve_artefact("csv")
+@conditional_on_version()
 def version_download(request, clv):
-    response = HttpResponse(content_type="text/csv")
+    response = StreamingHttpResponse(
+        clv.iter_csv_data_for_download(), content_type="text/csv"
+    )
     content_disposition = 'attachment; filename="{}.csv"'.format(
         clv.download_filename()
     )
     response["Content-Disposition"] = content_disposition
-    response.write(clv.csv_data_for_download())
     return response
@@ -1,9 +1,11 @@
 from django.http import HttpResponse
 
-from .decorators import load_version
+from .decorators import conditional_on_version, load_version, serve_artefact
 
 
 @load_version
+@serve_artefact("definition")
+@conditional_on_version()
 def version_download_definition(request, clv):
     response = HttpResponse(content_type="text/csv")
     content_disposition = 'attachment; filename="{}-definition.csv"'.format(
@@ -0,0 +1,29 @@
+from django.http import Http404, JsonResponse
+
+from ..coding_systems import CODING_SYSTEMS
+from ..hierarchy import Hierarchy
+from ..presenters import present_hierarchy
+from .decorators import conditional_on_version, load_version
+
+
+@load_version
+@conditional_on_version()
+def version_hierarchy(request, clv):
+    """Return the hierarchy of the version's codes, and the terms of the codes in the
+    hierarchy, in the format described in present_hierarchy().
+
+    This is loaded by the version page, rather than being embedded in it, so that it
+    can be cached by the browser.
+    """
+
+    if clv.coding_system_id not in ["bnf", "ctv3", "ctv3tpp", "icd10", "snomedct"]:
+        raise Http404
+
+    if clv.coding_system_id in ["ctv3", "ctv3tpp"]:
+        coding_system = CODING_SYSTEMS["ctv3"]
+    else:
+        coding_system = CODING_SYSTEMS[clv.coding_system_id]
+
+    hierarchy = Hierarchy.from_codes(coding_system, clv.all_related_codes)
+    code_to_term = coding_system.code_to_term(hierarchy.nodes)
+    return JsonResponse(present_hierarchy(hierarchy, code_to_term))
@@ -1,8 +1,7 @@
 from collections import defaultdict
 
-from django.db.models import Q
-
-from opencodelists.db_utils import query
+from codelists import search_index, term_cache
+from opencodelists.db_utils import query, temp_table, values_list_in
 
 from .models import Concept
 
@@ -13,63 +12,78 @@ root = ""
 
 
 def search(term):
-    return set(
-        Concept.objects.filter(Q(name__contains=term) | Q(code=term)).values_list(
-            "code", flat=True
+    codes = search_index.codes_containing("bnf", term)
+    if codes is None:
+        codes = set(
+            Concept.objects.filter(name__contains=term).values_list("code", flat=True)
         )
-    )
+    return codes | set(Concept.objects.filter(code=term).values_list("code", flat=True))
+
+
+def search_index_documents():
+    """Return (code, term) pairs for the search index (see codelists/search_index.py)."""
+
+    return Concept.objects.values_list("code", "name")
 
 
 def ancestor_relationships(codes):
-    codes = list(codes)
     concept_table = Concept._meta.db_table
-    placeholders = ", ".join(["%s"] * len(codes))
-    sql = f"""
-    WITH RECURSIVE tree(parent_code, child_code) AS (
-      SELECT parent_id AS parent_code, code AS child_code
-      FROM {concept_table}
-      WHERE code IN ({placeholders}) AND parent_id IS NOT NULL
-
-      UNION
-
-      SELECT c.parent_id AS parent_code, c.code AS child_code
-      FROM {concept_table} c
-      INNER JOIN tree t
-        ON c.code = t.parent_code
-    )
+    with temp_table(codes) as codes_table:
+        sql = f"""
+        WITH RECURSIVE tree(parent_code, child_code) AS (
+          SELECT parent_id AS parent_code, code AS child_code
+          FROM {concept_table}
+          WHERE code IN (SELECT value FROM {codes_table}) AND parent_id IS NOT NULL
+
+          UNION
+
+          SELECT c.parent_id AS parent_code, c.code AS child_code
+          FROM {concept_table} c
+          INNER JOIN tree t
+            ON c.code = t.parent_code
+        )
 
-    SELECT parent_code, child_code FROM tree
-    """
+        SELECT parent_code, child_code FROM tree
+        """
 
-    return query(sql, codes)
+        return query(sql)
 
 
 def descendant_relationships(codes):
-    codes = list(codes)
     concept_table = Concept._meta.db_table
-    placeholders = ", ".join(["%s"] * len(codes))
-    sql = f"""
-    WITH RECURSIVE tree(parent_code, child_code) AS (
-      SELECT parent_id AS parent_code, code AS child_code
-      FROM {concept_table}
-      WHERE parent_code IN ({placeholders})
-
-      UNION
-
-      SELECT c.parent_id AS parent_code, c.code AS child_code
-      FROM {concept_table} c
-      INNER JOIN tree t
-        ON c.parent_id = t.child_code
-    )
+    with temp_table(codes) as codes_table:
+        sql = f"""
+        WITH RECURSIVE tree(parent_code, child_code) AS (
+          SELECT parent_id AS parent_code, code AS child_code
+          FROM {concept_table}
+          WHERE parent_code IN (SELECT value FROM {codes_table})
+
+          UNION
+
+          SELECT c.parent_id AS parent_code, c.code AS child_code
+          FROM {concept_table} c
+          INNER JOIN tree t
+            ON c.parent_id = t.child_code
+        )
 
-    SELECT parent_code, child_code FROM tree
-    """
+        SELECT parent_code, child_code FROM tree
+        """
 
-    return query(sql, codes)
+        return query(sql)
+
+
+def all_relationships():
+    return Concept.objects.filter(parent_id__isnull=False).values_list(
+        "parent_id", "code"
+    )
 
 
 def code_to_term(codes):
-    return dict(Concept.objects.filter(code__in=codes).values_list("code", "name"))
+    return term_cache.lookup("bnf", "term", codes, _code_to_term)
+
+
+def _code_to_term(codes):
+    return dict(values_list_in(Concept.objects, "code", codes, "code", "name"))
 
 
 lookup_names = code_to_term
@@ -4,6 +4,8 @@ import os
 
 from django.db import transaction
 
+from opencodelists.import_utils import timed
+
 from .models import TYPES, Concept
 
 
@@ -14,7 +16,7 @@ def import_data(release_dir):
 
     records = {type: set() for type in TYPES}
 
-    with open(path) as f:
+    with open(path) as f, timed("parse", path=path):
         for r in csv.DictReader(f):
             parent_code = None
             for type in TYPES:
@@ -24,10 +26,13 @@ def import_data(release_dir):
                     records[type].add((code, name, parent_code))
                     parent_code = code
 
-    with transaction.atomic():
+    with transaction.atomic(), timed("load", table=Concept._meta.db_table) as t:
         Concept.objects.all().delete()
+        t["num_rows"] = 0
         for type in TYPES:
-            Concept.objects.bulk_create(
-                Concept(code=code, name=name, type=type, parent_id=parent_code)
-                for code, name, parent_code in sorted(records[type])
+            t["num_rows"] += len(
+                Concept.objects.bulk_create(
+                    Concept(code=code, name=name, type=type, parent_id=parent_code)
+                    for code, name, parent_code in sorted(records[type])
+                )
             )
@@ -2,7 +2,8 @@ import collections
 
 from django.db.models import Q
 
-from opencodelists.db_utils import query
+from codelists import search_index, term_cache
+from opencodelists.db_utils import query, temp_table, values_list_in
 
 from .models import RawConceptTermMapping, TPPConcept, TPPRelationship
 
@@ -14,83 +15,112 @@ root = "....."
 
 def lookup_names(codes):
     return dict(
-        TPPConcept.objects.filter(read_code__in=codes).values_list(
-            "read_code", "description"
+        values_list_in(
+            TPPConcept.objects, "read_code", codes, "read_code", "description"
         )
     )
 
 
 def search(term):
+    codes = search_index.codes_containing("ctv3", term)
+    if codes is None:
+        tpp_read_codes = set(
+            TPPConcept.objects.filter(description__contains=term).values_list(
+                "read_code", flat=True
+            )
+        )
+        raw_read_codes = set(
+            RawConceptTermMapping.objects.filter(
+                Q(term__name_1__contains=term)
+                | Q(term__name_2__contains=term)
+                | Q(term__name_3__contains=term)
+            )
+            .values_list("concept_id", flat=True)
+            .distinct()
+        )
+        codes = tpp_read_codes | raw_read_codes
+
     tpp_read_codes = set(
-        TPPConcept.objects.filter(Q(description__contains=term) | Q(read_code=term))
-        .values_list("read_code", flat=True)
-        .distinct()
+        TPPConcept.objects.filter(read_code=term).values_list("read_code", flat=True)
     )
     raw_read_codes = set(
-        RawConceptTermMapping.objects.filter(
-            Q(term__name_1__contains=term)
-            | Q(term__name_2__contains=term)
-            | Q(term__name_3__contains=term)
-            | Q(concept_id=term)
-        )
+        RawConceptTermMapping.objects.filter(concept_id=term)
         .values_list("concept_id", flat=True)
         .distinct()
     )
-    return tpp_read_codes | raw_read_codes
+    return codes | tpp_read_codes | raw_read_codes
+
+
+def search_index_documents():
+    """Yield (code, term) pairs for the search index (see codelists/search_index.py)."""
+
+    yield from TPPConcept.objects.values_list("read_code", "description")
+
+    for concept_id, *names in RawConceptTermMapping.objects.values_list(
+        "concept_id", "term__name_1", "term__name_2", "term__name_3"
+    ):
+        for name in names:
+            yield concept_id, name
 
 
 def ancestor_relationships(codes):
-    codes = list(codes)
     relationship_table = TPPRelationship._meta.db_table
-    placeholders = ", ".join(["%s"] * len(codes))
-    sql = f"""
-    WITH RECURSIVE tree(ancestor_id, descendant_id) AS (
-      SELECT ancestor_id, descendant_id
-      FROM {relationship_table}
-      WHERE descendant_id IN ({placeholders}) AND distance = 1
-
-      UNION
-
-      SELECT r.ancestor_id, r.descendant_id
-      FROM {relationship_table} r
-      INNER JOIN tree t
-        ON r.descendant_id = t.ancestor_id
-      WHERE distance = 1
-    )
+    with temp_table(codes) as codes_table:
+        sql = f"""
+        WITH RECURSIVE tree(ancestor_id, descendant_id) AS (
+          SELECT ancestor_id, descendant_id
+          FROM {relationship_table}
+          WHERE descendant_id IN (SELECT value FROM {codes_table}) AND distance = 1
+
+          UNION
+
+          SELECT r.ancestor_id, r.descendant_id
+          FROM {relationship_table} r
+          INNER JOIN tree t
+            ON r.descendant_id = t.ancestor_id
+          WHERE distance = 1
+        )
 
-    SELECT ancestor_id, descendant_id FROM tree
-    """
+        SELECT ancestor_id, descendant_id FROM tree
+        """
 
-    return query(sql, codes)
+        return query(sql)
 
 
 def descendant_relationships(codes):
-    codes = list(codes)
     relationship_table = TPPRelationship._meta.db_table
-    placeholders = ", ".join(["%s"] * len(codes))
-    sql = f"""
-    WITH RECURSIVE tree(ancestor_id, descendant_id) AS (
-      SELECT ancestor_id, descendant_id
-      FROM {relationship_table}
-      WHERE ancestor_id IN ({placeholders}) AND distance = 1
-
-      UNION
-
-      SELECT r.ancestor_id, r.descendant_id
-      FROM {relationship_table} r
-      INNER JOIN tree t
-        ON r.ancestor_id = t.descendant_id
-      WHERE distance = 1
-    )
+    with temp_table(codes) as codes_table:
+        sql = f"""
+        WITH RECURSIVE tree(ancestor_id, descendant_id) AS (
+          SELECT ancestor_id, descendant_id
+          FROM {relationship_table}
+          WHERE ancestor_id IN (SELECT value FROM {codes_table}) AND distance = 1
+
+          UNION
+
+          SELECT r.ancestor_id, r.descendant_id
+          FROM {relationship_table} r
+          INNER JOIN tree t
+            ON r.ancestor_id = t.descendant_id
+          WHERE distance = 1
+        )
 
-    SELECT ancestor_id, descendant_id FROM tree
-    """
+        SELECT ancestor_id, descendant_id FROM tree
+        """
 
-    return query(sql, codes)
+        return query(sql)
+
+
+def all_relationships():
+    return (
+        TPPRelationship.objects.filter(distance=1)
+        .values_list("ancestor_id", "descendant_id")
+        .distinct()
+    )
 
 
 def code_to_term(codes):
-    return lookup_names(codes)
+    return term_cache.lookup("ctv3", "term", codes, lookup_names)
 
 
 def codes_by_type(codes, hierarchy):
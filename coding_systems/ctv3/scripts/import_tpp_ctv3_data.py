@@ -3,7 +3,10 @@ import os
 
 from django.db import transaction
 
+from codelists import search_index
+from codelists.coding_systems import CODING_SYSTEMS
 from coding_systems.ctv3.models import TPPConcept, TPPRelationship
+from opencodelists.actions import record_dataset_release
 
 
 def run(release_dir):
@@ -28,3 +31,7 @@ def run(release_dir):
             )
             for r in load_records("ctv3hierarchy")
         )
+
+        record_dataset_release(dataset="coding_systems.ctv3", release_dir=release_dir)
+
+    search_index.build_index(CODING_SYSTEMS["ctv3"])
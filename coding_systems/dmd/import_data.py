@@ -1,15 +1,37 @@
 import glob
+import itertools
+import multiprocessing
 import os
+import pickle
+import tempfile
 
 from django.db import connection, transaction
 from django.db.models import fields as django_fields
 from lxml import etree
 
+from opencodelists.db_utils import chunks
+from opencodelists.import_utils import timed
+
 from . import models
 
+# The number of rows inserted by each statement
+BATCH_SIZE = 10000
 
-@transaction.atomic
-def import_data(release_dir):
+# The fragments of the names of the files in a release, in the order that the files must
+# be imported, since the data model contains foreign key constraints
+FILENAME_FRAGMENTS = [
+    "lookup",
+    "ingredient",
+    "vtm",
+    "vmp",
+    "vmpp",
+    "amp",
+    "ampp",
+    "gtin",
+]
+
+
+def import_data(release_dir, mode="sequential"):
     # dm+d data is provided in several XML files:
     #
     # * f_amp2_3[ddmmyy].xml
@@ -72,124 +94,233 @@ def import_data(release_dir):
     # before it can be imported.  See code below.
     #
     # Since the data model contains foreign key constraints, the order we
-    # import the files is significant.
+    # import the files is significant (see FILENAME_FRAGMENTS).
     #
     # When importing the data, we first delete all existing instances,
     # because the IDs of some SNOMED objects can change.
+    #
+    # There are two modes:
+    #
+    # * sequential: each file is parsed and imported in turn;
+    # * parallel: the files are parsed in a pool of worker processes, which
+    #   write the rows for each model to temporary files, and the rows are
+    #   imported from those files in order as each file is finished with.
+    #
+    # In both modes, everything is imported in a single transaction.
 
-    # lookup
-    for elements in load_elements(release_dir, "lookup"):
-        model_name = make_model_name(elements.tag)
-        model = getattr(models, model_name)
-        import_model(model, elements)
-
-    # ingredient
-    elements = load_elements(release_dir, "ingredient")
-    import_model(models.Ing, elements)
-
-    # vtm
-    elements = load_elements(release_dir, "vtm")
-    import_model(models.VTM, elements)
-
-    # vmp
-    for elements in load_elements(release_dir, "vmp"):
-        model_name = make_model_name(elements[0].tag)
-        model = getattr(models, model_name)
-        import_model(model, elements)
-
-    # vmpp
-    for elements in load_elements(release_dir, "vmpp"):
-        if elements[0].tag == "CCONTENT":
-            # We don't yet handle the CCONTENT tag, which indicates that a
-            # VMPP is part of a combination pack, where two VMPPs are
-            # always prescribed together.
-            continue
+    if mode == "sequential":
+        import_sequentially(release_dir)
+    elif mode == "parallel":
+        import_in_parallel(release_dir)
+    else:
+        raise ValueError(f"Unknown import mode: {mode}")
 
-        model_name = make_model_name(elements[0].tag)
-        model = getattr(models, model_name)
-        import_model(model, elements)
 
-    # amp
-    for elements in load_elements(release_dir, "amp"):
-        if len(elements) == 0:
-            # For test data, some lists of elements are empty (eg
-            # AP_INFORMATION), and so we can't look at the first element of
-            # the list to get the name of the corresponding model.
-            continue
+@transaction.atomic
+def import_sequentially(release_dir):
+    for filename_fragment in FILENAME_FRAGMENTS:
+        for model, elements in iter_model_elements(release_dir, filename_fragment):
+            import_model(model, elements)
+
+
+def import_in_parallel(release_dir, processes=None):
+    """Parse each file in a separate process, and import the resulting rows in order.
+
+    The rows from each file are imported as soon as that file and all files before it
+    have been parsed, while later files are still being parsed.  Since the workers are
+    forked, they don't need to set Django up again, and they never use the database.
+
+    If a worker fails, the exception is raised here, and nothing is imported.
+    """
+
+    # An SQLite connection must not be carried across fork(), so we close the
+    # connection before the workers are forked.  It is reopened when it is next used.
+    # This means that this must not be called inside a transaction.
+    connection.close()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        args = [
+            (release_dir, filename_fragment, tmp_dir)
+            for filename_fragment in FILENAME_FRAGMENTS
+        ]
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            with transaction.atomic():
+                for model_names_and_paths in pool.imap(transform_file, args):
+                    for model_name, path in model_names_and_paths:
+                        import_rows(getattr(models, model_name), load_rows(path))
+
+
+def transform_file(args):
+    """Convert the elements in a file into rows, and write the rows for each model to a
+    temporary file.
+
+    This runs in a worker process, and takes a tuple of (release_dir,
+    filename_fragment, tmp_dir).  Returns list of (model name, path) pairs, in the
+    order that the models' rows must be imported.
+    """
+
+    release_dir, filename_fragment, tmp_dir = args
+    model_names_and_paths = []
+
+    try:
+        for model, elements in iter_model_elements(release_dir, filename_fragment):
+            path = os.path.join(tmp_dir, f"{model.__name__}.pickle")
+            with open(path, "wb") as f, timed(
+                "transform", table=model._meta.db_table
+            ) as t:
+                t["num_rows"] = 0
+                for batch in chunks(iter_rows(model, elements), BATCH_SIZE):
+                    pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+                    t["num_rows"] += len(batch)
+            model_names_and_paths.append((model.__name__, path))
+    except etree.XMLSyntaxError as e:
+        # lxml's exceptions can't be pickled, and so can't be sent back to the main
+        # process
+        raise ValueError(f"Could not parse {filename_fragment} file: {e}") from None
+
+    return model_names_and_paths
+
+
+def load_rows(path):
+    """Yield the rows written to a file by transform_file()."""
+
+    with open(path, "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def iter_model_elements(release_dir, filename_fragment):
+    """Yield (model, elements) for each list of elements to be imported from given
+    file.
+    """
+
+    if filename_fragment == "lookup":
+        for list_tag, _, elements in load_element_lists(release_dir, "lookup"):
+            model_name = make_model_name(list_tag)
+            yield getattr(models, model_name), elements
+
+    elif filename_fragment == "ingredient":
+        yield models.Ing, load_elements(release_dir, "ingredient")
+
+    elif filename_fragment == "vtm":
+        yield models.VTM, load_elements(release_dir, "vtm")
+
+    elif filename_fragment in ["vmp", "vmpp", "amp", "ampp"]:
+        for _, tag, elements in load_element_lists(release_dir, filename_fragment):
+            if tag == "CCONTENT":
+                # We don't yet handle the CCONTENT tag, which indicates that a
+                # VMPP or AMPP is part of a combination pack, where two VMPPs
+                # or AMPPs are always prescribed together.
+                continue
+
+            model_name = make_model_name(tag)
+            yield getattr(models, model_name), elements
+
+    elif filename_fragment == "gtin":
+        for _, _, elements in load_element_lists(release_dir, "gtin"):
+            yield models.GTIN, (flatten_gtin(element) for element in elements)
+            # Only the first list, of AMPPs, contains GTINs
+            break
 
-        model_name = make_model_name(elements[0].tag)
-        model = getattr(models, model_name)
-        import_model(model, elements)
-
-    # ampp
-    for elements in load_elements(release_dir, "ampp"):
-        if len(elements) == 0:
-            # For test data, some lists of elements are empty (eg
-            # APPLIANCE_PACK_INFO), and so we can't look at the first
-            # element of the list to get the name of the corresponding
-            # model.
-            continue
+    else:
+        assert False, filename_fragment
 
-        if elements[0].tag == "CCONTENT":
-            # We don't yet handle the CCONTENT tag, which indicates that a
-            # AMPP is part of a combination pack, where two AMPPs are
-            # always prescribed together.
-            continue
 
-        model_name = make_model_name(elements[0].tag)
-        model = getattr(models, model_name)
-        import_model(model, elements)
+def load_elements(release_dir, filename_fragment):
+    """Yield each non-comment top-level element in given file.
 
-    # gtin
-    elements = load_elements(release_dir, "gtin")[0]
-    for element in elements:
-        assert element[0].tag == "AMPPID"
-        assert element[1].tag == "GTINDATA"
+    The file is parsed incrementally, and each element is cleared once the caller has
+    finished with it, so that only a small part of the file is held in memory at once.
+    """
 
-        element[0].tag = "APPID"
-        for gtinelt in element[1]:
-            element.append(gtinelt)
-        element.remove(element[1])
-    import_model(models.GTIN, elements)
+    return iter_elements(find_path(release_dir, filename_fragment), depth=2)
 
 
-def load_elements(release_dir, filename_fragment):
-    """Return list of non-comment top-level elements in given file."""
+def load_element_lists(release_dir, filename_fragment):
+    """Yield (list tag, element tag, elements) for each non-empty top-level list of
+    elements in given file.
+
+    As with load_elements(), the file is parsed incrementally, and so each list's
+    elements must be consumed before moving on to the next list.
+    """
+
+    elements = iter_elements(find_path(release_dir, filename_fragment), depth=3)
+    for list_tag, group in itertools.groupby(
+        elements, key=lambda element: element.getparent().tag
+    ):
+        first = next(group)
+        yield list_tag, first.tag, itertools.chain([first], group)
+
 
+def find_path(release_dir, filename_fragment):
     paths = glob.glob(
         os.path.join(release_dir, "f_{}2_*.xml".format(filename_fragment))
     )
     assert len(paths) == 1
+    return paths[0]
+
+
+def iter_elements(path, depth):
+    """Yield each element at given depth in given XML file, where the root element has
+    depth 1.
+
+    Each element is cleared when the next element is requested, and anything before it
+    in the tree (such as earlier elements and comments) is removed.
+    """
+
+    current_depth = 0
+    for event, element in etree.iterparse(path, events=("start", "end")):
+        if event == "start":
+            current_depth += 1
+            continue
+
+        current_depth -= 1
+        if current_depth + 1 != depth:
+            continue
+
+        yield element
+
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+def flatten_gtin(element):
+    """Restructure a GTIN file's AMPP element so that it can be imported as a GTIN.
 
-    with open(paths[0]) as f:
-        doc = etree.parse(f)
+    The element contains an AMPPID element and a GTINDATA element, and the GTINDATA
+    element contains the GTIN's fields.
+    """
 
-    root = doc.getroot()
-    elements = list(root)
-    assert isinstance(elements[0], etree._Comment)
-    return elements[1:]
+    assert element[0].tag == "AMPPID"
+    assert element[1].tag == "GTINDATA"
+
+    element[0].tag = "APPID"
+    for gtinelt in element[1]:
+        element.append(gtinelt)
+    element.remove(element[1])
+    return element
 
 
 def import_model(model, elements):
-    """Import model instances from list of XML elements."""
+    """Import model instances from iterable of XML elements."""
 
-    model.objects.all().delete()
+    import_rows(model, iter_rows(model, elements))
+
+
+def iter_rows(model, elements):
+    """Yield list of values for each XML element, in the order of the model's
+    columns.
+    """
 
     boolean_field_names = [
         f.name for f in model._meta.fields if isinstance(f, django_fields.BooleanField)
     ]
-
-    table_name = model._meta.db_table
-    column_names = [
-        f.db_column or f.name
-        for f in model._meta.fields
-        if not isinstance(f, django_fields.AutoField)
-    ]
-    sql = "INSERT INTO {} ({}) VALUES ({})".format(
-        table_name, ", ".join(column_names), ", ".join(["%s"] * len(column_names))
-    )
-
-    values = []
+    column_names = get_column_names(model)
 
     for element in elements:
         row = {}
@@ -211,10 +342,37 @@ def import_model(model, elements):
         for name in boolean_field_names:
             row[name] = name in row
 
-        values.append([row.get(name) for name in column_names])
+        yield [row.get(name) for name in column_names]
+
 
-    with connection.cursor() as cursor:
-        cursor.executemany(sql, values)
+def import_rows(model, rows):
+    """Replace all model instances with instances from iterable of rows.
+
+    Rows are inserted in batches of BATCH_SIZE, so that we never hold every row in
+    memory.
+    """
+
+    model.objects.all().delete()
+
+    table_name = model._meta.db_table
+    column_names = get_column_names(model)
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        table_name, ", ".join(column_names), ", ".join(["%s"] * len(column_names))
+    )
+
+    with timed("load", table=table_name) as t, connection.cursor() as cursor:
+        t["num_rows"] = 0
+        for values in chunks(rows, BATCH_SIZE):
+            cursor.executemany(sql, values)
+            t["num_rows"] += len(values)
+
+
+def get_column_names(model):
+    return [
+        f.db_column or f.name
+        for f in model._meta.fields
+        if not isinstance(f, django_fields.AutoField)
+    ]
 
 
 def make_model_name(tag_name):
@@ -0,0 +1,196 @@
+import pytest
+
+from coding_systems.dmd import import_data
+from coding_systems.dmd.models import VTM, Colour, Ing, Route
+
+VTM_XML = """<?xml version="1.0" encoding="utf-8"?>
+<VIRTUAL_THERAPEUTIC_MOIETIES>
+    <!-- Generated by NHSBSA PPD -->
+    <VTM>
+        <VTMID>10000001</VTMID>
+        <NM>Aspirin</NM>
+    </VTM>
+    <VTM>
+        <VTMID>10000002</VTMID>
+        <INVALID>1</INVALID>
+        <NM>Paracetamol</NM>
+        <ABBREVNM>PCM</ABBREVNM>
+    </VTM>
+    <VTM>
+        <VTMID>10000003</VTMID>
+        <NM>Ibuprofen</NM>
+    </VTM>
+</VIRTUAL_THERAPEUTIC_MOIETIES>
+"""
+
+LOOKUP_XML = """<?xml version="1.0" encoding="utf-8"?>
+<LOOKUP>
+    <!-- Generated by NHSBSA PPD -->
+    <ROUTE>
+        <INFO>
+            <CD>26643006</CD>
+            <DESC>Oral</DESC>
+        </INFO>
+        <INFO>
+            <CD>47625008</CD>
+            <DESC>Intravenous</DESC>
+        </INFO>
+    </ROUTE>
+    <FLAVOUR>
+    </FLAVOUR>
+    <COLOUR>
+        <INFO>
+            <CD>1</CD>
+            <DESC>Red</DESC>
+        </INFO>
+    </COLOUR>
+</LOOKUP>
+"""
+
+
+INGREDIENT_XML = """<?xml version="1.0" encoding="utf-8"?>
+<INGREDIENT_SUBSTANCES>
+    <!-- Generated by NHSBSA PPD -->
+    <ING>
+        <ISID>387458008</ISID>
+        <NM>Aspirin</NM>
+    </ING>
+</INGREDIENT_SUBSTANCES>
+"""
+
+# The root and list tags of the files that we don't write any elements to
+EMPTY_FILES = {
+    "vmp": ("VIRTUAL_MED_PRODUCTS", "VMPS"),
+    "vmpp": ("VIRTUAL_MED_PRODUCT_PACK", "VMPPS"),
+    "amp": ("ACTUAL_MEDICINAL_PRODUCTS", "AMPS"),
+    "ampp": ("ACTUAL_MEDICINAL_PROD_PACKS", "AMPPS"),
+    "gtin": ("GTIN_DETAILS", "AMPPS"),
+}
+
+
+def write_file(release_dir, filename_fragment, xml):
+    path = release_dir / f"f_{filename_fragment}2_3010121.xml"
+    path.write_text(xml, encoding="utf8")
+
+
+def write_release(release_dir):
+    write_file(release_dir, "lookup", LOOKUP_XML)
+    write_file(release_dir, "ingredient", INGREDIENT_XML)
+    write_file(release_dir, "vtm", VTM_XML)
+    for filename_fragment, (root_tag, list_tag) in EMPTY_FILES.items():
+        write_file(
+            release_dir,
+            filename_fragment,
+            f"<{root_tag}><!-- Generated by NHSBSA PPD --><{list_tag}/></{root_tag}>",
+        )
+
+
+@pytest.mark.parametrize("mode", ["sequential", "parallel"])
+def test_import_data(tmp_path, mode):
+    write_release(tmp_path)
+
+    import_data.import_data(str(tmp_path), mode=mode)
+
+    assert dict(Route.objects.values_list("cd", "descr")) == {
+        "26643006": "Oral",
+        "47625008": "Intravenous",
+    }
+    assert dict(Colour.objects.values_list("cd", "descr")) == {1: "Red"}
+    assert list(Ing.objects.values_list("id", "invalid", "nm")) == [
+        ("387458008", False, "Aspirin")
+    ]
+    assert VTM.objects.count() == 3
+
+
+def test_import_in_parallel_rolls_back_when_worker_fails(tmp_path):
+    write_release(tmp_path)
+    write_file(tmp_path, "vtm", "<VIRTUAL_THERAPEUTIC_MOIETIES><VTM>")
+    Route.objects.create(cd="1", descr="Stale")
+
+    with pytest.raises(ValueError, match="Could not parse vtm file"):
+        import_data.import_data(str(tmp_path), mode="parallel")
+
+    # The lookup file was imported before the VTM file failed to parse, but the import
+    # is rolled back
+    assert dict(Route.objects.values_list("cd", "descr")) == {"1": "Stale"}
+    assert not Ing.objects.exists()
+
+
+def test_import_unknown_mode(tmp_path):
+    with pytest.raises(ValueError, match="Unknown import mode: partial"):
+        import_data.import_data(str(tmp_path), mode="partial")
+
+
+def test_load_elements(tmp_path):
+    write_file(tmp_path, "vtm", VTM_XML)
+
+    elements = import_data.load_elements(str(tmp_path), "vtm")
+
+    assert [element.findtext("VTMID") for element in elements] == [
+        "10000001",
+        "10000002",
+        "10000003",
+    ]
+
+
+def test_load_elements_clears_elements(tmp_path):
+    write_file(tmp_path, "vtm", VTM_XML)
+
+    elements = import_data.load_elements(str(tmp_path), "vtm")
+    first = next(elements)
+    assert len(first) == 2
+    second = next(elements)
+
+    # Once the next element is requested, the previous element is cleared, and
+    # everything before it (here, the comment) is removed from the tree.
+    assert len(first) == 0
+    assert first.getprevious() is None
+    assert second.getprevious() is first
+
+
+def test_load_element_lists(tmp_path):
+    write_file(tmp_path, "lookup", LOOKUP_XML)
+
+    lists = [
+        (list_tag, tag, [element.findtext("CD") for element in elements])
+        for list_tag, tag, elements in import_data.load_element_lists(
+            str(tmp_path), "lookup"
+        )
+    ]
+
+    # The empty FLAVOUR list is skipped
+    assert lists == [
+        ("ROUTE", "INFO", ["26643006", "47625008"]),
+        ("COLOUR", "INFO", ["1"]),
+    ]
+
+
+def test_import_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(import_data, "BATCH_SIZE", 2)
+    write_file(tmp_path, "vtm", VTM_XML)
+
+    import_data.import_model(VTM, import_data.load_elements(str(tmp_path), "vtm"))
+
+    assert list(
+        VTM.objects.order_by("id").values_list("id", "invalid", "abbrevnm")
+    ) == [
+        ("10000001", False, None),
+        ("10000002", True, "PCM"),
+        ("10000003", False, None),
+    ]
+
+
+def test_import_model_for_lookup(tmp_path):
+    write_file(tmp_path, "lookup", LOOKUP_XML)
+    Route.objects.create(cd="1", descr="Stale")
+
+    for list_tag, _, elements in import_data.load_element_lists(
+        str(tmp_path), "lookup"
+    ):
+        if list_tag == "ROUTE":
+            import_data.import_model(Route, elements)
+
+    assert dict(Route.objects.values_list("cd", "descr")) == {
+        "26643006": "Oral",
+        "47625008": "Intravenous",
+    }
@@ -4,16 +4,22 @@ https://apps.who.int/classifications/apps/icd/ClassificationDownload/DLArea/Down
 from django.db import transaction
 from lxml import etree
 
+from opencodelists.import_utils import timed
+
 from .models import Concept
 
 
 def import_data(release_path):
-    with open(release_path) as f:
+    with open(release_path) as f, timed("parse", path=release_path):
         doc = etree.parse(f)
 
-    with transaction.atomic():
+    with transaction.atomic(), timed("load", table=Concept._meta.db_table) as t:
         Concept.objects.all().delete()
-        Concept.objects.bulk_create(Concept(**record) for record in load_concepts(doc))
+        t["num_rows"] = len(
+            Concept.objects.bulk_create(
+                Concept(**record) for record in load_concepts(doc)
+            )
+        )
 
 
 def load_concepts(doc):
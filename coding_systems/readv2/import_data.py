@@ -1,10 +1,14 @@
 import csv
 import os
 
+from opencodelists.import_utils import timed
+
 from .models import Concept
 
 
 def import_data(release_dir):
     path = os.path.join(release_dir, "V2", "Unified", "Corev2.all")
-    with open(path) as f:
-        Concept.objects.bulk_create(Concept(*row) for row in csv.reader(f))
+    with open(path) as f, timed("load", table=Concept._meta.db_table) as t:
+        t["num_rows"] = len(
+            Concept.objects.bulk_create(Concept(*row) for row in csv.reader(f))
+        )
@@ -1,11 +1,17 @@
 import collections
 import re
 
-from django.db.models import Q
-
-from opencodelists.db_utils import query
-
-from .models import FULLY_SPECIFIED_NAME, IS_A, Concept, Description
+from codelists import search_index, term_cache
+from opencodelists.db_utils import query, temp_table, values_list_in
+
+from .models import (
+    FULLY_SPECIFIED_NAME,
+    IS_A,
+    Concept,
+    Description,
+    IsAClosure,
+    Relationship,
+)
 
 name = "SNOMED CT"
 short_name = "SNOMED CT"
@@ -17,84 +23,172 @@ term_and_type_pat = re.compile(r"(^.*) \(([\w/ ]+)\)$")
 
 
 def lookup_names(codes):
-    return {
-        description.concept_id: description.term
-        for description in Description.objects.filter(
-            concept__in=codes, type=FULLY_SPECIFIED_NAME
+    return dict(
+        values_list_in(
+            Description.objects.filter(type=FULLY_SPECIFIED_NAME),
+            "concept_id",
+            codes,
+            "concept_id",
+            "term",
         )
-    }
+    )
 
 
 def search(term):
-    return set(
-        Concept.objects.filter(active=True)
-        .filter(
-            Q(descriptions__term__contains=term, descriptions__active=True) | Q(id=term)
+    codes = search_index.codes_containing("snomedct", term)
+    if codes is None:
+        codes = set(
+            Concept.objects.filter(
+                active=True,
+                descriptions__term__contains=term,
+                descriptions__active=True,
+            ).values_list("id", flat=True)
         )
-        .values_list("id", flat=True)
+    return codes | set(
+        Concept.objects.filter(active=True, id=term).values_list("id", flat=True)
     )
 
 
-def ancestor_relationships(codes):
-    codes = list(codes)
-    placeholders = ", ".join(["%s"] * len(codes))
-    sql = f"""
-    WITH RECURSIVE tree(parent_id, child_id) AS (
-      SELECT
-        destination_id AS parent_id,
-        source_id AS child_id
-      FROM snomedct_relationship
-      WHERE child_id IN ({placeholders})
-        AND type_id = '{IS_A}'
-        AND active
-
-      UNION
-
-      SELECT
-        r.destination_id AS parent_id,
-        r.source_id AS child_id
-      FROM snomedct_relationship r
-      INNER JOIN tree t
-        ON r.source_id = t.parent_id
-      WHERE r.type_id = '{IS_A}'
-        AND active
-    )
+def search_index_documents(codes=None):
+    """Return (code, term) pairs for the search index (see codelists/search_index.py).
 
-    SELECT parent_id, child_id FROM tree
+    If codes are given, only pairs for those codes are returned.
     """
 
-    return query(sql, codes)
+    descriptions = Description.objects.filter(active=True, concept__active=True)
+    if codes is None:
+        return descriptions.values_list("concept_id", "term")
+    return values_list_in(descriptions, "concept_id", codes, "concept_id", "term")
+
+
+def ancestor_relationships(codes):
+    if closure_is_built():
+        return _ancestor_relationships_from_closure(codes)
+    return _ancestor_relationships_from_relationships(codes)
 
 
 def descendant_relationships(codes):
-    codes = list(codes)
-    placeholders = ", ".join(["%s"] * len(codes))
-    sql = f"""
-    WITH RECURSIVE tree(parent_id, child_id) AS (
-      SELECT
-        destination_id AS parent_id,
-        source_id AS child_id
-      FROM snomedct_relationship
-      WHERE parent_id IN ({placeholders})
-        AND type_id = '{IS_A}'
-        AND active
-
-      UNION
-
-      SELECT
-        r.destination_id AS parent_id,
-        r.source_id AS child_id
-      FROM snomedct_relationship r
-      INNER JOIN tree t
-        ON r.destination_id = t.child_id
-      WHERE r.type_id = '{IS_A}'
-        AND active
+    if closure_is_built():
+        return _descendant_relationships_from_closure(codes)
+    return _descendant_relationships_from_relationships(codes)
+
+
+def all_relationships():
+    return (
+        Relationship.objects.filter(type_id=IS_A, active=True)
+        .values_list("destination_id", "source_id")
+        .distinct()
     )
 
-    SELECT parent_id, child_id FROM tree
+
+def closure_is_built():
+    """Return whether the IsAClosure table has been populated.
+
+    The table is built at the end of each import, so it will only be empty if data has
+    been loaded some other way (eg from a fixture).
     """
 
-    return query(sql, codes)
+    return IsAClosure.objects.exists()
+
+
+def _ancestor_relationships_from_closure(codes):
+    with temp_table(codes) as codes_table:
+        sql = f"""
+        SELECT DISTINCT destination_id AS parent_id, source_id AS child_id
+        FROM snomedct_relationship
+        WHERE type_id = '{IS_A}'
+          AND active
+          AND (
+            source_id IN (SELECT value FROM {codes_table})
+            OR source_id IN (
+              SELECT ancestor_id
+              FROM snomedct_isaclosure
+              WHERE descendant_id IN (SELECT value FROM {codes_table})
+            )
+          )
+        """
+
+        return query(sql)
+
+
+def _descendant_relationships_from_closure(codes):
+    with temp_table(codes) as codes_table:
+        sql = f"""
+        SELECT DISTINCT destination_id AS parent_id, source_id AS child_id
+        FROM snomedct_relationship
+        WHERE type_id = '{IS_A}'
+          AND active
+          AND (
+            destination_id IN (SELECT value FROM {codes_table})
+            OR destination_id IN (
+              SELECT descendant_id
+              FROM snomedct_isaclosure
+              WHERE ancestor_id IN (SELECT value FROM {codes_table})
+            )
+          )
+        """
+
+        return query(sql)
+
+
+def _ancestor_relationships_from_relationships(codes):
+    with temp_table(codes) as codes_table:
+        sql = f"""
+        WITH RECURSIVE tree(parent_id, child_id) AS (
+          SELECT
+            destination_id AS parent_id,
+            source_id AS child_id
+          FROM snomedct_relationship
+          WHERE child_id IN (SELECT value FROM {codes_table})
+            AND type_id = '{IS_A}'
+            AND active
+
+          UNION
+
+          SELECT
+            r.destination_id AS parent_id,
+            r.source_id AS child_id
+          FROM snomedct_relationship r
+          INNER JOIN tree t
+            ON r.source_id = t.parent_id
+          WHERE r.type_id = '{IS_A}'
+            AND active
+        )
+
+        SELECT parent_id, child_id FROM tree
+        """
+
+        return query(sql)
+
+
+def _descendant_relationships_from_relationships(codes):
+    with temp_table(codes) as codes_table:
+        sql = f"""
+        WITH RECURSIVE tree(parent_id, child_id) AS (
+          SELECT
+            destination_id AS parent_id,
+            source_id AS child_id
+          FROM snomedct_relationship
+          WHERE parent_id IN (SELECT value FROM {codes_table})
+            AND type_id = '{IS_A}'
+            AND active
+
+          UNION
+
+          SELECT
+            r.destination_id AS parent_id,
+            r.source_id AS child_id
+          FROM snomedct_relationship r
+          INNER JOIN tree t
+            ON r.destination_id = t.child_id
+          WHERE r.type_id = '{IS_A}'
+            AND active
+        )
+
+        SELECT parent_id, child_id FROM tree
+        """
+
+        return query(sql)
 
 
 def _iter_code_to_term_and_type(codes: set):
@@ -106,8 +200,12 @@ def _iter_code_to_term_and_type(codes: set):
 
 
 def code_to_term_and_type(codes):
-    codes = set(codes)
-    return dict(_iter_code_to_term_and_type(codes))
+    return term_cache.lookup(
+        "snomedct",
+        "term_and_type",
+        codes,
+        lambda codes: dict(_iter_code_to_term_and_type(codes)),
+    )
 
 
 def code_to_term(codes):
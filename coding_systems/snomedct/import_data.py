@@ -1,41 +1,209 @@
+"""Import a release of SNOMED CT, in RF2 format.
+
+There are three modes:
+
+    full:     load the release's Full files, upserting each row into the live tables,
+              so that the most recent version of each component is kept;
+    snapshot: load the release's Snapshot files into empty staging tables, and then
+              replace the live tables with them;
+    delta:    load the release's Delta files, which contain only the components that
+              have changed since the previous release, upserting each row into the live
+              tables.
+
+The snapshot mode is much faster for a complete release, since the staging tables have
+no secondary indexes while they are loaded, and each row is inserted without checking
+for an existing row.  The live tables' indexes are rebuilt once, after the staging
+tables have been swapped in, and everything happens in a single transaction, so that
+readers see either the old release or the new one.
+
+The delta mode returns the ids of the concepts that have changed, and rather than
+rebuilding the IS_A closure, it updates the closure for just the concepts whose
+ancestors may have changed.  The import_data command uses the changed ids to update the
+search index incrementally.
+"""
+
 import csv
 import datetime
 import glob
 import os
+import re
 import sqlite3
+from collections import namedtuple
+from contextlib import contextmanager
 
 from django.db import connection as django_connection
+from django.db import transaction
 
-from .models import Concept, Description, Relationship
+from opencodelists.db_utils import temp_table
+from opencodelists.import_utils import timed
 
+from .models import IS_A, Concept, Description, IsAClosure, Relationship
 
-def import_data(release_dir):
-    def load_records(filename):
-        paths = glob.glob(
-            os.path.join(
-                release_dir, "Full", "Terminology", "sct2_" + filename + "*.txt"
-            )
-        )
-        assert len(paths) == 1
+# Maps each model to the RF2 files it is loaded from
+MODEL_FILENAMES = [
+    (Concept, ["Concept"]),
+    (Description, ["Description"]),
+    (Relationship, ["StatedRelationship", "Relationship"]),
+]
+
+
+# The ids of the concepts that were changed by a delta import, split by which of their
+# components changed
+DeltaChanges = namedtuple(
+    "DeltaChanges",
+    ["concept_ids", "description_concept_ids", "relationship_source_ids"],
+)
+
+
+def import_data(release_dir, mode="full"):
+    if mode == "full":
+        import_full(release_dir)
+    elif mode == "snapshot":
+        import_snapshot(release_dir)
+    elif mode == "delta":
+        changes = import_delta(release_dir)
+        return changed_concept_ids(changes)
+    else:
+        raise ValueError(f"Unknown import mode: {mode}")
 
-        with open(paths[0]) as f:
-            reader = csv.reader(f, delimiter="\t")
-            next(reader)
-            for r in reader:
-                r[1] = parse_date(r[1])  # effective_time
-                r[2] = r[2] == "1"  # active
-                yield r
 
+def import_full(release_dir):
     connection_params = django_connection.get_connection_params()
     connection = sqlite3.connect(**connection_params)
-    connection.executemany(build_sql(Concept), load_records("Concept"))
-    connection.executemany(build_sql(Description), load_records("Description"))
-    connection.executemany(build_sql(Relationship), load_records("StatedRelationship"))
-    connection.executemany(build_sql(Relationship), load_records("Relationship"))
+    for model, filenames in MODEL_FILENAMES:
+        for filename in filenames:
+            with timed("load", table=model._meta.db_table, filename=filename) as t:
+                cursor = connection.executemany(
+                    build_sql(model), load_records(release_dir, "Full", filename)
+                )
+                t["num_rows"] = cursor.rowcount
+    with timed("closure"):
+        build_closure(connection)
     connection.commit()
     connection.close()
 
 
+def import_snapshot(release_dir):
+    """Load the release's Snapshot files into staging tables, and swap them in for the
+    live tables.
+
+    Timings for each stage are logged.
+    """
+
+    django_connection.ensure_connection()
+    connection = django_connection.connection
+
+    # SQLite does not allow foreign key enforcement or the safety level to be changed
+    # within a transaction, so if we're called within one (eg in tests) we leave them
+    # alone.
+    in_transaction = django_connection.in_atomic_block
+
+    with timed("import_snapshot"):
+        with _bulk_load_pragmas(connection, enabled=not in_transaction):
+            with django_connection.constraint_checks_disabled():
+                with transaction.atomic():
+                    tables = [model._meta.db_table for model, _ in MODEL_FILENAMES]
+                    table_to_index_sql = {
+                        table: get_index_sql(connection, table) for table in tables
+                    }
+
+                    for model, filenames in MODEL_FILENAMES:
+                        table = model._meta.db_table
+                        staging_table = create_staging_table(connection, table)
+                        for filename in filenames:
+                            with timed("load", table=table, filename=filename) as t:
+                                cursor = connection.executemany(
+                                    build_insert_sql(model, staging_table),
+                                    load_records(release_dir, "Snapshot", filename),
+                                )
+                                t["num_rows"] = cursor.rowcount
+
+                    with timed("swap", tables=tables):
+                        for table in tables:
+                            swap_in_staging_table(connection, table)
+
+                    for table in tables:
+                        with timed("index", table=table):
+                            for sql in table_to_index_sql[table]:
+                                connection.execute(sql)
+
+                    with timed("closure"):
+                        build_closure(connection)
+
+
+def import_delta(release_dir):
+    """Apply the changes in the release's Delta files to the live tables, and return a
+    DeltaChanges recording which concepts were changed.
+
+    A row is only applied if it is more recent than the existing row with the same id,
+    and only rows that are applied are recorded as changes.
+    """
+
+    django_connection.ensure_connection()
+    connection = django_connection.connection
+    changes = DeltaChanges(set(), set(), set())
+
+    with timed("import_delta") as t, transaction.atomic():
+        for model, filenames in MODEL_FILENAMES:
+            sql = build_sql(model)
+            for filename in filenames:
+                with timed("load", table=model._meta.db_table, filename=filename) as t2:
+                    num_rows = 0
+                    for record in load_records(release_dir, "Delta", filename):
+                        if connection.execute(sql, record).rowcount == 0:
+                            # There was already a row at least as recent
+                            continue
+                        num_rows += 1
+                        if model == Concept:
+                            changes.concept_ids.add(record[0])
+                        elif model == Description:
+                            changes.description_concept_ids.add(record[4])
+                        else:
+                            changes.relationship_source_ids.add(record[4])
+                    t2["num_rows"] = num_rows
+
+        with timed("closure"):
+            update_closure(connection, changes.relationship_source_ids)
+
+        t["num_concepts"] = len(changed_concept_ids(changes))
+
+    return changes
+
+
+def changed_concept_ids(changes):
+    """Return the ids of all concepts recorded in the given DeltaChanges."""
+
+    return (
+        changes.concept_ids
+        | changes.description_concept_ids
+        | changes.relationship_source_ids
+    )
+
+
+def load_records(release_dir, release_type, filename):
+    """Yield records from the given RF2 file, where release_type is one of "Full",
+    "Snapshot", and "Delta".
+    """
+
+    paths = glob.glob(
+        os.path.join(
+            release_dir,
+            release_type,
+            "Terminology",
+            f"sct2_{filename}_{release_type}*.txt",
+        )
+    )
+    assert len(paths) == 1, paths
+
+    with open(paths[0], encoding="utf8") as f:
+        reader = csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+        next(reader)
+        for r in reader:
+            r[1] = parse_date(r[1])  # effective_time
+            r[2] = r[2] == "1"  # active
+            yield r
+
+
 def parse_date(datestr):
     return datetime.date(int(datestr[:4]), int(datestr[4:6]), int(datestr[6:]))
 
@@ -57,3 +225,207 @@ def build_sql(model):
     """.format(
         **locals()
     )
+
+
+def build_insert_sql(model, table_name):
+    cols = ", ".join(f.attname for f in model._meta.fields)
+    params = ", ".join("?" for f in model._meta.fields)
+    return f"INSERT INTO {table_name}({cols}) VALUES ({params})"
+
+
+def create_staging_table(connection, table):
+    """Create an empty table with the same definition as the given table, but without
+    any of its secondary indexes, and return its name.
+    """
+
+    staging_table = f"{table}_staging"
+    (sql,) = connection.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", [table]
+    ).fetchone()
+    sql, num_subs = re.subn(
+        rf'^CREATE TABLE "?{table}"?', f'CREATE TABLE "{staging_table}"', sql
+    )
+    assert num_subs == 1, sql
+    connection.execute(f"DROP TABLE IF EXISTS {staging_table}")
+    connection.execute(sql)
+    return staging_table
+
+
+def get_index_sql(connection, table):
+    """Return list of statements that create the given table's secondary indexes."""
+
+    return [
+        sql
+        for (sql,) in connection.execute(
+            "SELECT sql FROM sqlite_master"
+            " WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            [table],
+        )
+    ]
+
+
+def swap_in_staging_table(connection, table):
+    """Replace the given table with its staging table.
+
+    The table's secondary indexes are dropped along with it, and must be recreated.
+    """
+
+    # With legacy_alter_table on, renaming the staging table does not rewrite references
+    # to it in other tables, and so foreign keys that refer to the live table by name
+    # refer to the staging table once it has been renamed.  Django does the same when
+    # altering tables.
+    connection.execute("PRAGMA legacy_alter_table = ON")
+    connection.execute(f"DROP TABLE {table}")
+    connection.execute(f"ALTER TABLE {table}_staging RENAME TO {table}")
+    connection.execute("PRAGMA legacy_alter_table = OFF")
+
+
+@contextmanager
+def _bulk_load_pragmas(connection, enabled):
+    """Tune SQLite for loading a large amount of data in a single transaction, and
+    restore the previous settings afterwards.
+
+    Since the whole load is done in one transaction, the database is still consistent if
+    the process crashes, but not if the OS crashes before the data has been flushed to
+    disk.
+    """
+
+    if not enabled:
+        yield
+        return
+
+    pragmas = {"synchronous": "OFF", "cache_size": -512000, "temp_store": "MEMORY"}
+    previous = {
+        pragma: connection.execute(f"PRAGMA {pragma}").fetchone()[0]
+        for pragma in pragmas
+    }
+    for pragma, value in pragmas.items():
+        connection.execute(f"PRAGMA {pragma} = {value}")
+    try:
+        yield
+    finally:
+        for pragma, value in previous.items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+
+
+def build_closure(connection):
+    """Rebuild the IsAClosure table from active IS_A relationships.
+
+    The closure is built one level at a time: first every direct IS_A relationship is
+    recorded with distance 1, and then at each step every record at the current distance
+    is extended by one more IS_A relationship.  Since each (ancestor, descendant) pair is
+    first seen at the shortest distance between them, INSERT OR IGNORE means that we
+    keep that distance.  We stop when a step produces no new records.
+
+    `connection` may be either a sqlite3 connection or a Django cursor.
+    """
+
+    closure_table = IsAClosure._meta.db_table
+    relationship_table = Relationship._meta.db_table
+
+    connection.execute(f"DELETE FROM {closure_table}")
+    connection.execute(
+        f"""
+        INSERT OR IGNORE INTO {closure_table} (ancestor_id, descendant_id, distance)
+        SELECT destination_id, source_id, 1
+        FROM {relationship_table}
+        WHERE type_id = '{IS_A}' AND active
+        """
+    )
+
+    # This index is only needed while building the table, to find the records at the
+    # current distance.
+    connection.execute(
+        f"CREATE INDEX {closure_table}_build_idx ON {closure_table} (distance)"
+    )
+
+    distance = 1
+    while True:
+        cursor = connection.execute(
+            f"""
+            INSERT OR IGNORE INTO {closure_table} (ancestor_id, descendant_id, distance)
+            SELECT c.ancestor_id, r.source_id, {distance + 1}
+            FROM {closure_table} c
+            INNER JOIN {relationship_table} r
+              ON r.destination_id = c.descendant_id
+            WHERE c.distance = {distance}
+              AND r.type_id = '{IS_A}'
+              AND r.active
+            """
+        )
+        if cursor.rowcount == 0:
+            break
+        distance += 1
+
+    connection.execute(f"DROP INDEX {closure_table}_build_idx")
+
+
+def update_closure(connection, concept_ids):
+    """Update the IsAClosure table after the IS_A relationships of the given concepts
+    (as sources) have changed.
+
+    The only concepts whose ancestors can have changed are the given concepts and their
+    descendants.  (A concept's ancestors only change if a relationship on one of its
+    paths to the root changes, and the source of that relationship is then the concept
+    or one of its ancestors.)  We delete the records of the ancestors of these concepts,
+    and walk up the hierarchy from them to record their ancestors again.
+
+    `connection` must be the DB-API connection of Django's connection, since a temporary
+    table is created with Django's connection.
+    """
+
+    if not concept_ids:
+        return
+
+    closure_table = IsAClosure._meta.db_table
+    relationship_table = Relationship._meta.db_table
+
+    with temp_table(concept_ids) as changed_table:
+        affected_ids = set(concept_ids)
+        affected_ids.update(
+            descendant_id
+            for (descendant_id,) in connection.execute(
+                f"""
+                SELECT descendant_id FROM {closure_table}
+                WHERE ancestor_id IN (SELECT value FROM {changed_table})
+                """
+            )
+        )
+
+    with temp_table(affected_ids) as affected_table:
+        connection.execute(
+            f"""
+            DELETE FROM {closure_table}
+            WHERE descendant_id IN (SELECT value FROM {affected_table})
+            """
+        )
+        connection.execute(
+            f"""
+            INSERT OR IGNORE INTO {closure_table} (ancestor_id, descendant_id, distance)
+            SELECT destination_id, source_id, 1
+            FROM {relationship_table}
+            WHERE source_id IN (SELECT value FROM {affected_table})
+              AND type_id = '{IS_A}'
+              AND active
+            """
+        )
+
+        distance = 1
+        while True:
+            cursor = connection.execute(
+                f"""
+                INSERT OR IGNORE INTO {closure_table}
+                  (ancestor_id, descendant_id, distance)
+                SELECT r.destination_id, c.descendant_id, {distance + 1}
+                FROM {closure_table} c
+                INNER JOIN {relationship_table} r
+                  ON r.source_id = c.ancestor_id
+                WHERE c.descendant_id IN (SELECT value FROM {affected_table})
+                  AND c.distance = {distance}
+                  AND r.type_id = '{IS_A}'
+                  AND r.active
+                """
+            )
+            if cursor.rowcount == 0:
+                break
+            distance += 1
@@ -5,6 +5,8 @@ import sqlite3
 
 from django.db import connection as django_connection
 
+from opencodelists.import_utils import timed
+
 from .models import HistorySubstitution, QueryTableRecord
 
 
@@ -40,10 +42,14 @@ def import_data(release_dir):
 
     connection_params = django_connection.get_connection_params()
     connection = sqlite3.connect(**connection_params)
-    connection.executemany(build_sql(QueryTableRecord), load_query_table_records())
-    connection.executemany(
-        build_sql(HistorySubstitution), load_history_substitution_table_recods()
-    )
+    with timed("load", table=QueryTableRecord._meta.db_table) as t:
+        t["num_rows"] = connection.executemany(
+            build_sql(QueryTableRecord), load_query_table_records()
+        ).rowcount
+    with timed("load", table=HistorySubstitution._meta.db_table) as t:
+        t["num_rows"] = connection.executemany(
+            build_sql(HistorySubstitution), load_history_substitution_table_recods()
+        ).rowcount
     connection.commit()
     connection.close()
 
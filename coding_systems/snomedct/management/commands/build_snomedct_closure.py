@@ -0,0 +1,19 @@
+"""
+Rebuild the closure table of the SNOMED CT IS_A hierarchy.
+
+This is done automatically at the end of each import, but can be run by hand to build the
+table for data that has already been imported.
+"""
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+from ...import_data import build_closure
+
+
+class Command(BaseCommand):
+    help = __doc__
+
+    def handle(self, **kwargs):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                build_closure(cursor)
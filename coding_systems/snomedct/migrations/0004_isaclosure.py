@@ -0,0 +1,31 @@
+# Generated by Django 3.1.5 on 2026-10-18 18:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snomedct', '0003_auto_20200806_1428'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IsAClosure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance', models.IntegerField()),
+                ('ancestor', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='snomedct.concept')),
+                ('descendant', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='snomedct.concept')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='isaclosure',
+            index=models.Index(fields=['descendant', 'ancestor'], name='snomedct_is_descend_0c15e6_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='isaclosure',
+            unique_together={('ancestor', 'descendant')},
+        ),
+    ]
@@ -216,3 +216,33 @@ class QueryTableRecord(models.Model):
         "Concept", on_delete=models.CASCADE, related_name="+", db_constraint=False
     )
     provenance = models.IntegerField()
+
+
+class IsAClosure(models.Model):
+    """Transitive closure of the active IS_A hierarchy.
+
+    There is one record for each (ancestor, descendant) pair, where distance is the
+    length of the shortest IS_A path between them.  This table is rebuilt at the end of
+    each import (see import_data.build_closure()) and lets us find all ancestors or
+    descendants of a set of concepts with indexed lookups rather than a recursive walk.
+    """
+
+    ancestor = models.ForeignKey(
+        "Concept",
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_constraint=False,
+        db_index=False,
+    )
+    descendant = models.ForeignKey(
+        "Concept",
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_constraint=False,
+        db_index=False,
+    )
+    distance = models.IntegerField()
+
+    class Meta:
+        unique_together = ("ancestor", "descendant")
+        indexes = [models.Index(fields=["descendant", "ancestor"])]
@@ -0,0 +1,91 @@
+from django.db import connection
+
+from coding_systems.snomedct import coding_system
+from coding_systems.snomedct.import_data import build_closure
+from coding_systems.snomedct.models import IsAClosure
+
+# These codes are in the tennis-elbow fixture.  See opencodelists/tests/fixtures.py for
+# their place in the hierarchy.
+CODES = [
+    ["128133004"],  # Disorder of elbow
+    ["439656005"],  # Arthritis of elbow
+    ["202855006", "238484001"],  # Lateral epicondylitis, Tennis toe
+]
+
+
+def _build_closure():
+    with connection.cursor() as cursor:
+        build_closure(cursor)
+
+
+def test_build_closure(tennis_elbow):
+    _build_closure()
+
+    # Arthritis of elbow is a direct child of Arthritis...
+    assert (
+        IsAClosure.objects.get(
+            ancestor_id="3723001", descendant_id="439656005"
+        ).distance
+        == 1
+    )
+
+    # ...and Lateral epicondylitis is three steps away from Disorder of elbow along two
+    # different paths, but is only recorded once.
+    assert (
+        IsAClosure.objects.get(
+            ancestor_id="128133004", descendant_id="202855006"
+        ).distance
+        == 3
+    )
+
+    # There is no IS_A path from a concept to itself
+    assert not IsAClosure.objects.filter(
+        ancestor_id="128133004", descendant_id="128133004"
+    ).exists()
+
+
+def test_build_closure_is_idempotent(tennis_elbow):
+    _build_closure()
+    count = IsAClosure.objects.count()
+    _build_closure()
+    assert IsAClosure.objects.count() == count
+
+
+def test_ancestor_relationships_from_closure_matches_recursive_query(tennis_elbow):
+    expected = [set(coding_system.ancestor_relationships(codes)) for codes in CODES]
+    assert not coding_system.closure_is_built()
+
+    _build_closure()
+    assert coding_system.closure_is_built()
+
+    for codes, relationships in zip(CODES, expected):
+        assert relationships
+        assert set(coding_system.ancestor_relationships(codes)) == relationships
+
+
+def test_descendant_relationships_from_closure_matches_recursive_query(tennis_elbow):
+    expected = [set(coding_system.descendant_relationships(codes)) for codes in CODES]
+    assert not coding_system.closure_is_built()
+
+    _build_closure()
+    assert coding_system.closure_is_built()
+
+    for codes, relationships in zip(CODES, expected):
+        assert set(coding_system.descendant_relationships(codes)) == relationships
+
+
+def test_lookup_names_with_many_codes(tennis_elbow):
+    codes = ["202855006", "73583000"] + [str(code) for code in range(5000)]
+
+    assert coding_system.lookup_names(codes) == {
+        "202855006": "Lateral epicondylitis (disorder)",
+        "73583000": "Epicondylitis (disorder)",
+    }
+
+
+def test_relationships_with_more_codes_than_sqlite_parameters(tennis_elbow):
+    # More codes than SQLITE_MAX_VARIABLE_NUMBER, which is 32766 by default
+    codes = ["202855006"] + [str(code) for code in range(40000)]
+
+    assert ("73583000", "202855006") in coding_system.ancestor_relationships(codes)
+    assert coding_system.descendant_relationships(codes) == []
@@ -0,0 +1,312 @@
+import csv
+import datetime
+
+from django.core.management import call_command
+from django.db import connection
+
+from codelists import graphs, search_index
+from codelists.coding_systems import CODING_SYSTEMS
+from coding_systems.snomedct import import_data
+from coding_systems.snomedct.models import (
+    FULLY_SPECIFIED_NAME,
+    IS_A,
+    Concept,
+    Description,
+    IsAClosure,
+    Relationship,
+)
+
+# The RF2 files that each model is written to, and their headers
+FILES = [
+    (
+        Concept,
+        "Concept",
+        ["id", "effectiveTime", "active", "moduleId", "definitionStatusId"],
+    ),
+    (
+        Description,
+        "Description",
+        [
+            "id",
+            "effectiveTime",
+            "active",
+            "moduleId",
+            "conceptId",
+            "languageCode",
+            "typeId",
+            "term",
+            "caseSignificanceId",
+        ],
+    ),
+    (
+        Relationship,
+        "Relationship",
+        [
+            "id",
+            "effectiveTime",
+            "active",
+            "moduleId",
+            "sourceId",
+            "destinationId",
+            "relationshipGroup",
+            "typeId",
+            "characteristicTypeId",
+            "modifierId",
+        ],
+    ),
+]
+
+NEW_CONCEPT_ID = "999000001000000"
+
+
+def write_release(release_dir, release_type, model_to_rows):
+    """Write RF2 files of the given type containing the given rows."""
+
+    terminology_dir = release_dir / release_type / "Terminology"
+    terminology_dir.mkdir(parents=True)
+
+    for model, filename, header in FILES:
+        rows = model_to_rows.get(model, [])
+        _write_file(terminology_dir, f"{filename}_{release_type}", header, rows)
+        if model == Relationship:
+            _write_file(
+                terminology_dir, f"StatedRelationship_{release_type}", header, []
+            )
+
+
+def _write_file(terminology_dir, filename, header, rows):
+    path = terminology_dir / f"sct2_{filename}_INT_20210101.txt"
+    with open(path, "w", encoding="utf8") as f:
+        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow([_format(value) for value in row])
+
+
+def _format(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y%m%d")
+    return value
+
+
+def rows_from_db(model):
+    fields = [f.attname for f in model._meta.fields]
+    return [list(row) for row in model.objects.values_list(*fields)]
+
+
+def row_from_instance(instance):
+    return [getattr(instance, f.attname) for f in instance._meta.fields]
+
+
+def closure_rows():
+    return set(
+        IsAClosure.objects.values_list("ancestor_id", "descendant_id", "distance")
+    )
+
+
+def index_names(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s",
+            [table],
+        )
+        return {name for (name,) in cursor.fetchall()}
+
+
+def new_concept_rows(concept_id, parent_id, term):
+    concept = [concept_id, "20210101", "1", "900000000000207008", "900000000000074008"]
+    description = [
+        concept_id + "1",
+        "20210101",
+        "1",
+        "900000000000207008",
+        concept_id,
+        "en",
+        FULLY_SPECIFIED_NAME,
+        term,
+        "900000000000448009",
+    ]
+    relationship = [
+        concept_id + "2",
+        "20210101",
+        "1",
+        "900000000000207008",
+        concept_id,
+        parent_id,
+        "0",
+        IS_A,
+        "900000000000011006",
+        "900000000000451002",
+    ]
+    return concept, description, relationship
+
+
+def test_import_snapshot(tennis_elbow, tmp_path):
+    tables = [Concept._meta.db_table, Description._meta.db_table]
+    indexes_before = {table: index_names(table) for table in tables}
+
+    model_to_rows = {model: rows_from_db(model) for model, _, _ in FILES}
+    num_concepts = len(model_to_rows[Concept])
+
+    # Change the term of Disorder of elbow's FSN...
+    description = Description.objects.get(
+        concept_id="128133004", type_id=FULLY_SPECIFIED_NAME, active=True
+    )
+    for row in model_to_rows[Description]:
+        if row[0] == description.id:
+            row[7] = "Elbow disorder (disorder)"
+
+    # ...and add a new child of Disorder of elbow.
+    concept, description_row, relationship = new_concept_rows(
+        NEW_CONCEPT_ID, "128133004", "Elbow trouble (disorder)"
+    )
+    model_to_rows[Concept].append(concept)
+    model_to_rows[Description].append(description_row)
+    model_to_rows[Relationship].append(relationship)
+
+    write_release(tmp_path, "Snapshot", model_to_rows)
+
+    import_data.import_data(str(tmp_path), mode="snapshot")
+
+    assert Concept.objects.count() == num_concepts + 1
+    assert Description.objects.get(id=description.id).term == (
+        "Elbow disorder (disorder)"
+    )
+    assert Concept.objects.get(id=NEW_CONCEPT_ID).fully_specified_name == (
+        "Elbow trouble (disorder)"
+    )
+    assert IsAClosure.objects.filter(
+        ancestor_id="116307009", descendant_id=NEW_CONCEPT_ID
+    ).exists()
+
+    # The staging tables have been swapped in, and the indexes have been rebuilt
+    assert index_names(Concept._meta.db_table + "_staging") == set()
+    for table in tables:
+        assert index_names(table) == indexes_before[table]
+
+    # Foreign keys refer to the new tables
+    assert Description.objects.filter(concept__id=NEW_CONCEPT_ID).count() == 1
+
+
+def test_import_delta(tennis_elbow, tmp_path):
+    coding_system = CODING_SYSTEMS["snomedct"]
+
+    # The fixtures don't include the whole of the closure, so build it first.
+    with connection.cursor() as cursor:
+        import_data.build_closure(cursor)
+    newer = datetime.date(2099, 1, 1)
+    older = datetime.date(1999, 1, 1)
+
+    # A newer version of Disorder of elbow's FSN is applied...
+    description = Description.objects.get(
+        concept_id="128133004", type_id=FULLY_SPECIFIED_NAME, active=True
+    )
+    description_row = row_from_instance(description)
+    description_row[1] = newer
+    description_row[7] = "Elbow disorder (disorder)"
+
+    # ...but an older version of Lateral epicondylitis's FSN is not...
+    stale_description = Description.objects.get(
+        concept_id="202855006", type_id=FULLY_SPECIFIED_NAME, active=True
+    )
+    stale_description_row = row_from_instance(stale_description)
+    stale_description_row[1] = older
+    stale_description_row[7] = "Tennis thing (disorder)"
+
+    # ...and Disorder of elbow stops being a Finding of elbow region, and gains a new
+    # child.
+    relationship = Relationship.objects.get(
+        source_id="128133004", destination_id="116309007", type_id=IS_A
+    )
+    relationship_row = row_from_instance(relationship)
+    relationship_row[1] = newer
+    relationship_row[2] = False
+    concept, new_description_row, new_relationship_row = new_concept_rows(
+        NEW_CONCEPT_ID, "128133004", "Elbow trouble (disorder)"
+    )
+
+    write_release(
+        tmp_path,
+        "Delta",
+        {
+            Concept: [concept],
+            Description: [
+                description_row,
+                stale_description_row,
+                new_description_row,
+            ],
+            Relationship: [relationship_row, new_relationship_row],
+        },
+    )
+
+    call_command(
+        "import_data", "coding_systems.snomedct", str(tmp_path), "--mode", "delta"
+    )
+
+    assert Description.objects.get(id=description.id).term == (
+        "Elbow disorder (disorder)"
+    )
+    assert Description.objects.get(id=stale_description.id).term == (
+        stale_description.term
+    )
+    assert not Relationship.objects.get(id=relationship.id).active
+
+    # The updated closure is the same as a rebuilt one
+    assert IsAClosure.objects.filter(
+        ancestor_id="116307009", descendant_id=NEW_CONCEPT_ID
+    ).exists()
+    assert not IsAClosure.objects.filter(
+        ancestor_id="116309007", descendant_id="128133004"
+    ).exists()
+    updated_closure = closure_rows()
+    with connection.cursor() as cursor:
+        import_data.build_closure(cursor)
+    assert updated_closure == closure_rows()
+
+    # The changed concepts have been reindexed
+    assert search_index.search(coding_system, "trouble") == [NEW_CONCEPT_ID]
+    assert search_index.search(coding_system, "tennis thing") == []
+
+    # The hierarchy graph file has been rewritten for the new release
+    path = graphs.graph_path("snomedct")
+    assert graphs.Graph.read_release_key(path) == graphs.current_release_key(
+        coding_system
+    )
+    _, graph = graphs.Graph.from_file(path)
+    assert graph.code_to_id(NEW_CONCEPT_ID) is not None
+
+
+def test_import_delta_returns_changed_concepts(tennis_elbow, tmp_path):
+    description = Description.objects.get(
+        concept_id="128133004", type_id=FULLY_SPECIFIED_NAME, active=True
+    )
+    description_row = row_from_instance(description)
+    description_row[1] = datetime.date(2099, 1, 1)
+    concept, _, relationship_row = new_concept_rows(
+        NEW_CONCEPT_ID, "128133004", "Elbow trouble (disorder)"
+    )
+
+    write_release(
+        tmp_path,
+        "Delta",
+        {
+            Concept: [concept],
+            Description: [description_row],
+            Relationship: [relationship_row],
+        },
+    )
+
+    changed_ids = import_data.import_data(str(tmp_path), mode="delta")
+
+    assert changed_ids == {"128133004", NEW_CONCEPT_ID}
+
+
+def test_import_unknown_mode(tmp_path):
+    try:
+        import_data.import_data(str(tmp_path), mode="partial")
+    except ValueError as e:
+        assert str(e) == "Unknown import mode: partial"
+    else:
+        assert False, "ValueError not raised"
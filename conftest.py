@@ -2,9 +2,11 @@ from pathlib import Path
 
 import pytest
 from django.conf import settings
+from django.core.cache import caches
 from django.core.management import call_command
 
-from codelists import actions
+from codelists import actions, graphs, search_index, term_cache
+from codelists.coding_systems import CODING_SYSTEMS
 from codelists.tests.factories import CodelistFactory
 from opencodelists.tests.fixtures import *  # noqa
 
@@ -17,11 +19,37 @@ def enable_db_access_for_all_tests(db):
     pass
 
 
+@pytest.fixture(autouse=True)
+def clear_hierarchy_caches():
+    # Each test may load different coding system data, so we don't want graphs, cached
+    # hierarchies, or cached terms to be shared between tests.
+    graphs.invalidate()
+    caches["hierarchies"].clear()
+    term_cache.clear()
+    yield
+    graphs.invalidate()
+    caches["hierarchies"].clear()
+    term_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def codelist_artefacts_dir(settings, tmp_path):
+    settings.CODELIST_ARTEFACTS_DIR = str(tmp_path / "codelist-artefacts")
+    return settings.CODELIST_ARTEFACTS_DIR
+
+
+@pytest.fixture(autouse=True)
+def hierarchy_graphs_dir(settings, tmp_path):
+    settings.HIERARCHY_GRAPHS_DIR = str(tmp_path / "hierarchy-graphs")
+    return settings.HIERARCHY_GRAPHS_DIR
+
+
 @pytest.fixture(scope="function")
 def tennis_elbow():
     fixtures_path = Path(settings.BASE_DIR, "coding_systems", "snomedct", "fixtures")
     call_command("loaddata", fixtures_path / "core-model-components.json")
     call_command("loaddata", fixtures_path / "tennis-elbow.json")
+    search_index.build_index(CODING_SYSTEMS["snomedct"])
 
     with open(fixtures_path / "disorder-of-elbow.csv") as f:
         yield f.read()
@@ -1,5 +1,7 @@
 from openpyxl import load_workbook
 
+from opencodelists.import_utils import timed
+
 from .models import Mapping
 
 
@@ -29,7 +31,10 @@ def import_data(filename):
 
             yield [dmd_code, dmd_type, bnf_code]
 
-    Mapping.objects.bulk_create(
-        Mapping(dmd_code=r[0], dmd_type=r[1], bnf_concept_id=r[2])
-        for r in load_records()
-    )
+    with timed("load", table=Mapping._meta.db_table) as t:
+        t["num_rows"] = len(
+            Mapping.objects.bulk_create(
+                Mapping(dmd_code=r[0], dmd_type=r[1], bnf_concept_id=r[2])
+                for r in load_records()
+            )
+        )
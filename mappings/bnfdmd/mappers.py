@@ -1,46 +1,61 @@
 from coding_systems.dmd.models import AMP, VMP
+from opencodelists.db_utils import iter_query, temp_table
 
 from .models import Mapping
 
 
 def bnf_to_dmd(bnf_codes):
-    vmp_id_to_bnf_code = dict(
-        Mapping.objects.filter(
-            bnf_concept_id__in=bnf_codes, dmd_type="VMP"
-        ).values_list("dmd_code", "bnf_concept_id")
-    )
-    amp_id_to_bnf_code = dict(
-        Mapping.objects.filter(
-            bnf_concept_id__in=bnf_codes, dmd_type="AMP"
-        ).values_list("dmd_code", "bnf_concept_id")
-    )
-
-    rows = []
-
-    for vmp in VMP.objects.filter(id__in=list(vmp_id_to_bnf_code)):
-        rows.append(
-            {
-                "dmd_type": "VMP",
-                "dmd_id": vmp.id,
-                "dmd_name": vmp.nm,
-                "bnf_code": vmp_id_to_bnf_code[vmp.id],
-            }
-        )
+    return [
+        {"dmd_type": dmd_type, "dmd_id": dmd_id, "dmd_name": nm, "bnf_code": bnf_code}
+        for dmd_type, dmd_id, nm, bnf_code in iter_bnf_to_dmd(bnf_codes)
+    ]
+
+
+def iter_bnf_to_dmd(bnf_codes):
+    """Yield (dmd_type, dmd_id, dmd_name, bnf_code) tuples for each VMP and AMP mapped
+    to any of the given BNF codes.
+
+    Rows are ordered by BNF code, with VMPs before AMPs, and are read from the database
+    as they are yielded, so that they can be streamed.
+    """
+
+    mapping_table = Mapping._meta.db_table
+    vmp_table = VMP._meta.db_table
+    amp_table = AMP._meta.db_table
+
+    with temp_table(bnf_codes) as bnf_codes_table:
+        # VMPs and AMPs with the same BNF code are ordered by their models' default
+        # ordering.
+        sql = f"""
+        SELECT dmd_type, dmd_id, dmd_name, bnf_code
+        FROM (
+          SELECT
+            'VMP' AS dmd_type,
+            v.vpid AS dmd_id,
+            v.nm AS dmd_name,
+            m.bnf_concept_id AS bnf_code,
+            0 AS type_order,
+            v.nm AS sort_key
+          FROM {mapping_table} m
+          INNER JOIN {vmp_table} v ON v.vpid = m.dmd_code
+          WHERE m.dmd_type = 'VMP'
+            AND m.bnf_concept_id IN (SELECT value FROM {bnf_codes_table})
+
+          UNION ALL
 
-    for amp in AMP.objects.filter(id__in=list(amp_id_to_bnf_code)):
-        rows.append(
-            {
-                "dmd_type": "AMP",
-                "dmd_id": amp.id,
-                "dmd_name": amp.nm,
-                "bnf_code": amp_id_to_bnf_code[amp.id],
-            }
+          SELECT
+            'AMP' AS dmd_type,
+            a.apid AS dmd_id,
+            a.nm AS dmd_name,
+            m.bnf_concept_id AS bnf_code,
+            1 AS type_order,
+            a.descr AS sort_key
+          FROM {mapping_table} m
+          INNER JOIN {amp_table} a ON a.apid = m.dmd_code
+          WHERE m.dmd_type = 'AMP'
+            AND m.bnf_concept_id IN (SELECT value FROM {bnf_codes_table})
         )
+        ORDER BY bnf_code, type_order, sort_key
+        """
 
-    return sorted(
-        rows,
-        key=lambda row: (
-            row["bnf_code"],
-            ["VMP", "AMP"].index(row["dmd_type"]),
-        ),
-    )
+        yield from iter_query(sql)
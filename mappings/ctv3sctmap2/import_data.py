@@ -5,6 +5,8 @@ import sqlite3
 
 from django.db import connection as django_connection
 
+from opencodelists.import_utils import timed
+
 
 def import_data(release_dir):
     """
@@ -21,10 +23,11 @@ def import_data(release_dir):
     )
     assert len(paths) == 1
 
-    with open(paths[0]) as f:
+    with open(paths[0]) as f, timed("parse", path=paths[0]) as t:
         reader = csv.DictReader(f, delimiter="\t")
 
         values = list(iter_values(reader))
+        t["num_rows"] = len(values)
 
     # UPSERT rows based on ID, using effective date to decide if a row should
     # overwrite an existing one.
@@ -50,8 +53,9 @@ def import_data(release_dir):
     # execute the query above for each row from the release data
     connection_params = django_connection.get_connection_params()
     connection = sqlite3.connect(**connection_params)
-    connection.executemany(query, values)
-    connection.commit()
+    with timed("load", table="ctv3sctmap2_mapping") as t:
+        t["num_rows"] = connection.executemany(query, values).rowcount
+        connection.commit()
     connection.close()
 
 
@@ -5,6 +5,8 @@ import os
 
 from django.db import transaction
 
+from opencodelists.import_utils import timed
+
 from .models import Mapping
 
 
@@ -32,9 +34,11 @@ def import_data(release_dir):
                     continue
                 yield r
 
-    with transaction.atomic():
+    with transaction.atomic(), timed("load", table=Mapping._meta.db_table) as t:
         Mapping.objects.all().delete()
-        Mapping.objects.bulk_create(Mapping(*r) for r in load_records())
+        t["num_rows"] = len(
+            Mapping.objects.bulk_create(Mapping(*r) for r in load_records())
+        )
 
 
 def parse_date(datestr):
@@ -1,7 +1,7 @@
 import structlog
 from rest_framework.authtoken.models import Token
 
-from .models import Organisation, User
+from .models import DatasetRelease, Organisation, User
 
 logger = structlog.get_logger()
 
@@ -63,3 +63,11 @@ def set_api_token(*, user):
     Token.objects.filter(user=user).delete()
     token, _ = Token.objects.get_or_create(user=user)
     return token
+
+
+def record_dataset_release(*, dataset, release_dir):
+    release = DatasetRelease.objects.create(dataset=dataset, release_dir=release_dir)
+
+    logger.info("Recorded DatasetRelease", dataset_release_pk=release.pk)
+
+    return release
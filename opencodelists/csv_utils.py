@@ -19,3 +19,32 @@ def dict_rows_to_csv_data(headers, rows):
     writer.writeheader()
     writer.writerows(rows)
     return buf.getvalue()
+
+
+def iter_csv_data(rows, rows_per_chunk=1000):
+    """Yield chunks of CSV data for the given rows, which may be any iterable.
+
+    This is for use with a StreamingHttpResponse, so that a large CSV file can be sent
+    without building it all in memory.
+    """
+
+    writer = csv.writer(_Echo())
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) == rows_per_chunk:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+class _Echo:
+    """A file-like object that returns whatever is written to it, so that csv.writer
+    returns each line that it writes.
+
+    See https://docs.djangoproject.com/en/3.1/howto/outputting-csv/.
+    """
+
+    def write(self, value):
+        return value
@@ -1,7 +1,82 @@
+import itertools
+from contextlib import contextmanager
+
 from django.db import connection
 
+# The number of values in each chunk of an IN clause.  This keeps well within SQLite's
+# limit on the number of parameters in a query (999 before SQLite 3.32), leaving room
+# for any other parameters, and stops SQLite building a huge query plan.
+IN_CHUNK_SIZE = 500
+
 
 def query(sql, params=None):
     with connection.cursor() as c:
         c.execute(sql, params)
         return c.fetchall()
+
+
+def iter_query(sql, params=None, rows_per_fetch=1000):
+    """Yield the rows returned by the query, fetching them from the database a batch
+    at a time, so that they don't all have to be held in memory.
+    """
+
+    with connection.cursor() as c:
+        c.execute(sql, params)
+        while True:
+            rows = c.fetchmany(rows_per_fetch)
+            if not rows:
+                return
+            yield from rows
+
+
+@contextmanager
+def temp_table(values):
+    """Load values into a temporary table, and yield the table's name.
+
+    The table has a single column, `value`, which is its primary key, so that it can be
+    joined against efficiently.  The table is dropped at the end of the with block.
+
+    This lets a query filter by any number of values, without building an IN clause
+    with a parameter for each value.
+    """
+
+    table = f"temp_values_{next(_temp_table_ids)}"
+    with connection.cursor() as c:
+        c.execute(f"CREATE TEMP TABLE {table} (value PRIMARY KEY) WITHOUT ROWID")
+        try:
+            c.executemany(
+                f"INSERT OR IGNORE INTO {table} (value) VALUES (%s)",
+                [(value,) for value in values],
+            )
+            yield table
+        finally:
+            c.execute(f"DROP TABLE {table}")
+
+
+_temp_table_ids = itertools.count()
+
+
+def chunks(values, size=IN_CHUNK_SIZE):
+    """Yield successive lists of at most `size` items from `values`."""
+
+    values = iter(values)
+    while True:
+        chunk = list(itertools.islice(values, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def values_list_in(queryset, field_name, values, *fields):
+    """Return list of rows of queryset.values_list(*fields), filtered to those where
+    `field_name` is one of `values`.
+
+    The values are looked up in chunks, so that any number of values can be looked up.
+    """
+
+    rows = []
+    for chunk in chunks(set(values)):
+        rows.extend(
+            queryset.filter(**{f"{field_name}__in": chunk}).values_list(*fields)
+        )
+    return rows
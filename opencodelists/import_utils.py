@@ -0,0 +1,74 @@
+"""Instrumentation shared by every import_data module.
+
+Importing a release of a coding system or a mapping can take a long time, and used to
+give no sign of progress.  Each stage of an import (typically, loading one table) is
+wrapped in timed(), which logs a structlog event when the stage starts and when it
+finishes (or fails).  The finishing event records:
+
+    * how long the stage took;
+    * how many rows the stage loaded, and how many rows per second that is, if the
+      stage records num_rows;
+    * the peak resident set size of the process so far.
+
+The import_data command wraps the whole of each import in timed(), and can also write a
+cProfile of the import to a file, with --profile.
+"""
+
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+@contextmanager
+def timed(stage, **kwargs):
+    """Log the start and end of the given stage of an import, and how long it took.
+
+    Yields a dict, to which the stage can add extra details to be logged when it
+    finishes.  If it adds num_rows, the rate at which rows were loaded is logged too.
+
+    If the stage raises an exception, a "Failed import stage" event is logged instead,
+    with the exception, and the exception is re-raised.
+    """
+
+    logger.info("Started import stage", stage=stage, **kwargs)
+    details = dict(kwargs)
+    start = time.monotonic()
+    try:
+        yield details
+    except BaseException as e:
+        logger.error(
+            "Failed import stage",
+            stage=stage,
+            seconds=round(time.monotonic() - start, 3),
+            peak_rss_mb=peak_rss_mb(),
+            error=repr(e),
+            **details,
+        )
+        raise
+    seconds = time.monotonic() - start
+
+    if details.get("num_rows") is not None and seconds > 0:
+        details["rows_per_second"] = round(details["num_rows"] / seconds)
+
+    logger.info(
+        "Finished import stage",
+        stage=stage,
+        seconds=round(seconds, 3),
+        peak_rss_mb=peak_rss_mb(),
+        **details,
+    )
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process, in MB."""
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, but in kilobytes elsewhere
+    if sys.platform == "darwin":
+        peak_rss //= 1024
+    return round(peak_rss / 1024, 1)
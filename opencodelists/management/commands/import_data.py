@@ -1,10 +1,17 @@
+import cProfile
 import glob
 import os
 import sys
 from importlib import import_module
 
+from django.conf import settings
 from django.core.management import BaseCommand
 
+from codelists import graphs, search_index
+from codelists.coding_systems import CODING_SYSTEMS
+from opencodelists.actions import record_dataset_release
+from opencodelists.import_utils import timed
+
 
 def iter_possible_modules():
     paths = glob.glob("**/import_data.py", recursive=True)
@@ -18,8 +25,16 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("dataset")
         parser.add_argument("release_dir")
+        parser.add_argument(
+            "--mode", help="Import mode, for importers that support more than one"
+        )
+        parser.add_argument(
+            "--profile",
+            metavar="PATH",
+            help="Write a cProfile of the import to PATH, for use with pstats",
+        )
 
-    def handle(self, dataset, release_dir, **kwargs):
+    def handle(self, dataset, release_dir, mode=None, profile=None, **kwargs):
         try:
             mod = import_module(dataset + ".import_data")
         except ModuleNotFoundError:
@@ -32,5 +47,44 @@ class Command(BaseCommand):
 
             sys.exit(1)
 
+        if profile is None:
+            self.import_dataset(mod, dataset, release_dir, mode)
+        else:
+            profiler = cProfile.Profile()
+            profiler.runcall(self.import_dataset, mod, dataset, release_dir, mode)
+            profiler.dump_stats(profile)
+
+    def import_dataset(self, mod, dataset, release_dir, mode):
+        # An importer that only applies changes to existing data may return the set of
+        # codes that it changed.
         fn = getattr(mod, "import_data")
-        fn(release_dir)
+        with timed("import_data", dataset=dataset, release_dir=release_dir, mode=mode):
+            if mode is None:
+                changed_codes = fn(release_dir)
+            else:
+                changed_codes = fn(release_dir, mode=mode)
+
+        # Record that the data has changed, so that any process holding data derived
+        # from this dataset in memory knows to reload it.
+        record_dataset_release(dataset=dataset, release_dir=release_dir)
+
+        if not dataset.startswith("coding_systems."):
+            return
+        coding_system = CODING_SYSTEMS.get(dataset.split(".", 1)[1])
+
+        # Rewrite the coding system's hierarchy graph file, if it has one, since the
+        # existing file is now stale (see codelists/graphs.py).
+        if settings.HIERARCHY_GRAPHS_ENABLED and graphs.has_graph(coding_system):
+            with timed("hierarchy_graph", coding_system_id=coding_system.id):
+                graphs.write_graph(coding_system)
+
+        # Rebuild the coding system's search index, if it has one, or just reindex the
+        # changed codes.
+        if search_index.has_index(coding_system):
+            with timed("search_index", coding_system_id=coding_system.id) as t:
+                if changed_codes is None:
+                    t["num_rows"] = search_index.build_index(coding_system)
+                else:
+                    t["num_rows"] = search_index.update_index(
+                        coding_system, changed_codes
+                    )
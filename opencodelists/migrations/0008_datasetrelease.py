@@ -0,0 +1,22 @@
+# Generated by Django 3.1.5 on 2026-10-18 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opencodelists', '0007_auto_20210114_1139'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetRelease',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset', models.CharField(db_index=True, max_length=255)),
+                ('release_dir', models.CharField(max_length=255)),
+                ('imported_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
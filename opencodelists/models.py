@@ -181,3 +181,37 @@ class Membership(models.Model):
 
     class Meta:
         unique_together = ("user", "organisation")
+
+
+class DatasetRelease(models.Model):
+    """Records each time that a release of a dataset (eg a coding system or a mapping)
+    is imported.
+
+    `dataset` is the path to the module containing the dataset's import_data.py (eg
+    "coding_systems.snomedct").  This lets any process that holds data derived from a
+    dataset in memory work out whether the data in the database has changed.
+    """
+
+    dataset = models.CharField(max_length=255, db_index=True)
+    release_dir = models.CharField(max_length=255)
+    imported_at = models.DateTimeField(auto_now_add=True)
+
+    class Manager(models.Manager):
+        def current(self, dataset):
+            """Return the most recently imported release of the given dataset, or None
+            if no release has been imported.
+            """
+            return self.filter(dataset=dataset).order_by("-id").first()
+
+        def current_key(self, dataset):
+            """Return a key that identifies the most recently imported release of the
+            given dataset, or None if no release has been imported.
+            """
+            return (
+                self.filter(dataset=dataset)
+                .order_by("-id")
+                .values_list("id", flat=True)
+                .first()
+            )
+
+    objects = Manager()
@@ -173,6 +173,60 @@ WHITENOISE_USE_FINDERS = True
 LOGGING = logging_config_dict
 
 
+# Caches
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# The "hierarchies" cache holds the Hierarchy of each draft being edited in the builder
+# (see builder/hierarchy_cache.py).  Since each process has its own local memory cache,
+# set HIERARCHY_CACHE_BACKEND (eg to django.core.cache.backends.filebased.FileBasedCache)
+# to share the cache between processes.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "hierarchies": {
+        "BACKEND": os.environ.get(
+            "HIERARCHY_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("HIERARCHY_CACHE_LOCATION", "hierarchies"),
+        "TIMEOUT": 60 * 60 * 24,
+    },
+}
+
+# If TERM_CACHE_BACKEND is set, the "terms" cache is used to share the terms of codes
+# between processes (see codelists/term_cache.py).
+if os.environ.get("TERM_CACHE_BACKEND"):
+    CACHES["terms"] = {
+        "BACKEND": os.environ["TERM_CACHE_BACKEND"],
+        "LOCATION": os.environ.get("TERM_CACHE_LOCATION", "terms"),
+        "TIMEOUT": None,
+    }
+
+
+# Codelist artefacts
+# Where files for download from published CodelistVersions are stored (see
+# codelists/artefacts.py).
+CODELIST_ARTEFACTS_DIR = os.environ.get(
+    "CODELIST_ARTEFACTS_DIR", os.path.join(BASE_DIR, "codelist-artefacts")
+)
+
+
+# Terms
+# The maximum number of codes whose terms each process caches (see
+# codelists/term_cache.py).
+TERM_CACHE_MAX_SIZE = int(os.environ.get("TERM_CACHE_MAX_SIZE", 500_000))
+
+
+# Hierarchies
+# Whether each process should load the hierarchies of coding systems into memory (see
+# codelists/graphs.py).  This uses more memory, but avoids querying the database each
+# time a Hierarchy is built.
+HIERARCHY_GRAPHS_ENABLED = not os.environ.get("NO_HIERARCHY_GRAPHS")
+
+# Where the build_hierarchy_graphs command writes graph files, to be shared between
+# processes.
+HIERARCHY_GRAPHS_DIR = os.environ.get(
+    "HIERARCHY_GRAPHS_DIR", os.path.join(BASE_DIR, "hierarchy-graphs")
+)
+
+
 # Tests
 TEST_RUNNER = "opencodelists.django_test_runner.PytestTestRunner"
 
@@ -61,6 +61,7 @@ from django.core.management import call_command
 from django.db.models import Model
 
 from builder.actions import create_search, save, update_code_statuses
+from codelists import search_index
 from codelists.actions import (
     add_collaborator,
     create_codelist,
@@ -116,6 +117,7 @@ def universe(django_db_setup, django_db_blocker):
         call_command("loaddata", SNOMED_FIXTURES_PATH / "core-model-components.json")
         call_command("loaddata", SNOMED_FIXTURES_PATH / "tennis-elbow.json")
         call_command("loaddata", SNOMED_FIXTURES_PATH / "tennis-toe.json")
+        search_index.build_index(CODING_SYSTEMS["snomedct"])
 
         return build_fixtures()
 
@@ -1,4 +1,5 @@
 from opencodelists import actions
+from opencodelists.models import DatasetRelease
 
 from .factories import OrganisationFactory, UserFactory
 
@@ -99,3 +100,23 @@ def test_set_api_token(organisation_admin):
     actions.set_api_token(user=organisation_admin)
     assert organisation_admin.api_token is not None
     assert organisation_admin.api_token != old_token
+
+
+def test_record_dataset_release():
+    assert DatasetRelease.objects.current_key("coding_systems.snomedct") is None
+
+    release = actions.record_dataset_release(
+        dataset="coding_systems.snomedct", release_dir="/data/snomedct/2021-01"
+    )
+
+    assert release.release_dir == "/data/snomedct/2021-01"
+    assert DatasetRelease.objects.current_key("coding_systems.snomedct") == release.pk
+    assert DatasetRelease.objects.current_key("coding_systems.ctv3") is None
+
+    new_release = actions.record_dataset_release(
+        dataset="coding_systems.snomedct", release_dir="/data/snomedct/2021-02"
+    )
+
+    assert (
+        DatasetRelease.objects.current_key("coding_systems.snomedct") == new_release.pk
+    )
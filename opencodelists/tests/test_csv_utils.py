@@ -0,0 +1,14 @@
+from opencodelists.csv_utils import iter_csv_data, rows_to_csv_data
+
+
+def test_iter_csv_data():
+    rows = [["code", "term"]] + [[str(ix), f"Term, {ix}"] for ix in range(25)]
+
+    chunks = list(iter_csv_data(iter(rows), rows_per_chunk=10))
+
+    assert len(chunks) == 3
+    assert "".join(chunks) == rows_to_csv_data(rows)
+
+
+def test_iter_csv_data_with_no_rows():
+    assert list(iter_csv_data([])) == []
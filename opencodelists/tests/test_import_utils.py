@@ -0,0 +1,92 @@
+import pstats
+
+import pytest
+import structlog
+from django.core.management import call_command
+from structlog.testing import capture_logs
+
+from coding_systems.readv2.models import Concept
+from opencodelists import import_utils
+from opencodelists.import_utils import peak_rss_mb, timed
+
+
+@pytest.fixture
+def logs(monkeypatch):
+    # Loggers are cached on first use, so we need a new logger for capture_logs() to
+    # take effect.
+    with capture_logs() as logs:
+        monkeypatch.setattr(import_utils, "logger", structlog.get_logger())
+        yield logs
+
+
+def test_timed(logs):
+    with timed("load", table="readv2_concept") as t:
+        t["num_rows"] = 10
+
+    started, finished = logs
+    assert started["event"] == "Started import stage"
+    assert started["stage"] == "load"
+    assert started["table"] == "readv2_concept"
+    assert finished["event"] == "Finished import stage"
+    assert finished["stage"] == "load"
+    assert finished["table"] == "readv2_concept"
+    assert finished["num_rows"] == 10
+    assert finished["rows_per_second"] > 0
+    assert finished["seconds"] >= 0
+    assert finished["peak_rss_mb"] > 0
+
+
+def test_timed_without_rows(logs):
+    with timed("closure"):
+        pass
+
+    assert "rows_per_second" not in logs[-1]
+
+
+def test_timed_with_exception(logs):
+    with pytest.raises(ValueError):
+        with timed("load", table="readv2_concept") as t:
+            t["num_rows"] = 10
+            raise ValueError("Bad row")
+
+    started, failed = logs
+    assert failed["event"] == "Failed import stage"
+    assert failed["log_level"] == "error"
+    assert failed["stage"] == "load"
+    assert failed["table"] == "readv2_concept"
+    assert failed["num_rows"] == 10
+    assert failed["error"] == repr(ValueError("Bad row"))
+    assert failed["seconds"] >= 0
+    assert failed["peak_rss_mb"] > 0
+
+
+def test_peak_rss_mb():
+    # This process has loaded Django, which takes more than a few MB
+    assert peak_rss_mb() > 10
+
+
+def test_import_data_with_profile(logs, tmp_path):
+    release_dir = tmp_path / "release"
+    path = release_dir / "V2" / "Unified" / "Corev2.all"
+    path.parent.mkdir(parents=True)
+    path.write_text(
+        "C10..,Diabetes mellitus,,,250,,,,,,,C,EN\n"
+        "C108.,Insulin dependent diabetes mel,,,250.1,,,,,,,C,EN\n"
+    )
+    profile_path = tmp_path / "import.prof"
+
+    call_command(
+        "import_data",
+        "coding_systems.readv2",
+        str(release_dir),
+        "--profile",
+        str(profile_path),
+    )
+
+    assert Concept.objects.count() == 2
+
+    # Each stage is logged, and the whole import is profiled
+    finished = [log for log in logs if log["event"] == "Finished import stage"]
+    assert [log["stage"] for log in finished] == ["load", "import_data"]
+    assert finished[0]["num_rows"] == 2
+    assert pstats.Stats(str(profile_path)).total_calls > 0
@@ -0,0 +1,31 @@
+import zipfile
+from io import BytesIO
+
+from ..zip_utils import iter_zip_data
+
+
+def test_iter_zip_data():
+    members = [
+        ("a.csv", ["code,term\r\n", "1,One\r\n"]),
+        ("b.csv", iter([b"code,term\r\n", b"2,Two\r\n"])),
+        ("empty.csv", []),
+    ]
+
+    data = b"".join(iter_zip_data(members))
+
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["a.csv", "b.csv", "empty.csv"]
+        assert zf.read("a.csv") == b"code,term\r\n1,One\r\n"
+        assert zf.read("b.csv") == b"code,term\r\n2,Two\r\n"
+        assert zf.read("empty.csv") == b""
+
+
+def test_iter_zip_data_is_lazy():
+    def chunks():
+        yield "x" * 100000
+        raise AssertionError("should not be reached")
+
+    chunks_of_zip = iter_zip_data([("a.csv", chunks())])
+
+    assert next(chunks_of_zip)
@@ -0,0 +1,51 @@
+import zipfile
+
+
+def iter_zip_data(members):
+    """Yield chunks of a zip file containing the given members.
+
+    `members` is an iterable of (filename, chunks) pairs, where chunks is an iterable
+    of str or bytes.  Like iter_csv_data(), this is for use with a StreamingHttpResponse,
+    so that a large zip file can be sent without building it all in memory.
+    """
+
+    buf = _Buffer()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for filename, chunks in members:
+            with zf.open(filename, "w") as f:
+                for chunk in chunks:
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode("utf8")
+                    f.write(chunk)
+                    yield from buf.drain()
+            yield from buf.drain()
+    yield from buf.drain()
+
+
+class _Buffer:
+    """An unseekable file-like object that holds whatever is written to it until it is
+    drained.
+
+    Since it is not seekable, zipfile writes each member's sizes and CRC in a data
+    descriptor after the member's data, rather than going back to the member's header.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        if chunks:
+            yield b"".join(chunks)
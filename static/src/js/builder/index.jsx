@@ -5,41 +5,41 @@ import React from "react";
 
 import CodelistBuilder from "./codelistbuilder";
 import Hierarchy from "../hierarchy";
-import { readValueFromPage } from "../utils";
-
-const hierarchy = new Hierarchy(
-  readValueFromPage("parent-map"),
-  readValueFromPage("child-map")
-);
+import { readValueFromPage, showError } from "../utils";
 
 const treeTables = readValueFromPage("tree-tables");
 const codeToStatus = readValueFromPage("code-to-status");
-const codeToTerm = readValueFromPage("code-to-term");
+const container = document.querySelector("#codelist-builder-container");
 
-const ancestorCodes = treeTables
-  .map(([_, ancestorCodes]) => ancestorCodes) // eslint-disable-line no-unused-vars
-  .flat();
-const visiblePaths = hierarchy.initiallyVisiblePaths(
-  ancestorCodes,
-  codeToStatus,
-  1
-);
+Hierarchy.load(readValueFromPage("hierarchy-url")).then(
+  ({ hierarchy, codeToTerm }) => {
+    const ancestorCodes = treeTables
+      .map(([_, ancestorCodes]) => ancestorCodes) // eslint-disable-line no-unused-vars
+      .flat();
+    const visiblePaths = hierarchy.initiallyVisiblePaths(
+      ancestorCodes,
+      codeToStatus,
+      1
+    );
 
-ReactDOM.render(
-  <CodelistBuilder
-    searches={readValueFromPage("searches")}
-    filter={readValueFromPage("filter")}
-    hierarchy={hierarchy}
-    treeTables={treeTables}
-    codeToStatus={codeToStatus}
-    codeToTerm={codeToTerm}
-    visiblePaths={visiblePaths}
-    allCodes={readValueFromPage("all-codes")}
-    includedCodes={readValueFromPage("included-codes")}
-    excludedCodes={readValueFromPage("excluded-codes")}
-    isEditable={readValueFromPage("is-editable")}
-    updateURL={readValueFromPage("update-url")}
-    searchURL={readValueFromPage("search-url")}
-  />,
-  document.querySelector("#codelist-builder-container")
+    ReactDOM.render(
+      <CodelistBuilder
+        searches={readValueFromPage("searches")}
+        filter={readValueFromPage("filter")}
+        hierarchy={hierarchy}
+        treeTables={treeTables}
+        codeToStatus={codeToStatus}
+        codeToTerm={codeToTerm}
+        visiblePaths={visiblePaths}
+        allCodes={readValueFromPage("all-codes")}
+        includedCodes={readValueFromPage("included-codes")}
+        excludedCodes={readValueFromPage("excluded-codes")}
+        isEditable={readValueFromPage("is-editable")}
+        updateURL={readValueFromPage("update-url")}
+        searchURL={readValueFromPage("search-url")}
+      />,
+      container
+    );
+  },
+  (error) => showError(container, error.message)
 );
@@ -7,6 +7,63 @@ class Hierarchy {
     this.descendantMap = {};
   }
 
+  static fromCompact(data) {
+    // Build a hierarchy from the compact representation returned by the server
+    // (see present_hierarchy() in codelists/presenters.py).  Each code appears
+    // once, in data.codes, and edges are given by the positions of their parents
+    // and children in data.codes.
+
+    const { codes, parents, children } = data;
+    let parentMap = {};
+    let childMap = {};
+
+    parents.forEach((parentId, ix) => {
+      const parent = codes[parentId];
+      const child = codes[children[ix]];
+      (parentMap[child] = parentMap[child] || []).push(parent);
+      (childMap[parent] = childMap[parent] || []).push(child);
+    });
+
+    return new Hierarchy(parentMap, childMap);
+  }
+
+  static codeToTermFromCompact(data) {
+    // Return mapping from each code in the compact representation of a hierarchy
+    // to its term, omitting codes with no known term.
+
+    let codeToTerm = {};
+    data.codes.forEach((code, ix) => {
+      if (data.terms[ix] !== null) {
+        codeToTerm[code] = data.terms[ix];
+      }
+    });
+    return codeToTerm;
+  }
+
+  static load(url) {
+    // Fetch the compact representation of a hierarchy from the server, and
+    // return a promise of the hierarchy and the mapping from codes to terms.
+    //
+    // The response can be cached by the browser, so the hierarchy is not
+    // downloaded again if it has not changed.
+    //
+    // If the server does not return the hierarchy, the promise is rejected.
+
+    return fetch(url, { credentials: "include" })
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(
+            `Could not load hierarchy (${response.status} ${response.statusText})`
+          );
+        }
+        return response.json();
+      })
+      .then((data) => ({
+        hierarchy: Hierarchy.fromCompact(data),
+        codeToTerm: Hierarchy.codeToTermFromCompact(data),
+      }));
+  }
+
   getAncestors(node) {
     if (!(node in this.ancestorMap)) {
       let ancestors = new Set();
@@ -5,35 +5,39 @@ import React from "react";
 
 import Hierarchy from "../hierarchy";
 import TreeTables from "../common/tree-tables";
-import { readValueFromPage } from "../utils";
-
-const hierarchy = new Hierarchy(
-  readValueFromPage("parent-map"),
-  readValueFromPage("child-map")
-);
+import { readValueFromPage, showError } from "../utils";
 
 const treeTables = readValueFromPage("tree-tables");
 const codeToStatus = readValueFromPage("code-to-status");
-const codeToTerm = readValueFromPage("code-to-term");
+const hierarchyURL = readValueFromPage("hierarchy-url");
+const container = document.querySelector("#codelist-tree");
 
-const ancestorCodes = treeTables
-  .map(([, ancestorCodes]) => ancestorCodes)
-  .flat();
-const visiblePaths = hierarchy.initiallyVisiblePaths(
-  ancestorCodes,
-  codeToStatus,
-  0
-);
+// There is only a tree to show for coding systems with a hierarchy
+if (hierarchyURL) {
+  Hierarchy.load(hierarchyURL).then(
+    ({ hierarchy, codeToTerm }) => {
+      const ancestorCodes = treeTables
+        .map(([, ancestorCodes]) => ancestorCodes)
+        .flat();
+      const visiblePaths = hierarchy.initiallyVisiblePaths(
+        ancestorCodes,
+        codeToStatus,
+        0
+      );
 
-ReactDOM.render(
-  <TreeTables
-    hierarchy={hierarchy}
-    treeTables={treeTables}
-    codeToStatus={codeToStatus}
-    codeToTerm={codeToTerm}
-    visiblePaths={visiblePaths}
-    updateStatus={null}
-    showMoreInfoModal={null}
-  />,
-  document.querySelector("#codelist-tree")
-);
+      ReactDOM.render(
+        <TreeTables
+          hierarchy={hierarchy}
+          treeTables={treeTables}
+          codeToStatus={codeToStatus}
+          codeToTerm={codeToTerm}
+          visiblePaths={visiblePaths}
+          updateStatus={null}
+          showMoreInfoModal={null}
+        />,
+        container
+      );
+    },
+    (error) => showError(container, error.message)
+  );
+}
@@ -21,4 +21,14 @@ function readValueFromPage(id) {
   return JSON.parse(document.getElementById(id).textContent);
 }
 
-export { getCookie, readValueFromPage };
+function showError(container, message) {
+  // Replace the contents of the given element with an error message.
+  const alert = document.createElement("div");
+  alert.className = "alert alert-danger";
+  alert.setAttribute("role", "alert");
+  alert.textContent = message;
+  container.textContent = "";
+  container.appendChild(alert);
+}
+
+export { getCookie, readValueFromPage, showError };
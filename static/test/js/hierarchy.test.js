@@ -378,6 +378,53 @@ test("toggleVisibility", () => {
   );
 });
 
+test("fromCompact", () => {
+  const data = {
+    codes: ["a", "b", "c", "d", "x"],
+    terms: ["A", "B", "C", "D", null],
+    parents: [0, 0, 1, 2],
+    children: [1, 2, 3, 3],
+  };
+
+  const hierarchy = Hierarchy.fromCompact(data);
+  expect(hierarchy.parentMap).toEqual({ b: ["a"], c: ["a"], d: ["b", "c"] });
+  expect(hierarchy.childMap).toEqual({ a: ["b", "c"], b: ["d"], c: ["d"] });
+  expect(hierarchy.nodes).toEqual(new Set(["a", "b", "c", "d"]));
+
+  expect(Hierarchy.codeToTermFromCompact(data)).toEqual({
+    a: "A",
+    b: "B",
+    c: "C",
+    d: "D",
+  });
+});
+
+test("load", async () => {
+  const data = {
+    codes: ["a", "b"],
+    terms: ["A", "B"],
+    parents: [0],
+    children: [1],
+  };
+  global.fetch = jest.fn(() =>
+    Promise.resolve({ ok: true, json: () => Promise.resolve(data) })
+  );
+
+  const { hierarchy, codeToTerm } = await Hierarchy.load("/hierarchy.json");
+  expect(hierarchy.childMap).toEqual({ a: ["b"] });
+  expect(codeToTerm).toEqual({ a: "A", b: "B" });
+});
+
+test("load rejects if the hierarchy cannot be fetched", async () => {
+  global.fetch = jest.fn(() =>
+    Promise.resolve({ ok: false, status: 404, statusText: "Not Found" })
+  );
+
+  await expect(Hierarchy.load("/hierarchy.json")).rejects.toThrow(
+    "Could not load hierarchy (404 Not Found)"
+  );
+});
+
 function buildTestHierarchy() {
   // Return hierarchy with following structure:
   //